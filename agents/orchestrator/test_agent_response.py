@@ -0,0 +1,43 @@
+"""
+Test locale per il decoder delle risposte agente (agent_response.py).
+Esegui: python test_agent_response.py
+"""
+
+import os
+import sys
+
+# Aggiungi directory parent al path per import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agent_response import SSEParser, iter_sse_events
+
+
+def test_raw_text_with_colons():
+    """Righe di testo grezzo con ':' non sono campi SSE e restano nel testo"""
+    parser = SSEParser()
+    events = parser.feed(b"Risultato finale\nNota: controlla il budget\nOre: 10:30\n\n")
+    assert events == [('message', 'Risultato finale\nNota: controlla il budget\nOre: 10:30')], events
+
+
+def test_sse_fields():
+    """data/event sono letti, id/retry e commenti ignorati, anche con chunk spezzati"""
+    body = "event: delta\nid: 7\nretry: 1000\n: keep-alive\ndata: {\"text\": \"ciao\"}\ndata: Ore: 10:30\n\ndata: fine"
+    raw = body.encode('utf-8')
+    chunks = [raw[i:i + 3] for i in range(0, len(raw), 3)]
+    events = list(iter_sse_events(chunks))
+    assert events == [('delta', '{"text": "ciao"}\nOre: 10:30'), ('message', 'fine')], events
+
+
+def test_crlf_split_chunks():
+    """Righe CRLF spezzate tra '\\r' e '\\n' non lasciano '\\r' nei dati"""
+    raw = b'data: "ciao"\r\n\r\nevent: delta\r\ndata: {"a": 1}\r\n\r\n'
+    for size in range(1, len(raw) + 1):
+        chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+        events = list(iter_sse_events(chunks))
+        assert events == [('message', '"ciao"'), ('delta', '{"a": 1}')], (size, events)
+
+
+if __name__ == "__main__":
+    for test in (test_raw_text_with_colons, test_sse_fields, test_crlf_split_chunks):
+        test()
+        print(f"OK  {test.__name__}")
@@ -0,0 +1,304 @@
+"""
+Decoder incrementale delle risposte di invoke_agent_runtime.
+
+Gestisce sia risposte `application/json` sia `text/event-stream` leggendo
+i chunk man mano che arrivano (senza materializzare righe o copie
+intermedie del body) ed estrae il testo dell'assistente con un unico percorso.
+
+Questo modulo è duplicato identico in chat-frontend/ e agents/orchestrator/
+(ogni componente viene deployato dalla propria directory): modificarli insieme.
+
+Utilizzo:
+    response = client.invoke_agent_runtime(...)
+    decoded = decode_agent_response(response)
+    print(decoded.text)
+
+    # Streaming: un evento SSE alla volta
+    for event, data in iter_sse_events(response["response"]):
+        ...
+"""
+
+import json
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 8192
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Campi definiti dallo standard SSE: ogni altra riga è testo grezzo dell'agente
+_SSE_FIELDS = frozenset(('data', 'event', 'id', 'retry'))
+
+
+def extract_text(data: Any) -> Optional[str]:
+    """
+    Estrae il testo dell'assistente dalle forme di risposta note degli agenti.
+
+    Supporta:
+        "testo"
+        {"role": "assistant", "content": [{"text": "..."}, ...]}
+        {"content": "..."} / {"content": {"text": "..."}}
+        {"result": <uno dei precedenti>} / {"message": <uno dei precedenti>}
+        {"text": "..."}
+
+    Returns:
+        str | None: Il testo, oppure None se la forma non è riconosciuta
+    """
+    if isinstance(data, str):
+        return data
+    if not isinstance(data, dict):
+        return None
+
+    content = data.get('content')
+    if isinstance(content, list):
+        parts = [block['text'] for block in content if isinstance(block, dict) and isinstance(block.get('text'), str)]
+        if parts:
+            return ''.join(parts)
+    elif isinstance(content, str):
+        return content
+    elif isinstance(content, dict) and isinstance(content.get('text'), str):
+        return content['text']
+
+    for key in ('result', 'message', 'text', 'output'):
+        if key in data:
+            text = extract_text(data[key])
+            if text is not None:
+                return text
+    return None
+
+
+def iter_body_chunks(body: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Itera i chunk di bytes di un body (StreamingBody botocore, bytes, str o iterabile)."""
+    if body is None:
+        return
+    if isinstance(body, (bytes, bytearray)):
+        yield bytes(body)
+    elif isinstance(body, str):
+        yield body.encode('utf-8')
+    elif hasattr(body, 'iter_chunks'):
+        yield from body.iter_chunks(chunk_size=chunk_size)
+    elif hasattr(body, 'read'):
+        while True:
+            chunk = body.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk if isinstance(chunk, bytes) else str(chunk).encode('utf-8')
+    else:
+        for chunk in body:
+            yield chunk if isinstance(chunk, bytes) else str(chunk).encode('utf-8')
+
+
+class SSEParser:
+    """
+    Parser incrementale per text/event-stream.
+
+    `feed(chunk)` accetta bytes arbitrari (anche a metà riga o a metà
+    carattere UTF-8) e ritorna gli eventi completi come tuple (event, data).
+    Il buffer contiene al massimo la riga corrente incompleta, in bytes: il
+    chunk viene diviso su b'\n' (che non compare mai dentro un carattere
+    UTF-8 multibyte) e la parte con righe complete è decodificata una volta.
+    """
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._event = None
+        self._data: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, str]]:
+        cut = chunk.rfind(b'\n')
+        if cut < 0:
+            self._pending += chunk
+            return []
+        if self._pending:
+            self._pending += chunk[:cut]
+            text = self._pending.decode('utf-8', errors='replace')
+        else:
+            text = chunk[:cut].decode('utf-8', errors='replace')
+        self._pending = bytearray(chunk[cut + 1:])
+        if '\r' in text:
+            # L'ultimo '\r' precede il '\n' rimasto fuori dal testo
+            text = text.replace('\r\n', '\n')
+            if text[-1:] == '\r':
+                text = text[:-1]
+
+        # Blocchi separati da una riga vuota: ogni separatore chiude un evento. Il caso
+        # più comune (blocco di una sola riga "data: ...") non passa da _process_line.
+        events = []
+        first = True
+        for block in text.split('\n\n'):
+            if first:
+                first = False
+            else:
+                data = self._data
+                if data:
+                    events.append((self._event or 'message', data[0] if len(data) == 1 else '\n'.join(data)))
+                    self._data = []
+                self._event = None
+            if block.startswith('data: ') and '\n' not in block:
+                self._data.append(block[6:])
+                continue
+            for line in block.split('\n'):
+                event = self._process_line(line)
+                if event is not None:
+                    events.append(event)
+        return events
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Chiude lo stream ed emette l'eventuale ultimo evento non terminato."""
+        events = []
+        if self._pending:
+            event = self._process_line(self._pending.decode('utf-8', errors='replace').rstrip('\r'))
+            self._pending = bytearray()
+            if event is not None:
+                events.append(event)
+        event = self._process_line('')
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: str) -> Optional[Tuple[str, str]]:
+        if line.startswith('data: '):
+            self._data.append(line[6:])
+            return None
+        if not line:
+            if not self._data:
+                self._event = None
+                return None
+            event = (self._event or 'message', '\n'.join(self._data))
+            self._event = None
+            self._data = []
+            return event
+        if line.startswith(':'):
+            return None
+        field, colon, value = line.partition(':')
+        if not colon or field not in _SSE_FIELDS:
+            # Testo grezzo (agenti che non scrivono SSE), anche con ':' ("Nota: ...", "10:30"): trattato come data
+            self._data.append(line)
+            return None
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event = value
+        # id e retry servono solo alla riconnessione, che qui non viene fatta
+        return None
+
+
+def iter_sse_events(body: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, str]]:
+    """Genera gli eventi SSE (event, data) man mano che i chunk arrivano."""
+    parser = SSEParser()
+    for chunk in iter_body_chunks(body, chunk_size):
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def decode_sse_data(data: str) -> Tuple[Optional[str], bool]:
+    """
+    Decodifica il payload di un evento SSE in un delta di testo.
+
+    Returns:
+        tuple: (testo, is_json) — is_json indica se il payload era JSON
+    """
+    if data[:1] in ('"', '{', '['):
+        # Percorso veloce per i delta di testo senza escape (il caso più comune)
+        if data[-1] == '"' and len(data) > 1 and data.count('"') == 2 and '\\' not in data:
+            return data[1:-1], True
+        try:
+            value = _JSON_DECODER.decode(data)
+        except ValueError:
+            return data, False
+        return extract_text(value), True
+    return data, False
+
+
+class AgentResponse:
+    """
+    Risultato decodificato di una risposta agente.
+
+    Attributes:
+        text: Testo dell'assistente
+        data: JSON deserializzato (solo per application/json, altrimenti None)
+        content_type: contentType della risposta
+        bytes_read: Bytes letti dallo stream
+        events: Numero di eventi SSE ricevuti
+    """
+
+    def __init__(self, text: str, data: Any = None, content_type: str = '',
+                 bytes_read: int = 0, events: int = 0):
+        self.text = text
+        self.data = data
+        self.content_type = content_type
+        self.bytes_read = bytes_read
+        self.events = events
+
+    @property
+    def value(self) -> Any:
+        """Il JSON se disponibile, altrimenti il testo."""
+        return self.data if self.data is not None else self.text
+
+
+def decode_agent_response(response: dict, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          on_delta: Optional[Callable[[str], None]] = None) -> AgentResponse:
+    """
+    Decodifica la risposta di invoke_agent_runtime in modo incrementale.
+
+    Args:
+        response: Risposta di boto3 (con 'contentType' e 'response')
+        chunk_size: Dimensione dei chunk letti dallo stream
+        on_delta: Callback opzionale invocato con ogni delta di testo SSE
+
+    Returns:
+        AgentResponse
+    """
+    content_type = response.get('contentType') or ''
+    body = response.get('response')
+
+    if 'text/event-stream' in content_type:
+        parts: List[str] = []
+        bytes_read = 0
+        events = 0
+        last_raw = False
+        parser = SSEParser()
+
+        def handle(batch: List[Tuple[str, str]]):
+            nonlocal events, last_raw
+            events += len(batch)
+            for event, data in batch:
+                if event != 'message' and event != 'delta':
+                    continue
+                # Delta di testo senza escape (il caso più comune) senza chiamare decode_sse_data
+                if data[:1] == '"' and data[-1] == '"' and len(data) > 1 and data.count('"') == 2 and '\\' not in data:
+                    text, is_json = data[1:-1], True
+                else:
+                    text, is_json = decode_sse_data(data)
+                if not text:
+                    continue
+                # Le righe non JSON (testo grezzo) restano separate da newline
+                if not is_json and last_raw:
+                    parts.append('\n')
+                last_raw = not is_json
+                parts.append(text)
+                if on_delta is not None:
+                    on_delta(text)
+
+        for chunk in iter_body_chunks(body, chunk_size):
+            bytes_read += len(chunk)
+            handle(parser.feed(chunk))
+        handle(parser.close())
+        return AgentResponse(''.join(parts).strip(), None, content_type, bytes_read, events)
+
+    # application/json e contentType non gestiti: un solo buffer di bytes
+    buffer = bytearray()
+    for chunk in iter_body_chunks(body, chunk_size):
+        buffer += chunk
+    bytes_read = len(buffer)
+
+    try:
+        data = json.loads(buffer)
+    except ValueError:
+        return AgentResponse(buffer.decode('utf-8', errors='replace').strip(), None, content_type, bytes_read)
+
+    text = extract_text(data)
+    if text is None:
+        text = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return AgentResponse(text, data, content_type, bytes_read)
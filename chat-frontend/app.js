@@ -566,20 +566,32 @@ async function sendMessage() {
     try {
         const response = await fetch(CONFIG.ORCHESTRATOR_URL, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream, application/json'
+            },
             body: JSON.stringify({
                 prompt: message,
                 actor_id: CONFIG.ACTOR_ID,
-                session_id: sessionId
+                session_id: sessionId,
+                stream: true
             })
         });
         
-        removeLoading(loadingId);
-        
         if (!response.ok) {
+            removeLoading(loadingId);
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
+        // Streaming SSE: mostra i token man mano che arrivano
+        if ((response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+            await readOrchestratorStream(response, loadingId);
+            setStatus(true);
+            return;
+        }
+        
+        removeLoading(loadingId);
+        
         const data = await response.json();
         
         if (data.error) {
@@ -603,6 +615,67 @@ async function sendMessage() {
     }
 }
 
+// Legge la risposta SSE dell'orchestrator e aggiorna il messaggio a ogni frame
+async function readOrchestratorStream(response, loadingId) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let contentDiv = null;
+    
+    const handleFrame = (frame) => {
+        let event = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) {
+                event = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                dataLines.push(line.slice(6));
+            }
+        });
+        const data = dataLines.join('\n');
+        
+        if (event === 'done') return;
+        if (event === 'error') {
+            let errorText = data;
+            try { errorText = JSON.parse(data).error || data; } catch (e) {}
+            addErrorMessage(errorText);
+            return;
+        }
+        
+        // I frame dell'agente sono tipicamente stringhe JSON
+        let delta = data;
+        try {
+            const parsed = JSON.parse(data);
+            if (typeof parsed === 'string') delta = parsed;
+        } catch (e) {}
+        
+        if (!contentDiv) {
+            removeLoading(loadingId);
+            contentDiv = addMessage('', 'assistant');
+        }
+        text += delta;
+        contentDiv.innerHTML = formatMarkdown(text);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+    
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+        }
+        if (buffer.trim()) handleFrame(buffer);
+    } finally {
+        removeLoading(loadingId);
+    }
+}
+
 // Converti markdown base in HTML
 function formatMarkdown(text) {
     let html = text;
@@ -669,6 +742,8 @@ function addMessage(content, role) {
     
     // Scroll in basso
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    
+    return contentDiv;
 }
 
 // Mostra loading
@@ -1769,28 +1844,33 @@ async function loadEventsAndPlaces() {
         let events = [];
         let places = [];
         
-        // Load events if needed
+        // Un solo round trip: eventi e luoghi vengono caricati in parallelo da /api/batch
+        const operations = [];
         if (type === 'all' || type === 'events') {
-            const eventParams = new URLSearchParams();
-            if (location) eventParams.append('luogo', location);
-            
-            const eventResponse = await fetch(`${CONFIG.API_URL}/events?${eventParams}`);
-            if (eventResponse.ok) {
-                const eventData = await eventResponse.json();
-                events = eventData.events || [];
-            }
+            const eventParams = {};
+            if (location) eventParams.luogo = location;
+            operations.push({ entity: 'events', action: 'list', params: eventParams });
         }
-        
-        // Load places if needed
         if (type === 'all' || type === 'places') {
-            const placeParams = new URLSearchParams();
-            if (location) placeParams.append('indirizzo', location);
-            if (category) placeParams.append('categoria', category);
-            
-            const placeResponse = await fetch(`${CONFIG.API_URL}/places?${placeParams}`);
-            if (placeResponse.ok) {
-                const placeData = await placeResponse.json();
-                places = placeData.places || [];
+            const placeParams = {};
+            if (location) placeParams.indirizzo = location;
+            if (category) placeParams.categoria = category;
+            operations.push({ entity: 'places', action: 'list', params: placeParams });
+        }
+        
+        if (operations.length > 0) {
+            const response = await fetch(`${CONFIG.API_URL}/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ operations })
+            });
+            if (response.ok) {
+                const batch = await response.json();
+                batch.results.forEach(result => {
+                    if (result.status !== 200) return;
+                    if (result.entity === 'events') events = result.body.events || [];
+                    if (result.entity === 'places') places = result.body.places || [];
+                });
             }
         }
         
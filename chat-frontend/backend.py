@@ -6,18 +6,32 @@ Fornisce endpoint per:
 - CRUD per Projects
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import boto3
 import json
 import logging
 import os
+import functools
+import time
 from datetime import datetime
 
 # Import delle utilities custom
 from pdf_utils import extract_text_from_pdf, chunk_text
-from qdrant_utils import QdrantManager
-import hashlib
+from qdrant_utils import (
+    GROUP_AGGREGATIONS, SEARCH_MODES, OrphanSweeper, QdrantRegistry, children_filter, create_qdrant_client
+)
+from vector_store import EmbeddedVectorStore
+from pipeline_utils import StagePipeline, StageFailed
+from job_utils import JobQueue
+from cache_utils import ResponseCache, SingleFlight, normalize_params
+from lambda_utils import LambdaDispatcher
+from metrics_utils import MetricsRegistry, DependencyMetrics, SIZE_BUCKETS, COUNT_BUCKETS
+from session_utils import RuntimeSessionPool
+from embedding_utils import BM25Encoder, CachedEmbedder, EmbeddingCache, QueryEmbedder, create_embedder
+from agent_response import decode_agent_response, extract_text, iter_sse_events
+from concurrent.futures import ThreadPoolExecutor
+import base64
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 
 app = Flask(__name__)
@@ -76,33 +90,215 @@ QDRANT_PORT = int(os.getenv('QDRANT_PORT', '6333'))
 QDRANT_COLLECTION = os.getenv('QDRANT_COLLECTION', 'knowledge_base')
 QDRANT_VECTOR_SIZE = int(os.getenv('QDRANT_VECTOR_SIZE', '1536'))
 
+# Provider degli embedding per i chunk senza embedding forniti dal client
+EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'hashing')
+embedder = create_embedder(EMBEDDING_PROVIDER, dim=QDRANT_VECTOR_SIZE)
+# Cache persistente degli embedding per hash(modello, testo); path vuoto = disattivata
+EMBEDDING_CACHE_DB = os.getenv('EMBEDDING_CACHE_DB', 'embedding_cache.sqlite3')
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DB, max_entries=EMBEDDING_CACHE_MAX_ENTRIES) if EMBEDDING_CACHE_DB else None
+if embedding_cache is not None:
+    embedder = CachedEmbedder(embedder, embedding_cache)
+# Cache LRU degli embedding delle query di /api/kb/search
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+query_embedder = QueryEmbedder(embedder, maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+# Aggregazione del vettore parent ('mean' o 'weighted' sulla lunghezza del testo) e normalizzazione L2
+KB_PARENT_POOLING = os.getenv('KB_PARENT_POOLING', 'mean')
+KB_NORMALIZE_VECTORS = os.getenv('KB_NORMALIZE_VECTORS', 'false').lower() in ('1', 'true', 'yes')
+# Upsert a batch: punti per richiesta, batch in parallelo, wait=False con barriera finale
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv('QDRANT_UPSERT_BATCH_SIZE', '256'))
+QDRANT_UPSERT_PARALLEL = int(os.getenv('QDRANT_UPSERT_PARALLEL', '4'))
+QDRANT_UPSERT_WAIT = os.getenv('QDRANT_UPSERT_WAIT', 'false').lower() in ('1', 'true', 'yes')
+QDRANT_UPSERT_RETRIES = int(os.getenv('QDRANT_UPSERT_RETRIES', '3'))
+# Vettore sparso BM25 accanto a quello denso (ricerca 'sparse' e 'hybrid' su /api/kb/search)
+QDRANT_SPARSE_VECTORS = os.getenv('QDRANT_SPARSE_VECTORS', 'true').lower() in ('1', 'true', 'yes')
+KB_SEARCH_MODE = os.getenv('KB_SEARCH_MODE', 'hybrid' if QDRANT_SPARSE_VECTORS else 'dense')
+# Ricerca raggruppata per documento (group_by_document): chunk per documento e aggregazione degli score
+KB_GROUP_SIZE = int(os.getenv('KB_GROUP_SIZE', '3'))
+KB_GROUP_AGGREGATION = os.getenv('KB_GROUP_AGGREGATION', 'max')
+sparse_encoder = BM25Encoder() if QDRANT_SPARSE_VECTORS else None
+# Profilo di storage delle nuove collection (default, on-disk, scalar, binary, compact)
+# e override per collection, es. "meetings_notes=scalar,documents=binary"
+QDRANT_STORAGE_PROFILE = os.getenv('QDRANT_STORAGE_PROFILE', 'default')
+QDRANT_COLLECTION_PROFILES = dict(
+    item.split('=', 1) for item in os.getenv('QDRANT_COLLECTION_PROFILES', '').replace(' ', '').split(',') if '=' in item
+)
+# Secondi di validità dei metadata delle collection in cache (alias spostati da qdrant_migrate)
+QDRANT_COLLECTION_CACHE_TTL = float(os.getenv('QDRANT_COLLECTION_CACHE_TTL', '300'))
+# Vector store: 'qdrant', 'embedded' (in-process su disco) o 'auto' (embedded se Qdrant non risponde all'avvio)
+VECTOR_STORE = os.getenv('VECTOR_STORE', 'auto')
+EMBEDDED_VECTOR_STORE_PATH = os.getenv('EMBEDDED_VECTOR_STORE_PATH', 'vector_store')
+# Collection Qdrant in cui POST /api/kb può scrivere (le uniche toccate da cascata e sweeper)
+KB_COLLECTIONS = [c for c in os.getenv('KB_COLLECTIONS', 'meetings_notes').replace(' ', '').split(',') if c]
+# Sweeper dei punti di documenti KB cancellati: intervallo in secondi (0 = disattivato),
+# documenti per delete filtrato e collection da controllare (vuoto = KB_COLLECTIONS)
+KB_ORPHAN_SWEEP_INTERVAL = float(os.getenv('KB_ORPHAN_SWEEP_INTERVAL', '3600'))
+KB_ORPHAN_SWEEP_BATCH_SIZE = int(os.getenv('KB_ORPHAN_SWEEP_BATCH_SIZE', '256'))
+KB_ORPHAN_SWEEP_COLLECTIONS = [
+    c for c in os.getenv('KB_ORPHAN_SWEEP_COLLECTIONS', '').replace(' ', '').split(',') if c
+] or KB_COLLECTIONS
+
+# Thread pool per gli stadi concorrenti della pipeline di ingestion KB
+KB_PIPELINE_WORKERS = int(os.getenv('KB_PIPELINE_WORKERS', '8'))
+kb_pipeline_executor = ThreadPoolExecutor(max_workers=KB_PIPELINE_WORKERS, thread_name_prefix='kb-stage')
+
+# Cache in-process delle liste di entità (GET /api/goals, /api/projects, ...)
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '30'))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv('RESPONSE_CACHE_MAXSIZE', '256'))
+CACHED_NAMESPACES = ('goals', 'projects', 'contacts', 'events', 'places')
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL, maxsize=RESPONSE_CACHE_MAXSIZE)
+
+# Coalescing delle letture identiche concorrenti (route + params + generazione cache)
+single_flight = SingleFlight()
+
+# Thread pool per le operazioni di POST /api/batch
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '10'))
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '50'))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+# Coda persistente per l'ingestion KB asincrona (POST /api/kb?async=true)
+KB_JOBS_DB = os.getenv('KB_JOBS_DB', 'kb_jobs.sqlite3')
+KB_JOB_WORKERS = int(os.getenv('KB_JOB_WORKERS', '2'))
+# Secondi senza heartbeat dopo i quali un job 'running' viene ripreso da un altro worker
+KB_JOB_LEASE_TIMEOUT = float(os.getenv('KB_JOB_LEASE_TIMEOUT', '60'))
+
+# Dimensione del buffer di lettura per lo streaming SSE verso il browser
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '256'))
+
+# Metriche Prometheus esposte su GET /metrics
+metrics_registry = MetricsRegistry()
+dependency_metrics = DependencyMetrics(metrics_registry, prefix='backend')
+http_request_duration = metrics_registry.histogram(
+    'backend_http_request_duration_seconds', 'Latency of HTTP requests by route', ['method', 'route']
+)
+http_requests_total = metrics_registry.counter(
+    'backend_http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status']
+)
+http_requests_in_flight = metrics_registry.gauge(
+    'backend_http_requests_in_flight', 'HTTP requests currently being served', ['route']
+)
+kb_payload_bytes = metrics_registry.histogram(
+    'backend_kb_payload_bytes', 'Size of KB ingestion payloads', ['source'], buckets=SIZE_BUCKETS
+)
+kb_text_chars = metrics_registry.histogram(
+    'backend_kb_text_chars', 'Characters of text ingested per KB document', buckets=SIZE_BUCKETS
+)
+kb_chunks = metrics_registry.histogram(
+    'backend_kb_chunks', 'Chunks produced per KB document', ['source'], buckets=COUNT_BUCKETS
+)
+kb_stage_duration = metrics_registry.histogram(
+    'backend_kb_stage_duration_seconds', 'Duration of KB ingestion pipeline stages', ['stage']
+)
+
+# Pool di sessioni calde per gli agenti di utilità (identificazione goal, estrazione avanzamenti)
+agent_session_pool = RuntimeSessionPool(
+    size=int(os.getenv('AGENT_SESSION_POOL_SIZE', '4')),
+    max_age=float(os.getenv('AGENT_SESSION_MAX_AGE', '3600')),
+    max_idle=float(os.getenv('AGENT_SESSION_MAX_IDLE', '840'))
+)
+
+# Tabella di routing verso le Lambda
+LAMBDA_ROUTES = {
+    'goal.post': GOAL_POST_LAMBDA_ARN,
+    'goal.get': GOAL_GET_LAMBDA_ARN,
+    'goal.delete': GOAL_DELETE_LAMBDA_ARN,
+    'goal.update': GOAL_UPDATE_LAMBDA_ARN,
+    'goal.search': GOAL_SEARCH_LAMBDA_ARN,
+    'project.post': PROJECT_POST_LAMBDA_ARN,
+    'project.get': PROJECT_GET_LAMBDA_ARN,
+    'project.delete': PROJECT_DELETE_LAMBDA_ARN,
+    'project.update': PROJECT_UPDATE_LAMBDA_ARN,
+    'contact.post': CONTACT_POST_LAMBDA_ARN,
+    'contact.get': CONTACT_GET_LAMBDA_ARN,
+    'contact.delete': CONTACT_DELETE_LAMBDA_ARN,
+    'contact.update': CONTACT_UPDATE_LAMBDA_ARN,
+    'event.post': EVENT_POST_LAMBDA_ARN,
+    'event.get': EVENT_GET_LAMBDA_ARN,
+    'event.delete': EVENT_DELETE_LAMBDA_ARN,
+    'event.update': EVENT_UPDATE_LAMBDA_ARN,
+    'place.post': PLACE_POST_LAMBDA_ARN,
+    'place.get': PLACE_GET_LAMBDA_ARN,
+    'place.delete': PLACE_DELETE_LAMBDA_ARN,
+    'place.update': PLACE_UPDATE_LAMBDA_ARN,
+    'kb.post': KB_POST_LAMBDA_ARN,
+    'kb.get': KB_GET_LAMBDA_ARN,
+    'kb.delete': KB_DELETE_LAMBDA_ARN,
+}
+
 # Client AWS
 bedrock_client = boto3.client('bedrock-agentcore', region_name=REGION)
-lambda_client = boto3.client('lambda', region_name=REGION)
+lambda_dispatcher = LambdaDispatcher(
+    LAMBDA_ROUTES,
+    region=REGION,
+    max_pool_connections=int(os.getenv('LAMBDA_MAX_POOL_CONNECTIONS', '50')),
+    connect_timeout=float(os.getenv('LAMBDA_CONNECT_TIMEOUT', '3')),
+    read_timeout=float(os.getenv('LAMBDA_READ_TIMEOUT', '60')),
+    max_attempts=int(os.getenv('LAMBDA_MAX_ATTEMPTS', '3')),
+    metrics=dependency_metrics
+)
+
+def _create_vector_client():
+    """Client Qdrant, oppure il vector store in-process se richiesto o se Qdrant non risponde."""
+    if VECTOR_STORE == 'embedded':
+        return EmbeddedVectorStore(EMBEDDED_VECTOR_STORE_PATH)
+    client = create_qdrant_client(host=QDRANT_HOST, port=QDRANT_PORT)
+    if VECTOR_STORE == 'auto':
+        try:
+            client.get_collections()
+        except Exception as e:
+            logger.warning(f"⚠️ Qdrant unreachable at {QDRANT_HOST}:{QDRANT_PORT} ({e}), "
+                           f"using embedded vector store at {EMBEDDED_VECTOR_STORE_PATH}")
+            return EmbeddedVectorStore(EMBEDDED_VECTOR_STORE_PATH)
+    return client
+
 
-# Qdrant Manager
+# Qdrant: un manager per collection, tutti sullo stesso client
 try:
-    qdrant_manager = QdrantManager(
-        host=QDRANT_HOST,
-        port=QDRANT_PORT,
-        collection_name=QDRANT_COLLECTION
-    )
-    logger.info(f"✅ Qdrant manager initialized: {QDRANT_HOST}:{QDRANT_PORT}")
+    qdrant_registry = QdrantRegistry(host=QDRANT_HOST, port=QDRANT_PORT, client=_create_vector_client(),
+                                     sparse_vectors=QDRANT_SPARSE_VECTORS,
+                                     storage_profile=QDRANT_STORAGE_PROFILE,
+                                     collection_profiles=QDRANT_COLLECTION_PROFILES,
+                                     collection_cache_ttl=QDRANT_COLLECTION_CACHE_TTL)
+    qdrant_manager = qdrant_registry.get(QDRANT_COLLECTION)
+    logger.info(f"✅ Qdrant manager initialized: {type(qdrant_registry.client).__name__}")
 except Exception as e:
     logger.warning(f"⚠️ Qdrant manager initialization failed: {e}")
+    qdrant_registry = None
     qdrant_manager = None
 
 
-# ========== UTILITY FUNCTIONS ==========
+def _kb_live_document_ids():
+    """Id di tutti i documenti KB esistenti (DynamoDB, tramite la Lambda KB GET)."""
+    result = lambda_dispatcher.invoke('kb.get', {'queryStringParameters': {'ids_only': 'true'}})
+    if not result.ok or not isinstance(result.body, dict) or 'document_ids' not in result.body:
+        raise RuntimeError(f"KB document listing failed (status {result.status_code})")
+    return result.body['document_ids']
+
+
+def _kb_document_exists(document_id):
+    """True se il documento KB esiste (Lambda KB GET con `document_id`, lettura consistente)."""
+    result = lambda_dispatcher.invoke('kb.get', {'pathParameters': {'document_id': document_id}})
+    if not result.ok or result.status_code not in (200, 404):
+        raise RuntimeError(f"KB document lookup failed (status {result.status_code})")
+    return result.status_code == 200
+
+
+kb_orphan_sweeper = OrphanSweeper(
+    qdrant_registry, _kb_live_document_ids, interval=KB_ORPHAN_SWEEP_INTERVAL,
+    batch_size=KB_ORPHAN_SWEEP_BATCH_SIZE, collections=KB_ORPHAN_SWEEP_COLLECTIONS
+) if qdrant_registry else None
+
 
-def _simple_hash_embedding(text, size=1536):
-    """Genera un embedding deterministico semplice (fallback) basato su hash."""
-    if not text:
-        return [0.0] * size
-    digest = hashlib.sha256(text.encode('utf-8')).digest()
-    return [(digest[i % len(digest)] / 255.0) for i in range(size)]
+@app.before_request
+def _start_orphan_sweeper():
+    # Avvio alla prima richiesta: funziona con gunicorn e senza reloader, e con il
+    # reloader di Flask solo nel processo che serve le richieste
+    if kb_orphan_sweeper:
+        kb_orphan_sweeper.start()
 
 
+# ========== UTILITY FUNCTIONS ==========
+
 def _parse_json_field(value, default=None):
     if value is None:
         return default
@@ -113,6 +309,119 @@ def _parse_json_field(value, default=None):
     except Exception:
         return default
 
+def _freeze_response(rv):
+    """Converte il valore di ritorno di una view in (status, body, mimetype) condivisibile tra thread."""
+    response = app.make_response(rv)
+    return response.status_code, response.get_data(), response.mimetype
+
+
+def _coalesced_call(flight_key, view, args, kwargs, on_result=None):
+    """
+    Esegue la view una sola volta per le richieste identiche concorrenti.
+    `on_result(status, body)` viene invocato solo dal leader (es. per popolare la cache).
+
+    Returns:
+        tuple: (Response, shared)
+    """
+    def load():
+        frozen = _freeze_response(view(*args, **kwargs))
+        if on_result is not None:
+            on_result(frozen[0], frozen[1])
+        return frozen
+
+    (status, body, mimetype), shared = single_flight.do(flight_key, load)
+    return Response(body, status=status, mimetype=mimetype), shared
+
+
+def cached_response(namespace):
+    """
+    Decorator per le GET di lista: serve la risposta dalla cache se presente,
+    altrimenti invoca la route e salva le risposte 200 per i parametri normalizzati.
+    I miss concorrenti con gli stessi parametri condividono una sola invocazione.
+    L'header `Cache-Control: no-cache` forza la lettura da Lambda.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = normalize_params({**request.args.to_dict(), **kwargs})
+            bypass = 'no-cache' in (request.headers.get('Cache-Control') or '')
+            if not bypass:
+                cached = response_cache.get(namespace, key)
+                if cached is not None:
+                    response = Response(cached, status=200, mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+            generation = response_cache.generation(namespace)
+            if bypass:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    response_cache.set(namespace, key, response.get_data(), generation=generation)
+                response.headers['X-Cache'] = 'BYPASS'
+                return response
+
+            def store(status, body):
+                if status == 200:
+                    response_cache.set(namespace, key, body, generation=generation)
+
+            response, shared = _coalesced_call((namespace, 'list', generation, key), view, args, kwargs, store)
+            response.headers['X-Cache'] = 'COALESCED' if shared else 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def coalesced(namespace):
+    """
+    Decorator per le GET non in cache: le richieste identiche concorrenti
+    (stesso path e parametri) condividono una sola invocazione upstream.
+    La generazione del namespace fa parte della chiave, così una lettura
+    successiva a una scrittura non si aggancia a una chiamata partita prima.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = normalize_params({**request.args.to_dict(), **kwargs})
+            flight_key = (namespace, request.path, response_cache.generation(namespace), key)
+            response, shared = _coalesced_call(flight_key, view, args, kwargs)
+            response.headers['X-Single-Flight'] = 'SHARED' if shared else 'LEADER'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidates(*namespaces):
+    """Decorator per le route di scrittura: invalida i namespace di cache indicati."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            finally:
+                response_cache.invalidate(*namespaces)
+        return wrapper
+    return decorator
+
+
+def _lambda_response(target, payload, default_status=200):
+    """
+    Invoca una Lambda tramite il dispatcher e costruisce la risposta Flask.
+
+    Returns:
+        tuple: (response, status_code) con il body estratto dal formato API Gateway
+    """
+    result = lambda_dispatcher.invoke(target, payload)
+    if not result.ok:
+        logger.error(f"Lambda {target} invocation failed: status={result.invoke_status}, error={result.function_error}")
+        return jsonify({"error": "Lambda invocation failed"}), 500
+    return jsonify(result.body), result.status_code or default_status
+
+
+def _is_truthy(value):
+    """Interpreta flag booleani da JSON, form o query string."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 def identify_goal_from_text(text):
     """Invoca l'agente project-goal-writer-reader per identificare il nome dell'obiettivo dal testo"""
     import uuid
@@ -128,16 +437,12 @@ Testo:
         logger.info(f"🧠 Agent prompt (goal identification): {prompt}")
         logger.info(f"🔍 Calling project-goal-writer-reader agent to identify goal from text")
         
-        response = _invoke_agent_runtime(PROJECT_GOAL_WRITER_READER_ARN, {"prompt": prompt})
+        decoded = _invoke_agent_runtime(PROJECT_GOAL_WRITER_READER_ARN, {"prompt": prompt})
         
-        logger.info(f"Agent response contentType: {response.get('contentType')}")
+        logger.info(f"Agent response contentType: {decoded.content_type}")
         
         # Processa la risposta
-        result = _parse_agent_response(response)
-        if isinstance(result, dict):
-            goal_name = result.get('result', 'vuoto').strip()
-        else:
-            goal_name = str(result).strip()
+        goal_name = (decoded.text or 'vuoto').strip()
         
         # Pulisci la risposta da newline e whitespace
         goal_name = goal_name.replace('\n', '').strip()
@@ -156,58 +461,43 @@ Testo:
         return "vuoto"
 
 
-def _invoke_agent_runtime(agent_arn, payload_dict):
-    import uuid
-    payload_data = json.dumps(payload_dict).encode('utf-8')
-    return bedrock_client.invoke_agent_runtime(
-        agentRuntimeArn=agent_arn,
-        runtimeSessionId=str(uuid.uuid4()),
-        payload=payload_data
-    )
-
+def _agent_label(agent_arn):
+    """Nome breve dell'agente dall'ARN (es. 'project_goal_writer_reader'), usato come label."""
+    name = agent_arn.rsplit('/', 1)[-1]
+    return name.rsplit('-', 1)[0] if '-' in name else name
 
-def _parse_agent_response(response):
-    content = []
-    if response.get("contentType") == "application/json":
-        for chunk in response.get("response", []):
-            content.append(chunk.decode('utf-8'))
-        result_str = ''.join(content)
-        logger.debug(f"Raw response: {result_str}")
-        try:
-            return json.loads(result_str)
-        except Exception:
-            return result_str
 
-    for chunk in response.get("response", []):
-        if isinstance(chunk, bytes):
-            content.append(chunk.decode('utf-8'))
-        else:
-            content.append(str(chunk))
-    return ''.join(content).strip()
-
-
-def _extract_text_from_agent_result(result):
-    if isinstance(result, dict):
-        content = result.get('content')
-        if isinstance(content, list) and content:
-            first = content[0]
-            if isinstance(first, dict) and 'text' in first:
-                return first['text']
-    if isinstance(result, str):
-        return result
-    return str(result)
+def _invoke_agent_runtime(agent_arn, payload_dict):
+    """
+    Invoca un agente di utilità su una sessione calda del pool e decodifica la risposta.
+    La sessione resta in lease finché il body non è stato letto; se la chiamata
+    o la lettura falliscono la sessione viene ruotata.
+
+    Returns:
+        AgentResponse
+    """
+    payload_data = json.dumps(payload_dict).encode('utf-8')
+    with dependency_metrics.track('bedrock_agent', _agent_label(agent_arn)), \
+            agent_session_pool.session(agent_arn) as session_id:
+        response = bedrock_client.invoke_agent_runtime(
+            agentRuntimeArn=agent_arn,
+            runtimeSessionId=session_id,
+            payload=payload_data
+        )
+        decoded = decode_agent_response(response)
+    logger.debug(f"Agent response: {decoded.bytes_read} bytes, contentType={decoded.content_type}")
+    return decoded
 
 
 def extract_project_updates_from_text(text):
     try:
         payload = {"text": text[:4000]}
-        response = _invoke_agent_runtime(PROJECT_UPDATES_EXTRACTOR_ARN, payload)
-        result = _parse_agent_response(response)
+        result = _invoke_agent_runtime(PROJECT_UPDATES_EXTRACTOR_ARN, payload).value
 
         if isinstance(result, dict) and all(k in result for k in ["avanzamenti", "cose_da_fare", "punti_attenzione"]):
             return result
 
-        raw_text = _extract_text_from_agent_result(result).strip()
+        raw_text = (extract_text(result) or str(result)).strip()
         if raw_text.startswith("```"):
             raw_text = raw_text.split("\n", 1)[-1]
             if raw_text.endswith("```"):
@@ -231,21 +521,485 @@ def update_goal_with_advancements(goal_name, updates):
             f"{note_lines}"
         )
 
-        response = _invoke_agent_runtime(PROJECT_GOAL_WRITER_READER_ARN, {"prompt": prompt})
-        _ = _parse_agent_response(response)
+        _invoke_agent_runtime(PROJECT_GOAL_WRITER_READER_ARN, {"prompt": prompt})
+        response_cache.invalidate('goals')
         logger.info("✅ Goal updated with advancements")
     except Exception as e:
         logger.error(f"❌ Error updating goal with advancements: {e}", exc_info=True)
 
 
 
+# ========== KB INGESTION PIPELINE ==========
+
+def _build_kb_tags(goal_name, today, storage_mode='parent-child'):
+    """Tags di sistema salvati sia su DynamoDB che nel payload Qdrant."""
+    return {
+        'is_parent': False,
+        'storage_mode': storage_mode,
+        'nome_obiettivo': goal_name,
+        'data_odierna': today
+    }
+
+
+def _invoke_kb_post_lambda(text_content, tipo, tags, file_content=None, filename=None, document_id=None):
+    """
+    Salva il documento su DynamoDB + S3 tramite la Lambda KB POST. Con
+    `document_id` aggiorna il documento esistente (stesso id, nuovo testo).
+    """
+    if file_content and filename:
+        # Multipart con file
+        encoder = MultipartEncoder(
+            fields={
+                'data': (filename, file_content, 'application/pdf'),
+                'type': tipo,
+                'tags': json.dumps(tags)
+            }
+        )
+    else:
+        # Multipart con testo
+        encoder = MultipartEncoder(
+            fields={
+                'data': text_content,
+                'type': tipo,
+                'tags': json.dumps(tags)
+            }
+        )
+
+    body_bytes = encoder.to_string()
+    payload = {
+        'body': base64.b64encode(body_bytes).decode('utf-8'),
+        'isBase64Encoded': True,
+        'headers': {
+            'content-type': encoder.content_type
+        }
+    }
+    if document_id:
+        payload['pathParameters'] = {'document_id': document_id}
+
+    logger.info(f"📤 Lambda payload content-type: {payload['headers'].get('content-type')}")
+    logger.info(f"📤 Lambda payload body preview (base64): {str(payload['body'])[:200]}")
+    result = lambda_dispatcher.invoke('kb.post', payload)
+    logger.info(f"📦 Lambda response statusCode: {result.status_code}, body preview: {str(result.body)[:200]}")
+
+    if not result.ok:
+        raise RuntimeError("Lambda invocation failed")
+
+    body = result.body
+    if isinstance(body, dict):
+        logger.info(f"✅ KB document {'updated' if document_id else 'created'} in Lambda with ID: {body.get('document_id')}")
+    return body, result.status_code or 201
+
+
+def _extract_pdf_text(file_content):
+    """Estrae il testo da un PDF registrando latenza ed errori dell'estrazione."""
+    with dependency_metrics.track('pdf', 'extract_text'):
+        return extract_text_from_pdf(file_content)
+
+
+def _embed_texts(texts):
+    """Calcola gli embedding di tutti i testi con una sola chiamata batch (matrice float32)."""
+    if not texts:
+        return []
+    with dependency_metrics.track('embedding', embedder.name):
+        return embedder.encode(texts)
+
+
+def _build_kb_chunks(text_content, chunk_size=1000, chunk_overlap=200,
+                     provided_chunks=None, provided_embeddings=None):
+    """Prepara i chunk con embedding (forniti dal client o calcolati in batch)."""
+    chunks = []
+    if isinstance(provided_chunks, list) and provided_chunks:
+        # Usa chunks già forniti
+        for idx, ch in enumerate(provided_chunks):
+            if isinstance(ch, dict):
+                chunks.append({
+                    'id': ch.get('id', idx),
+                    'text': ch.get('text', ''),
+                    'embedding': ch.get('embedding'),
+                    'metadata': ch.get('metadata', {})
+                })
+    else:
+        # Chunking automatico dal testo
+        text_chunks = chunk_text(text_content, chunk_size=chunk_size, overlap=chunk_overlap)
+        for idx, ch_text in enumerate(text_chunks):
+            embedding = None
+            if isinstance(provided_embeddings, list) and idx < len(provided_embeddings):
+                embedding = provided_embeddings[idx]
+            chunks.append({
+                'id': idx,
+                'text': ch_text,
+                'embedding': embedding
+            })
+
+    # Tutti i chunk senza embedding del documento in un'unica chiamata vettorizzata
+    missing = [ch for ch in chunks if ch['embedding'] is None or len(ch['embedding']) == 0]
+    for ch, vector in zip(missing, _embed_texts([ch['text'] for ch in missing])):
+        ch['embedding'] = vector
+    if sparse_encoder is not None:
+        for ch, sparse in zip(chunks, sparse_encoder.encode_documents([ch['text'] for ch in chunks])):
+            ch['sparse'] = sparse
+
+    kb_chunks.observe('provided' if provided_chunks else 'auto', value=len(chunks))
+    return chunks
+
+
+def _kb_document_id(document_id, lambda_body):
+    """
+    Id stabile del documento per i punti Qdrant: quello fornito dal client
+    (re-indicizzazione) o quello assegnato dalla Lambda KB.
+
+    Senza id l'ingestion fallisce: punti con un id che non ha una riga
+    DynamoDB verrebbero eliminati dallo sweeper degli orfani.
+    """
+    if document_id:
+        return str(document_id)
+    if isinstance(lambda_body, dict) and lambda_body.get('document_id'):
+        return str(lambda_body['document_id'])
+    raise RuntimeError("KB Lambda returned no document_id")
+
+
+def _save_kb_chunks(chunks, metadata, collection, parent_text, storage_mode='parent-child', document_id=None):
+    """
+    Salva i chunk sulla collection Qdrant scelta dall'utente.
+
+    Con `document_id` gli id dei punti sono deterministici e la
+    re-indicizzazione è incrementale (solo chunk nuovi/modificati).
+    """
+    with dependency_metrics.track('qdrant', 'save_chunks'):
+        stats = qdrant_registry.get(collection).index_document(
+            chunks,
+            metadata,
+            document_id=document_id,
+            incremental=True,
+            storage_mode=storage_mode,
+            parent_text=parent_text,
+            vector_size=QDRANT_VECTOR_SIZE,
+            parent_pooling=KB_PARENT_POOLING,
+            normalize=KB_NORMALIZE_VECTORS,
+            batch_size=QDRANT_UPSERT_BATCH_SIZE,
+            parallel=QDRANT_UPSERT_PARALLEL,
+            wait=QDRANT_UPSERT_WAIT,
+            max_retries=QDRANT_UPSERT_RETRIES
+        )
+    logger.info(f"✅ Saved {len(chunks)} chunks to Qdrant collection '{collection}' (mode: {storage_mode})")
+    return stats
+
+
+def run_kb_ingestion(text_content, tipo='meeting-notes', collection='meetings_notes',
+                     file_content=None, filename=None, extra_payload=None,
+                     chunk_size=1000, chunk_overlap=200,
+                     provided_chunks=None, provided_embeddings=None, on_stage=None,
+                     document_id=None, kb_lambda_result=None, on_kb_lambda=None):
+    """
+    Esegue la pipeline di ingestion KB con gli stadi indipendenti in parallelo.
+
+    Grafo degli stadi:
+        identify_goal ─┬─> update_goal <─ extract_updates
+                       ├─> kb_lambda ──┐
+                       └───────────────┴─> qdrant_save <─ chunking
+
+    Con `document_id` (re-indicizzazione di un documento esistente) lo stadio
+    kb_lambda aggiorna la riga DynamoDB/S3 esistente invece di crearne una
+    nuova, prima della re-indicizzazione incrementale: testo salvato e punti
+    Qdrant restano allineati. Se il documento non esiste lo stadio fallisce
+    con LookupError e nessun punto viene scritto.
+
+    Args:
+        on_stage: Callback opzionale (stage, status, info) per l'avanzamento
+        document_id: Id di un documento già indicizzato da re-indicizzare
+        kb_lambda_result: (body, status_code) di un tentativo precedente: la
+            Lambda KB non viene richiamata (nessuna riga duplicata)
+        on_kb_lambda: Callback opzionale con (body, status_code) appena la riga
+            KB è stata salvata, per il checkpoint dei job asincroni
+
+    Returns:
+        tuple: (response_body, status_code)
+
+    Raises:
+        StageFailed: Se uno stadio bloccante fallisce (es. 'kb_lambda';
+            `error` è un LookupError se `document_id` non esiste)
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    storage_mode = 'parent-child'
+    if not isinstance(extra_payload, dict):
+        extra_payload = {}
+
+    def update_goal(goal_name, project_updates):
+        logger.info(f"🧩 Project updates extracted: {project_updates}")
+        if goal_name and goal_name.lower() != "vuoto":
+            update_goal_with_advancements(goal_name, project_updates)
+
+    def kb_lambda(goal_name):
+        if kb_lambda_result is not None:
+            logger.info("♻️ KB row already saved by a previous attempt, skipping Lambda")
+            body, status_code = kb_lambda_result
+            return body, status_code
+        tags = _build_kb_tags(goal_name, today, storage_mode)
+        body, status_code = _invoke_kb_post_lambda(text_content, tipo, tags, file_content, filename, document_id)
+        if document_id and status_code == 404:
+            raise LookupError(f"KB document {document_id} not found")
+        if document_id and status_code >= 400:
+            raise RuntimeError(f"KB document update failed (status {status_code})")
+        if on_kb_lambda and status_code < 400:
+            on_kb_lambda((body, status_code))
+        return body, status_code
+
+    def qdrant_save(chunks, goal_name, lambda_result):
+        # Metadata finale con tags di sistema
+        metadata = {
+            **_build_kb_tags(goal_name, today, storage_mode),
+            **extra_payload
+        }
+        doc_id = _kb_document_id(document_id, lambda_result[0])
+        return _save_kb_chunks(chunks, metadata, collection, text_content, storage_mode, doc_id)
+
+    pipeline = StagePipeline(kb_pipeline_executor, name='kb-ingestion', listener=on_stage)
+    pipeline.add('identify_goal', lambda: identify_goal_from_text(text_content))
+    pipeline.add('extract_updates', lambda: extract_project_updates_from_text(text_content))
+    pipeline.add('update_goal', update_goal, deps=['identify_goal', 'extract_updates'])
+    pipeline.add('kb_lambda', kb_lambda, deps=['identify_goal'])
+    pipeline.add('chunking', lambda: _build_kb_chunks(
+        text_content, chunk_size, chunk_overlap, provided_chunks, provided_embeddings
+    ))
+    pipeline.add('qdrant_save', qdrant_save, deps=['chunking', 'identify_goal', 'kb_lambda'])
+    kb_text_chars.observe(value=len(text_content))
+    if file_content:
+        kb_payload_bytes.observe('file', value=len(file_content))
+    else:
+        kb_payload_bytes.observe('text', value=len(text_content.encode('utf-8')))
+    try:
+        results = pipeline.run()
+    finally:
+        for stage, timing in pipeline.timings.items():
+            kb_stage_duration.observe(stage, value=timing['duration_ms'] / 1000)
+
+    goal_name = results['identify_goal']
+    body, status_code = results['kb_lambda']
+    tags = _build_kb_tags(goal_name, today, storage_mode)
+    logger.info(f"🎯 Identified goal: {goal_name}, 📌 System tags: {tags}")
+
+    # Ritorna successo con metadata aggiuntivi
+    response_body = body.copy() if isinstance(body, dict) else {"result": body}
+    response_body['goal_identified'] = goal_name
+    response_body['date'] = today
+    response_body['tags'] = tags
+    response_body['document_id'] = results['qdrant_save'].get('document_id')
+    response_body['indexing'] = results['qdrant_save']
+    response_body['timings'] = pipeline.timing_report()
+    return response_body, status_code
+
+
+def _process_kb_job(job_id, params, file_content, report):
+    """
+    Handler dei job di ingestion KB eseguito dai worker della coda.
+
+    Il risultato della Lambda KB viene salvato come checkpoint del job: se il
+    worker muore dopo quello stadio, la ripresa non crea una seconda riga KB.
+    """
+    text_content = params.get('text_content')
+    filename = params.get('filename')
+
+    if not text_content and file_content:
+        report('extract_text', 'running')
+        if filename and filename.lower().endswith('.pdf'):
+            text_content = _extract_pdf_text(file_content)
+        else:
+            text_content = file_content.decode('utf-8')
+        report('extract_text', 'succeeded', {'chars': len(text_content)})
+
+    if not text_content:
+        raise ValueError("No text content provided")
+    if not qdrant_manager:
+        raise RuntimeError("Qdrant not available")
+
+    response_body, status_code = run_kb_ingestion(
+        text_content,
+        tipo=params.get('tipo') or 'meeting-notes',
+        collection=params.get('collection') or 'meetings_notes',
+        file_content=file_content,
+        filename=filename,
+        extra_payload=params.get('extra_payload'),
+        chunk_size=params.get('chunk_size', 1000),
+        chunk_overlap=params.get('chunk_overlap', 200),
+        provided_chunks=params.get('provided_chunks'),
+        provided_embeddings=params.get('provided_embeddings'),
+        on_stage=report,
+        document_id=params.get('document_id'),
+        kb_lambda_result=params.get('kb_lambda_result'),
+        on_kb_lambda=lambda result: kb_job_queue.checkpoint(job_id, kb_lambda_result=result)
+    )
+    response_body['statusCode'] = status_code
+    return response_body
+
+
+kb_job_queue = JobQueue(KB_JOBS_DB, _process_kb_job, workers=KB_JOB_WORKERS,
+                        lease_timeout=KB_JOB_LEASE_TIMEOUT)
+
+
+@app.before_request
+def _start_kb_job_queue():
+    # Come lo sweeper: avvio alla prima richiesta in ogni processo che serve richieste
+    # (worker gunicorn inclusi); i lease evitano di riprendere i job degli altri processi
+    kb_job_queue.start()
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "service": "orchestrator-proxy"}), 200
 
 
+def _wants_stream(data):
+    """True se il client chiede la modalità streaming (flag `stream` o header Accept SSE)."""
+    if isinstance(data, dict) and _is_truthy(data.get('stream')):
+        return True
+    return 'text/event-stream' in (request.headers.get('Accept') or '')
+
+
+def _sse_frame(data, event=None):
+    """Serializza un frame SSE (una riga `data:` per ogni riga del contenuto)."""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in str(data).split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _stream_orchestrator_response(response):
+    """
+    Inoltra al browser i frame SSE dell'orchestrator man mano che arrivano.
+
+    Il generatore legge dallo stream botocore solo quando il server WSGI ha
+    scritto il frame precedente sul socket (backpressure naturale). Se il client
+    si disconnette, il server chiude il generatore (GeneratorExit) e lo stream
+    upstream viene chiuso nel `finally`, interrompendo la lettura dall'agente.
+    """
+    body = response["response"]
+    frames = 0
+    try:
+        for event, data in iter_sse_events(body, chunk_size=STREAM_CHUNK_SIZE):
+            if event not in ('message', 'delta'):
+                continue
+            frames += 1
+            yield _sse_frame(data)
+        yield _sse_frame(json.dumps({"frames": frames}), event="done")
+        logger.info(f"Success (streaming): forwarded {frames} frames")
+    except GeneratorExit:
+        logger.info(f"Client disconnected after {frames} frames, closing upstream stream")
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming orchestrator response: {e}", exc_info=True)
+        yield _sse_frame(json.dumps({"error": str(e)}), event="error")
+    finally:
+        close = getattr(body, 'close', None)
+        if close:
+            close()
+        # L'orchestrator può aver modificato entità tramite gli agenti
+        response_cache.invalidate(*CACHED_NAMESPACES)
+
+
+# ========================================
+# METRICS
+# ========================================
+
+@app.before_request
+def _start_request_metrics():
+    request.environ['metrics.start'] = time.perf_counter()
+    request.environ['metrics.route'] = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests_in_flight.inc(request.environ['metrics.route'])
+
+
+@app.after_request
+def _record_response_status(response):
+    request.environ['metrics.status'] = response.status_code
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(error=None):
+    start = request.environ.pop('metrics.start', None)
+    if start is None:
+        return
+    route = request.environ.pop('metrics.route')
+    status = request.environ.pop('metrics.status', 500 if error else 200)
+    http_requests_in_flight.dec(route)
+    http_request_duration.observe(request.method, route, value=time.perf_counter() - start)
+    http_requests_total.inc(request.method, route, str(status))
+
+
+@metrics_registry.collector
+def _collect_cache_metrics():
+    """Espone i contatori di cache e single-flight già mantenuti dalle rispettive classi."""
+    cache = response_cache.stats()
+    flights = single_flight.stats()
+    return [
+        ('backend_cache_hits_total', 'counter', 'Response cache hits', {}, cache['hits']),
+        ('backend_cache_misses_total', 'counter', 'Response cache misses', {}, cache['misses']),
+        ('backend_cache_evictions_total', 'counter', 'Response cache LRU evictions', {}, cache['evictions']),
+        ('backend_cache_entries', 'gauge', 'Entries in the response cache', {}, cache['size']),
+        ('backend_single_flight_calls_total', 'counter', 'Upstream calls executed by single-flight leaders', {}, flights['leaders']),
+        ('backend_single_flight_shared_total', 'counter', 'Requests coalesced into an in-flight call', {}, flights['shared']),
+    ]
+
+
+@metrics_registry.collector
+def _collect_embedding_cache_metrics():
+    """Hit, miss ed eviction della cache persistente degli embedding."""
+    if embedding_cache is None:
+        return []
+    stats = embedding_cache.stats()
+    return [
+        ('backend_embedding_cache_hits_total', 'counter', 'Embeddings served from the persistent cache', {}, stats['hits']),
+        ('backend_embedding_cache_misses_total', 'counter', 'Embeddings computed by the provider', {}, stats['misses']),
+        ('backend_embedding_cache_evictions_total', 'counter', 'Embedding cache LRU evictions', {}, stats['evictions']),
+        ('backend_embedding_cache_entries', 'gauge', 'Vectors stored in the embedding cache', {}, stats['entries']),
+    ]
+
+
+@metrics_registry.collector
+def _collect_agent_session_metrics():
+    """Lease calde/fredde e rotazioni del pool di sessioni degli agenti."""
+    samples = []
+    for arn, s in agent_session_pool.stats().items():
+        agent = _agent_label(arn)
+        samples.extend([
+            ('backend_agent_session_leases_total', 'counter', 'Agent runtime session leases by temperature',
+             {'agent': agent, 'state': 'warm'}, s['warm']),
+            ('backend_agent_session_leases_total', 'counter', 'Agent runtime session leases by temperature',
+             {'agent': agent, 'state': 'cold'}, s['cold']),
+            ('backend_agent_session_rotations_total', 'counter', 'Agent sessions discarded after an error',
+             {'agent': agent}, s['rotated']),
+            ('backend_agent_session_expirations_total', 'counter', 'Agent sessions discarded for age or inactivity',
+             {'agent': agent}, s['expired']),
+            ('backend_agent_sessions_idle', 'gauge', 'Warm agent sessions available in the pool',
+             {'agent': agent}, s['idle']),
+        ])
+    return samples
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Metriche in formato Prometheus (latenze per dipendenza e route, payload KB)"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Contatori della cache delle liste di entità, del single-flight e degli embedding (chunk e query)"""
+    return jsonify({
+        **response_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'embedding': embedding_cache.stats() if embedding_cache is not None else None,
+        'query_embedding': query_embedder.stats()
+    }), 200
+
+
+@app.route('/api/lambda/stats', methods=['GET'])
+def get_lambda_stats():
+    """Latenze delle invocazioni Lambda per target"""
+    return jsonify(lambda_dispatcher.stats()), 200
+
+
 @app.route('/invoke', methods=['POST'])
+@invalidates(*CACHED_NAMESPACES)
 def invoke_orchestrator():
     """Proxy per invocare l'orchestrator su AWS"""
     try:
@@ -254,6 +1008,7 @@ def invoke_orchestrator():
         prompt = data.get('prompt', '')
         actor_id = data.get('actor_id', 'chat-user')
         session_id = data.get('session_id', 'default-session')
+        stream = _wants_stream(data)
         
         if not prompt:
             return jsonify({"error": "Prompt richiesto"}), 400
@@ -268,151 +1023,101 @@ def invoke_orchestrator():
         }
         
         # Invoca l'orchestrator su AWS
-        response = bedrock_client.invoke_agent_runtime(
-            agentRuntimeArn=ORCHESTRATOR_ARN,
-            runtimeSessionId=session_id,
-            payload=json.dumps(payload).encode('utf-8')
-        )
+        with dependency_metrics.track('bedrock_agent', 'orchestrator'):
+            response = bedrock_client.invoke_agent_runtime(
+                agentRuntimeArn=ORCHESTRATOR_ARN,
+                runtimeSessionId=session_id,
+                payload=json.dumps(payload).encode('utf-8')
+            )
         
         logger.info(f"Response contentType: {response.get('contentType')}")
         
-        # Processa la risposta
-        if response.get("contentType") == "application/json":
-            content = []
-            for chunk in response.get("response", []):
-                content.append(chunk.decode('utf-8'))
-            
-            result_data = json.loads(''.join(content))
-            logger.debug(f"Raw result_data type: {type(result_data)}, keys: {result_data.keys() if isinstance(result_data, dict) else 'N/A'}")
-            
-            # Estrai il testo dalla risposta dell'agent
-            result = None
-            
-            # Prima prova il formato agent: {"role": "assistant", "content": [{"text": "..."}]}
-            if isinstance(result_data, dict):
-                logger.debug(f"result_data is dict, checking 'content' field...")
-                if 'content' in result_data:
-                    content_field = result_data['content']
-                    logger.debug(f"content field type: {type(content_field)}")
-                    
-                    if isinstance(content_field, list):
-                        logger.debug(f"content is list with {len(content_field)} elements")
-                        # Estrai il testo dal primo elemento content
-                        if len(content_field) > 0:
-                            first_elem = content_field[0]
-                            logger.debug(f"First element type: {type(first_elem)}")
-                            if isinstance(first_elem, dict) and 'text' in first_elem:
-                                result = first_elem['text']
-                                logger.debug(f"✓ Extracted text from content[0].text")
-                    elif isinstance(content_field, str):
-                        # Content è direttamente una stringa
-                        result = content_field
-                        logger.debug(f"✓ Extracted from content field (string)")
-                    elif isinstance(content_field, dict) and 'text' in content_field:
-                        # Content è un dict con field text
-                        result = content_field['text']
-                        logger.debug(f"✓ Extracted from content.text")
-                
-                # Poi prova i campi standard, ma estrai testo se sono dict
-                if result is None and 'result' in result_data:
-                    res = result_data['result']
-                    if isinstance(res, dict) and 'content' in res and isinstance(res['content'], list):
-                        if len(res['content']) > 0 and 'text' in res['content'][0]:
-                            result = res['content'][0]['text']
-                            logger.debug(f"✓ Extracted text from result.content[0].text")
-                    elif isinstance(res, str):
-                        result = res
-                        logger.debug(f"✓ Extracted from 'result' key (string)")
-                
-                if result is None and 'message' in result_data:
-                    msg = result_data['message']
-                    if isinstance(msg, dict) and 'content' in msg and isinstance(msg['content'], list):
-                        if len(msg['content']) > 0 and 'text' in msg['content'][0]:
-                            result = msg['content'][0]['text']
-                            logger.debug(f"✓ Extracted text from message.content[0].text")
-                    elif isinstance(msg, str):
-                        result = msg
-                        logger.debug(f"✓ Extracted from 'message' key (string)")
-            
-            # Fallback: converti tutto a stringa
-            if result is None:
-                logger.warning("Could not extract result, converting entire result_data to string")
-                result = str(result_data) if not isinstance(result_data, str) else result_data
-            
-            # Assicurati che sia una stringa
-            if not isinstance(result, str):
-                logger.error(f"Result is still not a string! Type: {type(result)}")
-                result = json.dumps(result, ensure_ascii=False, indent=2)
-            
-            logger.info(f"Final result: {result[:100]}...")
-            return jsonify({"result": result}), 200
-            
-        elif "text/event-stream" in response.get("contentType", ""):
-            # Gestisci streaming
-            content = []
-            for line in response["response"].iter_lines(chunk_size=1024):
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("data: "):
-                        line_str = line_str[6:]
-                    content.append(line_str)
-            
-            result = "\n".join(content)
-            result_str = str(result)
-            logger.info(f"Success (streaming): {result_str[:100]}...")
-            return jsonify({"result": result}), 200
-        
-        else:
-            logger.warning(f"Unknown contentType: {response.get('contentType')}")
-            return jsonify({"result": str(response)}), 200
+        content_type = response.get("contentType") or ""
+        if "text/event-stream" in content_type and stream:
+            # Streaming end-to-end: ogni frame viene inoltrato appena arriva
+            return Response(
+                stream_with_context(_stream_orchestrator_response(response)),
+                mimetype='text/event-stream',
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+
+        if content_type == "application/json" or "text/event-stream" in content_type:
+            # Decodifica incrementale di JSON o SSE ed estrazione del testo dell'assistente
+            decoded = decode_agent_response(response)
+            logger.info(f"Success ({content_type}, {decoded.bytes_read} bytes): {decoded.text[:100]}...")
+            return jsonify({"result": decoded.text}), 200
+
+        logger.warning(f"Unknown contentType: {content_type}")
+        return jsonify({"result": str(response)}), 200
         
     except Exception as e:
         logger.error(f"Error invoking orchestrator: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 
+# ========================================
+# LIST PARAMS (condivisi da route e /api/batch)
+# ========================================
+
+def _goal_list_params(args):
+    """Payload per la Lambda GoalGet a partire dai query params."""
+    params = {
+        'ambito': args.get('ambito'),
+        'status': args.get('status'),
+        'priorita': args.get('priorita'),
+        'goal_id': args.get('goal_id'),
+        'limit': args.get('limit', '100')
+    }
+    # Rimuovi parametri None
+    return {k: v for k, v in params.items() if v}
+
+
+def _project_list_params(args):
+    """Payload per la Lambda ProjectGet a partire dai query params."""
+    params = {
+        'ambito': args.get('ambito'),
+        'tag': args.get('tag'),
+        'project_id': args.get('project_id'),
+        'limit': args.get('limit', '100')
+    }
+    # Rimuovi parametri None
+    return {k: v for k, v in params.items() if v}
+
+
+def _contact_list_params(args):
+    """Payload per la Lambda ContactGet a partire dai query params."""
+    payload = {}
+    for key in ('nome', 'cognome', 'email', 'tipo', 'dove_conosciuto', 'contact_id'):
+        if args.get(key):
+            payload[key] = args.get(key)
+    limit = args.get('limit', '100')
+    if limit:
+        payload['limit'] = int(limit)
+    return payload
+
+
+def _passthrough_params(args):
+    """Eventi e luoghi inoltrano i query params così come sono."""
+    return dict(args)
+
+
 # ========================================
 # GOALS API
 # ========================================
 
 @app.route('/api/goals', methods=['GET'])
+@cached_response('goals')
 def get_goals():
     """Recupera goals da Lambda"""
     try:
-        # Estrai query params
-        params = {
-            'ambito': request.args.get('ambito'),
-            'status': request.args.get('status'),
-            'priorita': request.args.get('priorita'),
-            'goal_id': request.args.get('goal_id'),
-            'limit': request.args.get('limit', '100')
-        }
-        
-        # Rimuovi parametri None
-        params = {k: v for k, v in params.items() if v}
+        params = _goal_list_params(request.args)
         
         logger.info(f"Getting goals with params: {params}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=GOAL_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(params)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        # Gestisci errori Lambda
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('goal.get', params)
         
     except Exception as e:
         logger.error(f"Error getting goals: {str(e)}")
@@ -420,31 +1125,14 @@ def get_goals():
 
 
 @app.route('/api/goals', methods=['POST'])
+@invalidates('goals')
 def create_goal():
     """Crea un nuovo goal"""
     try:
         data = request.get_json()
         logger.info(f"Creating goal: {data.get('titolo')}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=GOAL_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('goal.post', data)
         
     except Exception as e:
         logger.error(f"Error creating goal: {str(e)}")
@@ -452,6 +1140,7 @@ def create_goal():
 
 
 @app.route('/api/goals', methods=['DELETE'])
+@invalidates('goals')
 def delete_goal():
     """Cancella un goal esistente"""
     try:
@@ -463,37 +1152,7 @@ def delete_goal():
         
         logger.info(f"🗑️ Deleting goal: {goal_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=GOAL_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'goal_id': goal_id})
-        )
-        
-        logger.info(f"Lambda StatusCode: {response['StatusCode']}")
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        logger.info(f"Raw payload: {payload_bytes}")
-        
-        result = json.loads(payload_bytes)
-        logger.info(f"Parsed Lambda response: {result}")
-        
-        # Controlla errori Lambda
-        if response['StatusCode'] != 200:
-            logger.error(f"Lambda invocation failed with status {response['StatusCode']}")
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            logger.info(f"Extracting body from result, type: {type(result['body'])}")
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            status_code = result.get('statusCode', 200)
-            logger.info(f"Returning body with status {status_code}: {body}")
-            return jsonify(body), status_code
-        
-        logger.info(f"Returning direct result: {result}")
-        return jsonify(result), 200
+        return _lambda_response('goal.delete', {'goal_id': goal_id})
         
     except Exception as e:
         logger.error(f"❌ Error deleting goal: {str(e)}", exc_info=True)
@@ -501,6 +1160,7 @@ def delete_goal():
 
 
 @app.route('/api/goals', methods=['PUT'])
+@invalidates('goals')
 def update_goal():
     """Aggiorna un goal esistente"""
     try:
@@ -513,35 +1173,7 @@ def update_goal():
         
         logger.info(f"✏️ Updating goal: {goal_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=GOAL_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        logger.info(f"Lambda StatusCode: {response['StatusCode']}")
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        logger.debug(f"Raw payload: {payload_bytes}")
-        
-        result = json.loads(payload_bytes)
-        logger.info(f"Parsed Lambda response: {result}")
-        
-        # Controlla errori Lambda
-        if response['StatusCode'] != 200:
-            logger.error(f"Lambda invocation failed with status {response['StatusCode']}")
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            status_code = result.get('statusCode', 200)
-            logger.info(f"Returning body with status {status_code}")
-            return jsonify(body), status_code
-        
-        return jsonify(result), 200
+        return _lambda_response('goal.update', data)
         
     except Exception as e:
         logger.error(f"❌ Error updating goal: {str(e)}", exc_info=True)
@@ -549,6 +1181,7 @@ def update_goal():
 
 
 @app.route('/api/goals/search', methods=['GET'])
+@coalesced('goals')
 def search_goal():
     """Cerca un goal per titolo/nome"""
     try:
@@ -573,25 +1206,7 @@ def search_goal():
         if status:
             query_params['status'] = status
         
-        # Invoca Lambda con query parameters
-        response = lambda_client.invoke(
-            FunctionName=GOAL_SEARCH_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(query_params)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('goal.search', query_params)
         
     except Exception as e:
         logger.error(f"Error searching goals: {str(e)}")
@@ -599,6 +1214,7 @@ def search_goal():
 
 
 @app.route('/api/goals/<goal_id>/notes', methods=['POST'])
+@invalidates('goals')
 def add_goal_note(goal_id):
     """Aggiunge una nota a un goal esistente"""
     try:
@@ -619,25 +1235,7 @@ def add_goal_note(goal_id):
             'note_source': note_source
         }
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=GOAL_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(update_payload)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('goal.update', update_payload)
         
     except Exception as e:
         logger.error(f"Error adding note to goal: {str(e)}")
@@ -649,38 +1247,15 @@ def add_goal_note(goal_id):
 # ========================================
 
 @app.route('/api/projects', methods=['GET'])
+@cached_response('projects')
 def get_projects():
     """Recupera projects da Lambda"""
     try:
-        params = {
-            'ambito': request.args.get('ambito'),
-            'tag': request.args.get('tag'),
-            'project_id': request.args.get('project_id'),
-            'limit': request.args.get('limit', '100')
-        }
-        
-        # Rimuovi parametri None
-        params = {k: v for k, v in params.items() if v}
+        params = _project_list_params(request.args)
         
         logger.info(f"Getting projects with params: {params}")
         
-        response = lambda_client.invoke(
-            FunctionName=PROJECT_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(params)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('project.get', params)
         
     except Exception as e:
         logger.error(f"Error getting projects: {str(e)}")
@@ -688,29 +1263,14 @@ def get_projects():
 
 
 @app.route('/api/projects', methods=['POST'])
+@invalidates('projects')
 def create_project():
     """Crea un nuovo project"""
     try:
         data = request.get_json()
         logger.info(f"Creating project: {data.get('titolo')}")
         
-        response = lambda_client.invoke(
-            FunctionName=PROJECT_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        logger.debug(f"Lambda response: {result}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('project.post', data)
         
     except Exception as e:
         logger.error(f"Error creating project: {str(e)}")
@@ -718,6 +1278,7 @@ def create_project():
 
 
 @app.route('/api/projects', methods=['DELETE'])
+@invalidates('projects')
 def delete_project():
     """Cancella un project esistente"""
     try:
@@ -729,37 +1290,7 @@ def delete_project():
         
         logger.info(f"🗑️ Deleting project: {project_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PROJECT_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'project_id': project_id})
-        )
-        
-        logger.info(f"Lambda StatusCode: {response['StatusCode']}")
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        logger.info(f"Raw payload: {payload_bytes}")
-        
-        result = json.loads(payload_bytes)
-        logger.info(f"Parsed Lambda response: {result}")
-        
-        # Controlla errori Lambda
-        if response['StatusCode'] != 200:
-            logger.error(f"Lambda invocation failed with status {response['StatusCode']}")
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            logger.info(f"Extracting body from result, type: {type(result['body'])}")
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            status_code = result.get('statusCode', 200)
-            logger.info(f"Returning body with status {status_code}: {body}")
-            return jsonify(body), status_code
-        
-        logger.info(f"Returning direct result: {result}")
-        return jsonify(result), 200
+        return _lambda_response('project.delete', {'project_id': project_id})
         
     except Exception as e:
         logger.error(f"❌ Error deleting project: {str(e)}", exc_info=True)
@@ -767,6 +1298,7 @@ def delete_project():
 
 
 @app.route('/api/projects', methods=['PUT'])
+@invalidates('projects')
 def update_project():
     """Aggiorna un project esistente"""
     try:
@@ -779,35 +1311,7 @@ def update_project():
         
         logger.info(f"✏️ Updating project: {project_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PROJECT_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        logger.info(f"Lambda StatusCode: {response['StatusCode']}")
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        logger.debug(f"Raw payload: {payload_bytes}")
-        
-        result = json.loads(payload_bytes)
-        logger.info(f"Parsed Lambda response: {result}")
-        
-        # Controlla errori Lambda
-        if response['StatusCode'] != 200:
-            logger.error(f"Lambda invocation failed with status {response['StatusCode']}")
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            status_code = result.get('statusCode', 200)
-            logger.info(f"Returning body with status {status_code}")
-            return jsonify(body), status_code
-        
-        return jsonify(result), 200
+        return _lambda_response('project.update', data)
         
     except Exception as e:
         logger.error(f"❌ Error updating project: {str(e)}", exc_info=True)
@@ -819,59 +1323,15 @@ def update_project():
 # ========================================
 
 @app.route('/api/contacts', methods=['GET'])
+@cached_response('contacts')
 def get_contacts():
     """Recupera contatti con filtri opzionali"""
     try:
-        # Ottieni parametri query
-        nome = request.args.get('nome', '')
-        cognome = request.args.get('cognome', '')
-        email = request.args.get('email', '')
-        tipo = request.args.get('tipo', '')
-        dove_conosciuto = request.args.get('dove_conosciuto', '')
-        contact_id = request.args.get('contact_id', '')
-        limit = request.args.get('limit', '100')
-        
-        # Costruisci payload
-        payload = {}
-        if nome:
-            payload['nome'] = nome
-        if cognome:
-            payload['cognome'] = cognome
-        if email:
-            payload['email'] = email
-        if tipo:
-            payload['tipo'] = tipo
-        if dove_conosciuto:
-            payload['dove_conosciuto'] = dove_conosciuto
-        if contact_id:
-            payload['contact_id'] = contact_id
-        if limit:
-            payload['limit'] = int(limit)
+        payload = _contact_list_params(request.args)
         
         logger.info(f"📖 Getting contacts with filters: {payload}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=CONTACT_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Lambda returned {len(body.get('contacts', []))} contacts")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Lambda returned {len(result.get('contacts', []))} contacts")
-        return jsonify(result), 200
+        return _lambda_response('contact.get', payload)
         
     except Exception as e:
         logger.error(f"❌ Error getting contacts: {str(e)}", exc_info=True)
@@ -879,34 +1339,14 @@ def get_contacts():
 
 
 @app.route('/api/contacts', methods=['POST'])
+@invalidates('contacts')
 def create_contact():
     """Crea un nuovo contatto"""
     try:
         data = request.get_json()
         logger.info(f"➕ Creating contact: {data.get('nome', '')} {data.get('cognome', '')}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=CONTACT_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Contact created: {body.get('contact_id', 'unknown')}")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Contact created: {result.get('contact_id', 'unknown')}")
-        return jsonify(result), 200
+        return _lambda_response('contact.post', data)
         
     except Exception as e:
         logger.error(f"❌ Error creating contact: {str(e)}", exc_info=True)
@@ -914,6 +1354,7 @@ def create_contact():
 
 
 @app.route('/api/contacts', methods=['DELETE'])
+@invalidates('contacts')
 def delete_contact():
     """Elimina un contatto"""
     try:
@@ -925,28 +1366,7 @@ def delete_contact():
         
         logger.info(f"🗑️ Deleting contact: {contact_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=CONTACT_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Contact deleted successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Contact deleted successfully")
-        return jsonify(result), 200
+        return _lambda_response('contact.delete', data)
         
     except Exception as e:
         logger.error(f"❌ Error deleting contact: {str(e)}", exc_info=True)
@@ -954,6 +1374,7 @@ def delete_contact():
 
 
 @app.route('/api/contacts', methods=['PUT'])
+@invalidates('contacts')
 def update_contact():
     """Aggiorna un contatto esistente"""
     try:
@@ -965,28 +1386,7 @@ def update_contact():
         
         logger.info(f"✏️ Updating contact: {contact_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=CONTACT_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Contact updated successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Contact updated successfully")
-        return jsonify(result), 200
+        return _lambda_response('contact.update', data)
         
     except Exception as e:
         logger.error(f"❌ Error updating contact: {str(e)}", exc_info=True)
@@ -998,33 +1398,14 @@ def update_contact():
 # ========================================
 
 @app.route('/api/events', methods=['GET'])
+@cached_response('events')
 def get_events():
     """Recupera eventi con filtri opzionali"""
     try:
         params = request.args.to_dict()
         logger.info(f"📅 Getting events with filters: {params}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=EVENT_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(params)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Found {body.get('count', 0)} events")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('event.get', params)
         
     except Exception as e:
         logger.error(f"❌ Error getting events: {str(e)}", exc_info=True)
@@ -1032,25 +1413,13 @@ def get_events():
 
 
 @app.route('/api/events/<event_id>', methods=['GET'])
+@coalesced('events')
 def get_event(event_id):
     """Recupera un evento specifico"""
     try:
         logger.info(f"📅 Getting event: {event_id}")
         
-        response = lambda_client.invoke(
-            FunctionName=EVENT_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'event_id': event_id})
-        )
-        
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('event.get', {'event_id': event_id})
         
     except Exception as e:
         logger.error(f"❌ Error getting event: {str(e)}", exc_info=True)
@@ -1058,34 +1427,14 @@ def get_event(event_id):
 
 
 @app.route('/api/events', methods=['POST'])
+@invalidates('events')
 def create_event():
     """Crea un nuovo evento"""
     try:
         data = request.get_json()
         logger.info(f"📅 Creating event: {data.get('nome')}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=EVENT_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Event created successfully")
-            return jsonify(body), result.get('statusCode', 201)
-        
-        logger.info(f"Event created successfully")
-        return jsonify(result), 201
+        return _lambda_response('event.post', data, default_status=201)
         
     except Exception as e:
         logger.error(f"❌ Error creating event: {str(e)}", exc_info=True)
@@ -1093,33 +1442,13 @@ def create_event():
 
 
 @app.route('/api/events/<event_id>', methods=['DELETE'])
+@invalidates('events')
 def delete_event(event_id):
     """Elimina un evento"""
     try:
         logger.info(f"📅 Deleting event: {event_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=EVENT_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'event_id': event_id})
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Event deleted successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Event deleted successfully")
-        return jsonify(result), 200
+        return _lambda_response('event.delete', {'event_id': event_id})
         
     except Exception as e:
         logger.error(f"❌ Error deleting event: {str(e)}", exc_info=True)
@@ -1127,6 +1456,7 @@ def delete_event(event_id):
 
 
 @app.route('/api/events/<event_id>', methods=['PUT'])
+@invalidates('events')
 def update_event(event_id):
     """Aggiorna un evento esistente"""
     try:
@@ -1135,28 +1465,7 @@ def update_event(event_id):
         
         logger.info(f"✏️ Updating event: {event_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=EVENT_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Event updated successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Event updated successfully")
-        return jsonify(result), 200
+        return _lambda_response('event.update', data)
         
     except Exception as e:
         logger.error(f"❌ Error updating event: {str(e)}", exc_info=True)
@@ -1168,33 +1477,14 @@ def update_event(event_id):
 # ========================================
 
 @app.route('/api/places', methods=['GET'])
+@cached_response('places')
 def get_places():
     """Recupera luoghi con filtri opzionali"""
     try:
         params = request.args.to_dict()
         logger.info(f"📍 Getting places with filters: {params}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PLACE_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(params)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Found {body.get('count', 0)} places")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('place.get', params)
         
     except Exception as e:
         logger.error(f"❌ Error getting places: {str(e)}", exc_info=True)
@@ -1202,25 +1492,13 @@ def get_places():
 
 
 @app.route('/api/places/<place_id>', methods=['GET'])
+@coalesced('places')
 def get_place(place_id):
     """Recupera un luogo specifico"""
     try:
         logger.info(f"📍 Getting place: {place_id}")
         
-        response = lambda_client.invoke(
-            FunctionName=PLACE_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'place_id': place_id})
-        )
-        
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            return jsonify(body), result.get('statusCode', 200)
-        
-        return jsonify(result), 200
+        return _lambda_response('place.get', {'place_id': place_id})
         
     except Exception as e:
         logger.error(f"❌ Error getting place: {str(e)}", exc_info=True)
@@ -1228,34 +1506,14 @@ def get_place(place_id):
 
 
 @app.route('/api/places', methods=['POST'])
+@invalidates('places')
 def create_place():
     """Crea un nuovo luogo"""
     try:
         data = request.get_json()
         logger.info(f"📍 Creating place: {data.get('nome')}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PLACE_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Place created successfully")
-            return jsonify(body), result.get('statusCode', 201)
-        
-        logger.info(f"Place created successfully")
-        return jsonify(result), 201
+        return _lambda_response('place.post', data, default_status=201)
         
     except Exception as e:
         logger.error(f"❌ Error creating place: {str(e)}", exc_info=True)
@@ -1263,33 +1521,13 @@ def create_place():
 
 
 @app.route('/api/places/<place_id>', methods=['DELETE'])
+@invalidates('places')
 def delete_place(place_id):
     """Elimina un luogo"""
     try:
         logger.info(f"📍 Deleting place: {place_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PLACE_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({'place_id': place_id})
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Place deleted successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Place deleted successfully")
-        return jsonify(result), 200
+        return _lambda_response('place.delete', {'place_id': place_id})
         
     except Exception as e:
         logger.error(f"❌ Error deleting place: {str(e)}", exc_info=True)
@@ -1297,6 +1535,7 @@ def delete_place(place_id):
 
 
 @app.route('/api/places/<place_id>', methods=['PUT'])
+@invalidates('places')
 def update_place(place_id):
     """Aggiorna un luogo esistente"""
     try:
@@ -1305,39 +1544,153 @@ def update_place(place_id):
         
         logger.info(f"✏️ Updating place: {place_id}")
         
-        # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=PLACE_UPDATE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(data)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            logger.info(f"Place updated successfully")
-            return jsonify(body), result.get('statusCode', 200)
-        
-        logger.info(f"Place updated successfully")
-        return jsonify(result), 200
+        return _lambda_response('place.update', data)
         
     except Exception as e:
         logger.error(f"❌ Error updating place: {str(e)}", exc_info=True)
         return jsonify({"error": f"Errore: {str(e)}"}), 500
 
 
+# ========================================
+# BATCH API
+# ========================================
+
+# entity -> (prefisso target Lambda, campo id, builder dei params di lista, status di default per create)
+BATCH_ENTITIES = {
+    'goals': ('goal', 'goal_id', _goal_list_params, 200),
+    'projects': ('project', 'project_id', _project_list_params, 200),
+    'contacts': ('contact', 'contact_id', _contact_list_params, 200),
+    'events': ('event', 'event_id', _passthrough_params, 201),
+    'places': ('place', 'place_id', _passthrough_params, 201),
+}
+BATCH_ACTIONS = ('list', 'get', 'create', 'update', 'delete')
+
+
+def _run_batch_operation(op):
+    """
+    Esegue una singola operazione di /api/batch e ritorna {status, body}.
+    Le letture 'list' passano dalla stessa cache delle route GET.
+    """
+    entity = op.get('entity')
+    action = op.get('action')
+    if entity not in BATCH_ENTITIES:
+        return {'status': 400, 'body': {'error': f"entity non supportata: {entity}"}}
+    if action not in BATCH_ACTIONS:
+        return {'status': 400, 'body': {'error': f"action non supportata: {action}"}}
+
+    prefix, id_field, list_params, create_status = BATCH_ENTITIES[entity]
+    params = op.get('params') or {}
+    data = dict(op.get('data') or {})
+    entity_id = op.get('id') or data.get(id_field) or params.get(id_field)
+
+    if action in ('get', 'update', 'delete') and not entity_id:
+        return {'status': 400, 'body': {'error': f"{id_field} è obbligatorio"}}
+
+    if action == 'list':
+        return _run_batch_list(entity, prefix, list_params, params)
+    elif action == 'get':
+        result = lambda_dispatcher.invoke(f'{prefix}.get', {id_field: entity_id})
+    elif action == 'create':
+        result = lambda_dispatcher.invoke(f'{prefix}.post', data)
+    elif action == 'update':
+        data[id_field] = entity_id
+        result = lambda_dispatcher.invoke(f'{prefix}.update', data)
+    else:
+        result = lambda_dispatcher.invoke(f'{prefix}.delete', {id_field: entity_id})
+
+    if action in ('create', 'update', 'delete'):
+        response_cache.invalidate(entity)
+
+    if not result.ok:
+        return {'status': 500, 'body': {'error': 'Lambda invocation failed'}}
+
+    status = result.status_code or (create_status if action == 'create' else 200)
+    return {'status': status, 'body': result.body}
+
+
+def _run_batch_list(entity, prefix, list_params, params):
+    """
+    Lettura 'list' di /api/batch: usa la stessa cache e gli stessi voli
+    single-flight della GET di lista corrispondente.
+    """
+    key = normalize_params(params)
+    cached = response_cache.get(entity, key)
+    if cached is not None:
+        return {'status': 200, 'body': json.loads(cached), 'cache': 'HIT'}
+
+    generation = response_cache.generation(entity)
+
+    def load():
+        result = lambda_dispatcher.invoke(f'{prefix}.get', list_params(params))
+        if not result.ok:
+            return 500, json.dumps({'error': 'Lambda invocation failed'}).encode('utf-8'), 'application/json'
+        status = result.status_code or 200
+        body = json.dumps(result.body).encode('utf-8')
+        if status == 200:
+            response_cache.set(entity, key, body, generation=generation)
+        return status, body, 'application/json'
+
+    (status, body, _), shared = single_flight.do((entity, 'list', generation, key), load)
+    return {'status': status, 'body': json.loads(body), 'cache': 'COALESCED' if shared else 'MISS'}
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch_operations():
+    """
+    Esegue più operazioni CRUD in parallelo e restituisce i risultati nello stesso ordine.
+
+    Body: {"operations": [{"entity": "goals", "action": "list", "params": {...}},
+                          {"entity": "contacts", "action": "update", "id": "...", "data": {...}}]}
+    """
+    try:
+        data = request.get_json() or {}
+        operations = data.get('operations')
+
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"error": "operations deve essere una lista non vuota"}), 400
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return jsonify({"error": f"Massimo {BATCH_MAX_OPERATIONS} operazioni per batch"}), 400
+
+        logger.info(f"📦 Running batch of {len(operations)} operations")
+        start = time.perf_counter()
+
+        def run(op):
+            if not isinstance(op, dict):
+                return {'status': 400, 'body': {'error': 'operazione non valida'}}
+            try:
+                return _run_batch_operation(op)
+            except Exception as e:
+                logger.error(f"❌ Batch operation failed: {e}", exc_info=True)
+                return {'status': 500, 'body': {'error': f"Errore: {str(e)}"}}
+
+        results = []
+        for index, (op, outcome) in enumerate(zip(operations, batch_executor.map(run, operations))):
+            results.append({
+                'index': index,
+                'entity': op.get('entity') if isinstance(op, dict) else None,
+                'action': op.get('action') if isinstance(op, dict) else None,
+                **outcome
+            })
+
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"✅ Batch completed in {duration_ms}ms")
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'duration_ms': duration_ms
+        }), 200
+
+    except Exception as e:
+        logger.error(f"❌ Error running batch: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Errore: {str(e)}"}), 500
+
+
 # ========================================
 # KNOWLEDGE BASE API ENDPOINTS
 # ========================================
 
 @app.route('/api/kb', methods=['GET'])
+@coalesced('kb')
 def get_kb_documents():
     """Recupera tutti i documenti della Knowledge Base"""
     try:
@@ -1353,22 +1706,13 @@ def get_kb_documents():
             event_payload['queryStringParameters']['tipo'] = tipo
         
         # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=KB_GET_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(event_payload)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
+        result = lambda_dispatcher.invoke('kb.get', event_payload)
         
-        if response['StatusCode'] != 200:
+        if not result.ok:
             return jsonify({"error": "Lambda invocation failed"}), 500
         
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
+        body = result.body
+        if isinstance(body, dict):
             logger.info(f"Retrieved {body.get('count', 0)} KB documents")
             
             # Debug: mostra struttura dei documenti
@@ -1376,10 +1720,8 @@ def get_kb_documents():
                 logger.debug(f"📄 First document structure: {json.dumps(body['documents'][0], indent=2, default=str)}")
                 # Mostra i campi disponibili nel primo documento
                 logger.info(f"📋 Available fields in documents: {list(body['documents'][0].keys()) if body['documents'] else 'No documents'}")
-            
-            return jsonify(body), result.get('statusCode', 200)
         
-        return jsonify(result), 200
+        return jsonify(body), result.status_code or 200
         
     except Exception as e:
         logger.error(f"❌ Error getting KB documents: {str(e)}", exc_info=True)
@@ -1387,6 +1729,7 @@ def get_kb_documents():
 
 
 @app.route('/api/kb', methods=['POST'])
+@invalidates('kb')
 def create_kb_document():
     """Carica un nuovo documento nella Knowledge Base - processa PDF, identifica goal, salva su Qdrant"""
     try:
@@ -1398,8 +1741,17 @@ def create_kb_document():
             collection = request.form.get('collection', 'meetings_notes')
         else:
             collection = (request.get_json() or {}).get('collection', 'meetings_notes')
+        if collection not in KB_COLLECTIONS:
+            return jsonify({"error": f"Collection '{collection}' non abilitata per la KB (KB_COLLECTIONS)"}), 400
+        
+        # Modalità asincrona: il lavoro viene accodato e si risponde subito con un job id
+        if is_form_data:
+            async_flag = request.args.get('async') or request.form.get('async')
+        else:
+            async_flag = request.args.get('async') or (request.get_json() or {}).get('async')
+        async_mode = _is_truthy(async_flag)
         
-        logger.info(f"📚 Creating KB document with collection: {collection}, is_form_data: {is_form_data}")
+        logger.info(f"📚 Creating KB document with collection: {collection}, is_form_data: {is_form_data}, async: {async_mode}")
         
         # Variabili per gestire il testo
         text_content = None
@@ -1424,10 +1776,12 @@ def create_kb_document():
                 # Read file content
                 file_content = file.read()
                 
-                # 1️⃣ ESTRAI TESTO DAL PDF
-                if filename.lower().endswith('.pdf'):
+                # 1️⃣ ESTRAI TESTO DAL PDF (in modalità async lo fa il worker)
+                if filename.lower().endswith('.pdf') and async_mode:
+                    pass
+                elif filename.lower().endswith('.pdf'):
                     try:
-                        text_content = extract_text_from_pdf(file_content)
+                        text_content = _extract_pdf_text(file_content)
                         logger.info(f"✅ PDF text extracted successfully")
                     except Exception as pdf_error:
                         logger.error(f"❌ Failed to extract PDF text: {pdf_error}")
@@ -1450,102 +1804,12 @@ def create_kb_document():
             
             logger.info(f"📚 Creating KB text document from JSON")
         
-        if not text_content:
+        if not text_content and not (async_mode and file_content):
             return jsonify({"error": "No text content provided"}), 400
-        
-        # 2️⃣ IDENTIFICA L'OBIETTIVO DAL TESTO
-        goal_name = identify_goal_from_text(text_content)
-        logger.info(f"🎯 Identified goal: {goal_name}")
 
-        # 2.1️⃣ Estrai aggiornamenti dal testo e aggiorna il goal se presente
-        project_updates = extract_project_updates_from_text(text_content)
-        logger.info(f"🧩 Project updates extracted: {project_updates}")
-
-        if goal_name and goal_name.lower() != "vuoto":
-            update_goal_with_advancements(goal_name, project_updates)
-        
-        # Data odierna
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # Tags di sistema
-        storage_mode = 'parent-child'
-        tags = {
-            'is_parent': False,
-            'storage_mode': storage_mode,
-            'nome_obiettivo': goal_name,
-            'data_odierna': today
-        }
-        logger.info(f"📌 System tags: {tags}")
-        
-        # 3️⃣ PREPARA PAYLOAD PER LAMBDA (DynamoDB + S3) - include tags
-        import base64
-
-        if file_content and filename:
-            # Multipart con file
-            encoder = MultipartEncoder(
-                fields={
-                    'data': (filename, file_content, 'application/pdf'),
-                    'type': tipo,
-                    'tags': json.dumps(tags)
-                }
-            )
-        else:
-            # Multipart con testo
-            encoder = MultipartEncoder(
-                fields={
-                    'data': text_content,
-                    'type': tipo,
-                    'tags': json.dumps(tags)
-                }
-            )
-
-        body_bytes = encoder.to_string()
-        payload = {
-            'body': base64.b64encode(body_bytes).decode('utf-8'),
-            'isBase64Encoded': True,
-            'headers': {
-                'content-type': encoder.content_type
-            }
-        }
-        
-        # 4️⃣ Invoca Lambda (DynamoDB + S3)
-        logger.info(f"📤 Lambda payload content-type: {payload['headers'].get('content-type')}")
-        logger.info(f"📤 Lambda payload body preview (base64): {str(payload['body'])[:200]}")
-        response = lambda_client.invoke(
-            FunctionName=KB_POST_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
-        
-        logger.info(f"📦 Lambda response statusCode: {result.get('statusCode')}, body preview: {str(result.get('body', ''))[:200]}")
-        
-        if response['StatusCode'] != 200:
-            return jsonify({"error": "Lambda invocation failed"}), 500
-        
-        # Estrai body se presente (formato API Gateway)
-        lambda_success = False
-        document_id = None
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            document_id = body.get('document_id')
-            lambda_success = True
-            logger.info(f"✅ KB document created in Lambda with ID: {document_id}")
-        else:
-            body = result
-            document_id = body.get('document_id')
-            lambda_success = True
-        
-        # 5️⃣ Chunking + salvataggio su Qdrant (parent-child)
         if not qdrant_manager:
             return jsonify({"error": "Qdrant not available"}), 503
 
-        # Data odierna
-        today = datetime.now().strftime("%Y-%m-%d")
-
         # Payload aggiuntivo fornito dal client
         if is_form_data:
             extra_payload = _parse_json_field(request.form.get('payload')) or _parse_json_field(request.form.get('metadata')) or {}
@@ -1553,6 +1817,7 @@ def create_kb_document():
             chunk_overlap = int(request.form.get('chunk_overlap', 200))
             provided_chunks = _parse_json_field(request.form.get('chunks'))
             provided_embeddings = _parse_json_field(request.form.get('embeddings'))
+            document_id = request.form.get('document_id')
         else:
             data_json = request.get_json() or {}
             extra_payload = data_json.get('payload') or data_json.get('metadata') or {}
@@ -1560,78 +1825,78 @@ def create_kb_document():
             chunk_overlap = int(data_json.get('chunk_overlap', 200))
             provided_chunks = data_json.get('chunks')
             provided_embeddings = data_json.get('embeddings')
+            document_id = data_json.get('document_id')
+
+        # Re-indicizzazione: solo documenti esistenti (un id sconosciuto verrebbe eliminato dallo sweeper)
+        if document_id and not _kb_document_exists(document_id):
+            return jsonify({"error": "Document not found", "document_id": document_id}), 404
+
+        if async_mode:
+            job_id = kb_job_queue.enqueue('kb_ingestion', {
+                'text_content': text_content,
+                'tipo': tipo,
+                'collection': collection,
+                'filename': filename,
+                'extra_payload': extra_payload,
+                'chunk_size': chunk_size,
+                'chunk_overlap': chunk_overlap,
+                'provided_chunks': provided_chunks,
+                'provided_embeddings': provided_embeddings,
+                'document_id': document_id
+            }, blob=file_content)
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/api/kb/jobs/{job_id}'
+            }), 202
 
-        if not isinstance(extra_payload, dict):
-            extra_payload = {}
-
-        # Prepara chunks
-        chunks = []
-        if isinstance(provided_chunks, list) and provided_chunks:
-            # Usa chunks già forniti
-            for idx, ch in enumerate(provided_chunks):
-                if isinstance(ch, dict):
-                    chunks.append({
-                        'id': ch.get('id', idx),
-                        'text': ch.get('text', ''),
-                        'embedding': ch.get('embedding') or _simple_hash_embedding(ch.get('text', ''), QDRANT_VECTOR_SIZE),
-                        'metadata': ch.get('metadata', {})
-                    })
-        else:
-            # Chunking automatico dal testo
-            text_chunks = chunk_text(text_content, chunk_size=chunk_size, overlap=chunk_overlap)
-            for idx, ch_text in enumerate(text_chunks):
-                if isinstance(provided_embeddings, list) and idx < len(provided_embeddings):
-                    embedding = provided_embeddings[idx]
-                else:
-                    embedding = _simple_hash_embedding(ch_text, QDRANT_VECTOR_SIZE)
-                chunks.append({
-                    'id': idx,
-                    'text': ch_text,
-                    'embedding': embedding
-                })
-
-        # Metadata finale con tags di sistema (già generati sopra)
-        metadata = {
-            **tags,  # Includi i tags già generati: is_parent, storage_mode, nome_obiettivo, data_odierna
-            **extra_payload
-        }
-
-        # Imposta temporaneamente la collection scelta dall'utente
-        original_collection = qdrant_manager.collection_name
-        qdrant_manager.collection_name = collection
-        
         try:
-            # Salva su Qdrant (parent-child mode)
-            qdrant_manager.save_chunks(
-                chunks,
-                metadata,
-                storage_mode=storage_mode,
-                parent_text=text_content,
-                vector_size=QDRANT_VECTOR_SIZE
+            response_body, status_code = run_kb_ingestion(
+                text_content,
+                tipo=tipo,
+                collection=collection,
+                file_content=file_content,
+                filename=filename,
+                extra_payload=extra_payload,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                provided_chunks=provided_chunks,
+                provided_embeddings=provided_embeddings,
+                document_id=document_id
             )
-            logger.info(f"✅ Saved {len(chunks)} chunks to Qdrant collection '{collection}' (mode: {storage_mode}) with tags: {tags}")
-        finally:
-            # Ripristina la collection originale
-            qdrant_manager.collection_name = original_collection
-        
-        # Ritorna successo con metadata aggiuntivi
-        response_body = body.copy() if isinstance(body, dict) else {"result": body}
-        response_body['goal_identified'] = goal_name
-        response_body['date'] = today
-        response_body['tags'] = tags
-        response_body['document_id'] = document_id
-        
+        except StageFailed as e:
+            if e.stage == 'kb_lambda' and isinstance(e.error, LookupError):
+                return jsonify({"error": "Document not found", "document_id": document_id}), 404
+            if e.stage == 'kb_lambda':
+                return jsonify({"error": "Lambda invocation failed"}), 500
+            raise e.error
+
         logger.info(f"🔵 Returning response with tags: {response_body.get('tags')}")
         logger.debug(f"Full response structure: {json.dumps({k: str(v)[:100] if not isinstance(v, (dict, list)) else '...' for k, v in response_body.items()}, indent=2)}")
-        
-        return jsonify(response_body), result.get('statusCode', 201)
+
+        return jsonify(response_body), status_code
         
     except Exception as e:
         logger.error(f"❌ Error creating KB document: {str(e)}", exc_info=True)
         return jsonify({"error": f"Errore: {str(e)}"}), 500
 
 
+@app.route('/api/kb/jobs/<job_id>', methods=['GET'])
+def get_kb_job(job_id):
+    """Stato di un job di ingestion KB asincrono, con avanzamento per stadio"""
+    try:
+        job = kb_job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        logger.error(f"❌ Error getting KB job: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Errore: {str(e)}"}), 500
+
+
 @app.route('/api/kb/<document_id>', methods=['DELETE'])
+@invalidates('kb')
 def delete_kb_document(document_id):
     """Elimina un documento della Knowledge Base"""
     try:
@@ -1645,74 +1910,229 @@ def delete_kb_document(document_id):
         }
         
         # Invoca Lambda
-        response = lambda_client.invoke(
-            FunctionName=KB_DELETE_LAMBDA_ARN,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(event_payload)
-        )
-        
-        # Leggi payload
-        payload_bytes = response['Payload'].read()
-        result = json.loads(payload_bytes)
+        result = lambda_dispatcher.invoke('kb.delete', event_payload)
         
-        if response['StatusCode'] != 200:
+        if not result.ok:
             return jsonify({"error": "Lambda invocation failed"}), 500
         
-        # Estrai body se presente (formato API Gateway)
-        if 'body' in result:
-            body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
-            
-            # Log warning se presente
-            if 'warning' in body:
-                logger.warning(body['warning'])
-            
-            logger.info(f"KB document deleted successfully")
-            return jsonify(body), result.get('statusCode', 200)
+        body = result.body
+        status_code = result.status_code or 200
+        
+        # Eliminazione a cascata dei punti Qdrant (anche se il documento non esiste più su DynamoDB)
+        if status_code in (200, 404) and qdrant_registry:
+            try:
+                with dependency_metrics.track('qdrant', 'delete_document'):
+                    deleted = qdrant_registry.delete_document(document_id, collections=KB_COLLECTIONS)
+                if isinstance(body, dict):
+                    body.pop('warning', None)
+                    body['vectors_deleted'] = deleted
+            except Exception as e:
+                logger.error(f"❌ Error deleting Qdrant points of {document_id}: {e}", exc_info=True)
+                if isinstance(body, dict):
+                    body['warning'] = "⚠️ Embedding su Qdrant non cancellati: verranno rimossi dallo sweeper dei punti orfani."
+        
+        # Log warning se presente
+        if isinstance(body, dict) and 'warning' in body:
+            logger.warning(body['warning'])
         
         logger.info(f"KB document deleted successfully")
-        return jsonify(result), 200
+        return jsonify(body), status_code
         
     except Exception as e:
         logger.info(f"❌ Error deleting KB document: {str(e)}", exc_info=True)
         return jsonify({"error": f"Errore: {str(e)}"}), 500
 
 
+@app.route('/api/kb/orphans/sweep', methods=['POST'])
+def sweep_kb_orphans():
+    """
+    Esegue subito lo sweeper dei punti orfani (eseguito anche in background
+    ogni KB_ORPHAN_SWEEP_INTERVAL secondi). Con `dry_run` conta soltanto.
+    """
+    try:
+        if not kb_orphan_sweeper:
+            return jsonify({"error": "Qdrant not available"}), 503
+        data = request.get_json(silent=True) or {}
+        dry_run = _is_truthy(request.args.get('dry_run') or data.get('dry_run'))
+        with dependency_metrics.track('qdrant', 'orphan_sweep'):
+            stats = kb_orphan_sweeper.sweep(dry_run=dry_run)
+        return jsonify(stats), 200
+
+    except Exception as e:
+        logger.error(f"❌ Error sweeping KB orphans: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Errore: {str(e)}"}), 500
+
+
+def _format_hit(hit):
+    return {'id': hit.id, 'score': hit.score, 'payload': hit.payload}
+
+
+def _format_group(group):
+    parent = group['parent']
+    return {
+        'id': group['id'],
+        'score': group['score'],
+        'parent': {'id': parent.id, 'payload': parent.payload} if parent is not None else None,
+        'chunks': [_format_hit(hit) for hit in group['hits']]
+    }
+
+
+def _search_kb_multi(queries, query_vectors, collections, filter_payload, limit, mode, expand_parents):
+    """
+    Ricerca di più query e/o su più collection: una richiesta batch per
+    collection, collection interrogate in parallelo, risultati uniti con
+    score normalizzati e deduplicati per parent.
+    """
+    if mode != 'dense' and sparse_encoder is None:
+        mode = 'dense'
+    sparse_vectors = [sparse_encoder.encode_query(q) for q in queries] if mode != 'dense' else None
+    if not query_vectors and mode != 'sparse':
+        with dependency_metrics.track('embedding', 'query'):
+            query_vectors = query_embedder.encode_many(queries)
+    children = children_filter() if expand_parents else None
+
+    with dependency_metrics.track('qdrant', f'search_batch_{mode}'):
+        merged = qdrant_registry.search_collections(
+            collections, query_vectors or None, filters=filter_payload, limit=limit,
+            query_filter=children, mode=mode, sparse_vectors=sparse_vectors
+        )
+        parents = {}
+        if expand_parents:
+            by_collection = {}
+            for collection, hit in merged:
+                by_collection.setdefault(collection, []).append(hit)
+            for collection, hits in by_collection.items():
+                for parent_id, record in qdrant_registry.get(collection).retrieve_parents(hits).items():
+                    parents[parent_id] = (collection, record)
+
+    response = {
+        'results': [{**_format_hit(hit), 'collection': collection} for collection, hit in merged],
+        'count': len(merged),
+        'mode': mode,
+        'collections': collections
+    }
+    if expand_parents:
+        response['parents'] = [{'id': record.id, 'payload': record.payload, 'collection': collection}
+                               for collection, record in parents.values()]
+    logger.info(f"✅ Found {len(merged)} results in {len(collections)} collection(s) "
+                f"for {len(queries or query_vectors)} query(ies)")
+    return response
+
+
 @app.route('/api/kb/search', methods=['POST'])
 def search_kb_qdrant():
-    """Cerca nella Knowledge Base usando Qdrant con filtri sul payload"""
+    """
+    Cerca nella Knowledge Base usando Qdrant con filtri sul payload.
+
+    Accetta una query testuale (`query`, embedding calcolato dal server con
+    cache LRU) oppure un `query_vector` già calcolato. Con `expand_parents`
+    (default con `query`) cerca solo tra i chunk e ritorna anche i documenti
+    parent deduplicati, letti con un'unica retrieve.
+
+    `mode` sceglie la ricerca: 'dense' (embedding), 'sparse' (BM25, match
+    esatto di codici e nomi) o 'hybrid' (fusione RRF delle due). Le
+    collection senza vettore sparso ricadono sulla ricerca densa.
+
+    Con `queries` / `query_vectors` (liste) o `collections` esegue più query
+    su più collection in una richiesta batch per collection; i risultati
+    hanno score normalizzati in [0, 1], sono deduplicati per parent e
+    riportano la `collection` di provenienza.
+
+    Con `group_by_document` ritorna i migliori documenti (`documents`), ognuno
+    con il parent, i `group_size` chunk migliori e lo score aggregato secondo
+    `aggregation` ('max', 'sum' o 'count').
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         
         # Estrai parametri
+        query = data.get('query')  # Testo della query
         query_vector = data.get('query_vector')  # Vettore embedding della query
         filter_payload = data.get('filter', {})  # Filtri (es. {"nome_obiettivo": "Obiettivo1"})
         limit = data.get('limit', 10)
-        
-        if not query_vector:
-            return jsonify({"error": "query_vector is required"}), 400
+        collection = data.get('collection') or QDRANT_COLLECTION
+        expand_parents = _is_truthy(data.get('expand_parents'))
+        group_by_document = _is_truthy(data.get('group_by_document'))
+        group_size = int(data.get('group_size', KB_GROUP_SIZE))
+        aggregation = data.get('aggregation') or KB_GROUP_AGGREGATION
+        # Ricerca multipla: più query (varianti) e/o più collection
+        queries = data.get('queries') or ([query] if query else [])
+        query_vectors = data.get('query_vectors') or ([query_vector] if query_vector else [])
+        collections = data.get('collections')
+        multi = bool(data.get('queries') or data.get('query_vectors') or collections)
+        if data.get('expand_parents') is None:
+            expand_parents = bool(queries)
+        mode = data.get('mode') or (KB_SEARCH_MODE if queries else 'dense')
+        
+        if not queries and not query_vectors:
+            return jsonify({"error": "query or query_vector is required"}), 400
+        if not isinstance(queries, list) or not isinstance(query_vectors, list) \
+                or not isinstance(collections or [], list):
+            return jsonify({"error": "queries, query_vectors and collections must be lists"}), 400
+        if mode not in SEARCH_MODES:
+            return jsonify({"error": f"mode must be one of {list(SEARCH_MODES)}"}), 400
+        if mode != 'dense' and not queries:
+            return jsonify({"error": f"mode '{mode}' requires a text query"}), 400
+        if aggregation not in GROUP_AGGREGATIONS:
+            return jsonify({"error": f"aggregation must be one of {list(GROUP_AGGREGATIONS)}"}), 400
+        if group_by_document and multi:
+            return jsonify({"error": "group_by_document supports a single query and collection"}), 400
         
         logger.info(f"🔍 Searching Qdrant with filters: {filter_payload}")
         
         if not qdrant_manager:
             return jsonify({"error": "Qdrant not available"}), 503
         
-        # Cerca su Qdrant usando il manager
-        results = qdrant_manager.search(query_vector, filters=filter_payload, limit=limit)
+        if multi:
+            response = _search_kb_multi(queries, query_vectors, collections or [collection],
+                                        filter_payload, limit, mode, expand_parents)
+            return jsonify(response), 200
+        
+        manager = qdrant_registry.get(collection)
+        if mode != 'dense' and (sparse_encoder is None or not manager.has_sparse_vectors()):
+            logger.warning(f"⚠️ Collection '{collection}' has no sparse vectors, falling back to dense search")
+            mode = 'dense'
+        
+        sparse_vector = sparse_encoder.encode_query(query) if mode != 'dense' else None
+        if not query_vector and mode != 'sparse':
+            with dependency_metrics.track('embedding', 'query'):
+                query_vector = query_embedder.encode(query)
+        
+        # Cerca su Qdrant usando il manager della collection
+        if group_by_document:
+            with dependency_metrics.track('qdrant', f'search_groups_{mode}'):
+                groups = manager.search_groups(query_vector, filters=filter_payload, limit=limit,
+                                               group_size=group_size, aggregation=aggregation,
+                                               mode=mode, sparse_vector=sparse_vector)
+            logger.info(f"✅ Found {len(groups)} documents")
+            return jsonify({
+                'documents': [_format_group(group) for group in groups],
+                'count': len(groups),
+                'mode': mode,
+                'aggregation': aggregation
+            }), 200
+        
+        parents = {}
+        with dependency_metrics.track('qdrant', f'search_{mode}'):
+            if expand_parents:
+                results, parents = manager.search_with_parents(query_vector, filters=filter_payload, limit=limit,
+                                                               mode=mode, sparse_vector=sparse_vector)
+            else:
+                results = manager.search_by_mode(mode, query_vector, sparse_vector,
+                                                 filters=filter_payload, limit=limit)
         
         # Formatta risultati
-        formatted_results = []
-        for hit in results:
-            formatted_results.append({
-                'id': hit.id,
-                'score': hit.score,
-                'payload': hit.payload
-            })
-        
-        logger.info(f"✅ Found {len(formatted_results)} results")
-        return jsonify({
+        formatted_results = [_format_hit(hit) for hit in results]
+        response = {
             'results': formatted_results,
-            'count': len(formatted_results)
-        }), 200
+            'count': len(formatted_results),
+            'mode': mode
+        }
+        if expand_parents:
+            response['parents'] = [{'id': record.id, 'payload': record.payload} for record in parents.values()]
+        
+        logger.info(f"✅ Found {len(formatted_results)} results ({len(parents)} parents)")
+        return jsonify(response), 200
         
     except Exception as e:
         logger.error(f"❌ Error searching KB: {str(e)}", exc_info=True)
@@ -1728,7 +2148,7 @@ if __name__ == '__main__':
     print(f"Server: http://localhost:5000")
     print("=" * 60)
     print("\nEndpoints disponibili:")
-    print("  POST /invoke          - Chat con orchestrator")
+    print("  POST /invoke          - Chat con orchestrator (stream: true per SSE)")
     print("  GET  /api/goals       - Recupera obiettivi")
     print("  POST /api/goals       - Crea obiettivo")
     print("  PUT  /api/goals       - Aggiorna obiettivo")
@@ -1749,6 +2169,13 @@ if __name__ == '__main__':
     print("  POST /api/places      - Crea luogo")
     print("  PUT  /api/places      - Aggiorna luogo")
     print("  DELETE /api/places    - Cancella luogo")
+    print("  POST /api/batch       - Operazioni CRUD multiple in parallelo")
+    print("  GET  /api/cache/stats - Hit/miss della cache delle liste")
+    print("  GET  /api/lambda/stats - Latenze Lambda per target")
+    print("  GET  /metrics         - Metriche Prometheus")
+    print("  POST /api/kb?async=1  - Ingestion KB asincrona (job)")
+    print("  GET  /api/kb/jobs/<id> - Stato job di ingestion KB")
+    print("  POST /api/kb/orphans/sweep - Rimuove i punti Qdrant dei documenti cancellati")
     print("=" * 60)
     
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,124 @@
+"""
+Microbenchmark del decoder delle risposte agente.
+
+Confronta il parsing precedente (lista di stringhe + join / iter_lines) con
+`agent_response.decode_agent_response` su payload con la stessa forma di
+quelli registrati dall'orchestrator: messaggio JSON {"role", "content"} e
+stream SSE di delta JSON. Misura tempo medio e picco di memoria (tracemalloc).
+
+Esegui:
+    python benchmarks/bench_agent_response.py
+    python benchmarks/bench_agent_response.py --sizes 10000 1000000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_response import decode_agent_response
+
+WORD = "avanzamento "
+
+
+class FakeStreamingBody:
+    """Replica minimale di botocore StreamingBody (iter_chunks / iter_lines / iterazione)."""
+
+    def __init__(self, data: bytes, chunk_size: int = 1024):
+        self._data = data
+        self._chunk_size = chunk_size
+
+    def iter_chunks(self, chunk_size=1024):
+        for i in range(0, len(self._data), chunk_size):
+            yield self._data[i:i + chunk_size]
+
+    def iter_lines(self, chunk_size=1024, keepends=False):
+        pending = b''
+        for chunk in self.iter_chunks(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            for line in lines[:-1]:
+                yield line.splitlines(keepends)[0]
+            pending = lines[-1] if lines else b''
+        if pending:
+            yield pending.splitlines(keepends)[0]
+
+    def __iter__(self):
+        return self.iter_chunks(self._chunk_size)
+
+
+def make_json_payload(size: int) -> bytes:
+    text = (WORD * (size // len(WORD) + 1))[:size]
+    return json.dumps({"role": "assistant", "content": [{"text": text}]}).encode('utf-8')
+
+
+def make_sse_payload(size: int, delta_size: int = 24) -> bytes:
+    text = (WORD * (size // len(WORD) + 1))[:size]
+    frames = [f"data: {json.dumps(text[i:i + delta_size])}\n\n" for i in range(0, len(text), delta_size)]
+    return ''.join(frames).encode('utf-8')
+
+
+def legacy_json(response):
+    content = []
+    for chunk in response["response"]:
+        content.append(chunk.decode('utf-8'))
+    data = json.loads(''.join(content))
+    return data["content"][0]["text"]
+
+
+def legacy_sse(response):
+    content = []
+    for line in response["response"].iter_lines(chunk_size=1024):
+        if line:
+            line_str = line.decode("utf-8")
+            if line_str.startswith("data: "):
+                line_str = line_str[6:]
+            content.append(line_str)
+    return "\n".join(content)
+
+
+def measure(func, payload: bytes, content_type: str, repeat: int):
+    """Ritorna (ms medi, picco KiB) per `func` sul payload."""
+    def response():
+        return {"contentType": content_type, "response": FakeStreamingBody(payload)}
+
+    func(response())  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(response())
+    avg_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    func(response())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return avg_ms, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2_000, 50_000, 1_000_000],
+                        help='Dimensioni del testo della risposta in caratteri')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    decoder = lambda r: decode_agent_response(r).text
+    cases = [
+        ('json', 'application/json', make_json_payload, legacy_json),
+        ('sse', 'text/event-stream', make_sse_payload, legacy_sse),
+    ]
+
+    print(f"{'case':<6}{'chars':>10}{'bytes':>11}  {'impl':<8}{'avg ms':>10}{'peak KiB':>12}")
+    for name, content_type, make_payload, legacy in cases:
+        for size in args.sizes:
+            payload = make_payload(size)
+            for impl, func in (('legacy', legacy), ('decoder', decoder)):
+                avg_ms, peak_kib = measure(func, payload, content_type, args.repeat)
+                print(f"{name:<6}{size:>10}{len(payload):>11}  {impl:<8}{avg_ms:>10.2f}{peak_kib:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
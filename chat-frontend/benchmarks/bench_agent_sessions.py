@@ -0,0 +1,89 @@
+"""
+Benchmark della latenza di invocazione degli agenti: sessione fredda vs calda.
+
+Invoca lo stesso agente AgentCore N volte con un runtimeSessionId nuovo a
+ogni chiamata (comportamento precedente, sempre cold start) e poi N volte
+attraverso `RuntimeSessionPool` (sessioni riusate). Misura la latenza fino
+alla risposta completa (body letto e decodificato).
+
+Richiede credenziali AWS valide: le chiamate raggiungono il runtime reale.
+
+Esegui:
+    python benchmarks/bench_agent_sessions.py
+    python benchmarks/bench_agent_sessions.py --agent-arn arn:aws:bedrock-agentcore:... --iterations 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+
+from agent_response import decode_agent_response
+from session_utils import RuntimeSessionPool
+
+DEFAULT_AGENT_ARN = os.getenv(
+    "PROJECT_GOAL_WRITER_READER_ARN",
+    "arn:aws:bedrock-agentcore:us-east-1:879338784410:runtime/project_goal_writer_reader-61UCrz38Qt"
+)
+DEFAULT_PROMPT = (
+    "Analizza il seguente testo e identifica il nome dell'obiettivo principale menzionato.\n"
+    "Rispondi SOLO con il nome dell'obiettivo, oppure con la parola \"vuoto\".\n\n"
+    "Testo:\nRiunione di avanzamento sul progetto di migrazione al cloud."
+)
+
+
+def invoke(client, agent_arn, session_id, prompt):
+    start = time.perf_counter()
+    response = client.invoke_agent_runtime(
+        agentRuntimeArn=agent_arn,
+        runtimeSessionId=session_id,
+        payload=json.dumps({"prompt": prompt}).encode('utf-8')
+    )
+    decode_agent_response(response)
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(f"{label:<6} n={len(samples):<3} min={ordered[0]:8.0f}ms  median={statistics.median(ordered):8.0f}ms  "
+          f"p95={p95:8.0f}ms  max={ordered[-1]:8.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agent-arn', default=DEFAULT_AGENT_ARN)
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--pool-size', type=int, default=1)
+    parser.add_argument('--prompt', default=DEFAULT_PROMPT)
+    args = parser.parse_args()
+
+    client = boto3.client('bedrock-agentcore', region_name=args.region)
+    pool = RuntimeSessionPool(size=args.pool_size)
+
+    cold = [invoke(client, args.agent_arn, str(uuid.uuid4()), args.prompt) for _ in range(args.iterations)]
+
+    warm = []
+    for _ in range(args.iterations + 1):
+        with pool.session(args.agent_arn) as session_id:
+            warm.append(invoke(client, args.agent_arn, session_id, args.prompt))
+    first, warm = warm[0], warm[1:]  # la prima chiamata del pool apre la sessione (fredda)
+
+    print(f"Agent: {args.agent_arn}")
+    summarize('cold', cold)
+    summarize('warm', warm)
+    print(f"first pooled call (cold): {first:.0f}ms")
+    print(f"median speedup: {statistics.median(cold) / statistics.median(warm):.2f}x")
+    print(f"pool stats: {pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark della ricerca filtrata su Qdrant con e senza indici del payload.
+
+Crea una collection temporanea con N punti (payload come quelli scritti da
+QdrantManager: nome_obiettivo, data_odierna, is_parent, storage_mode,
+document_id), misura la latenza delle ricerche filtrate senza indici, crea
+gli indici con `QdrantManager.ensure_payload_indexes` e ripete la misura.
+
+Richiede un server Qdrant locale (la modalità ':memory:' ignora gli indici):
+    docker run -p 6333:6333 qdrant/qdrant
+
+Esegui:
+    python benchmarks/bench_qdrant_payload_index.py
+    python benchmarks/bench_qdrant_payload_index.py --points 200000 --goals 500 --queries 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from qdrant_client.models import DatetimeRange, FieldCondition, Filter, MatchValue
+
+from qdrant_utils import PAYLOAD_INDEXES, QdrantManager, _point
+
+COLLECTION = 'bench_payload_index'
+
+
+def make_batches(n, dim, goals, batch_size, rng):
+    start = date(2025, 1, 1)
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        vectors = rng.standard_normal((size, dim), dtype=np.float32)
+        batch = []
+        for i, vector in enumerate(vectors.tolist()):
+            k = offset + i
+            batch.append(_point(str(uuid.UUID(int=k + 1)), vector, {
+                'text': f'chunk {k}',
+                'nome_obiettivo': f'Obiettivo {k % goals}',
+                'data_odierna': (start + timedelta(days=k % 365)).isoformat(),
+                'is_parent': k % 10 == 0,
+                'storage_mode': 'parent-child',
+                'document_id': f'doc-{k // 50}',
+            }))
+        yield batch
+
+
+def make_filters(goals, rng):
+    goal = f'Obiettivo {int(rng.integers(goals))}'
+    day = date(2025, 1, 1) + timedelta(days=int(rng.integers(330)))
+    return {
+        'goal': Filter(must=[FieldCondition(key='nome_obiettivo', match=MatchValue(value=goal))]),
+        'goal+child': Filter(must=[
+            FieldCondition(key='nome_obiettivo', match=MatchValue(value=goal)),
+            FieldCondition(key='is_parent', match=MatchValue(value=False)),
+        ]),
+        'date range': Filter(must=[
+            FieldCondition(key='data_odierna', range=DatetimeRange(gte=day.isoformat(),
+                                                                   lt=(day + timedelta(days=7)).isoformat())),
+        ]),
+    }
+
+
+def run_queries(client, dim, goals, queries, seed):
+    rng = np.random.default_rng(seed)
+    timings = {}
+    for _ in range(queries):
+        vector = rng.standard_normal(dim, dtype=np.float32).tolist()
+        for name, query_filter in make_filters(goals, rng).items():
+            start = time.perf_counter()
+            if hasattr(client, 'query_points'):
+                client.query_points(COLLECTION, query=vector, query_filter=query_filter, limit=10)
+            else:
+                client.search(COLLECTION, query_vector=vector, query_filter=query_filter, limit=10)
+            timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def wait_green(client, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if str(client.get_collection(COLLECTION).status).lower().endswith('green'):
+            return
+        time.sleep(0.5)
+
+
+def p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6333)
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--goals', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--keep', action='store_true', help='Non eliminare la collection al termine')
+    args = parser.parse_args()
+
+    manager = QdrantManager(args.host, args.port, COLLECTION, payload_indexes={})
+    client = manager.client
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    manager.create_collection(vector_size=args.dim)
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(7)
+    stats = manager.upsert_batches(make_batches(args.points, args.dim, args.goals, 1000, rng), parallel=4, wait=False)
+    wait_green(client)
+    print(f"Loaded {stats['points']} points in {time.perf_counter() - start:.1f}s")
+
+    try:
+        before = run_queries(client, args.dim, args.goals, args.queries, seed=1)
+
+        manager.payload_indexes = dict(PAYLOAD_INDEXES)
+        start = time.perf_counter()
+        created = manager.ensure_payload_indexes(existing=())
+        wait_green(client)
+        print(f"Created indexes {created} in {time.perf_counter() - start:.1f}s")
+
+        after = run_queries(client, args.dim, args.goals, args.queries, seed=1)
+
+        print(f"{'filter':<12} {'p50 no-idx':>11} {'p50 idx':>9} {'p95 no-idx':>11} {'p95 idx':>9} {'speedup':>8}")
+        for name in before:
+            b50, a50 = statistics.median(before[name]), statistics.median(after[name])
+            print(f"{name:<12} {b50:>9.2f}ms {a50:>7.2f}ms {p95(before[name]):>9.2f}ms "
+                  f"{p95(after[name]):>7.2f}ms {b50 / a50:>7.1f}x")
+    finally:
+        if not args.keep:
+            client.delete_collection(COLLECTION)
+
+
+if __name__ == '__main__':
+    main()
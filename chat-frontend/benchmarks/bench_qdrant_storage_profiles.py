@@ -0,0 +1,150 @@
+"""
+Benchmark dei profili di storage delle collection (STORAGE_PROFILES).
+
+Per ogni profilo crea una collection temporanea con `QdrantManager.create_collection`,
+carica N vettori, attende l'indicizzazione e misura:
+  - RAM: stima dei vettori in memoria (originali, quantizzati, grafo HNSW) e,
+    se il server espone `/metrics`, la variazione di `memory_resident_bytes`
+  - latenza p50/p95 di `QdrantManager.search` (con rescoring se quantizzata)
+  - recall@10 rispetto alla ricerca esatta (`SearchParams(exact=True)`)
+
+I vettori sono raggruppati in cluster, come gli embedding di testi reali:
+con vettori uniformi la quantizzazione binaria risulterebbe peggiore del vero.
+
+Richiede un server Qdrant locale (la modalità ':memory:' ignora quantizzazione e HNSW):
+    docker run -p 6333:6333 qdrant/qdrant
+
+Esegui:
+    python benchmarks/bench_qdrant_storage_profiles.py
+    python benchmarks/bench_qdrant_storage_profiles.py --points 200000 --dim 1536 --profiles default scalar binary
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from qdrant_client.models import SearchParams
+
+from qdrant_utils import STORAGE_PROFILES, QdrantManager, _point, storage_profile
+
+COLLECTION = 'bench_storage_profile'
+
+
+def make_vectors(n, dim, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + 0.35 * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimated_ram_mb(profile, n, dim):
+    """RAM dei vettori secondo il profilo (esclusi payload e overhead del server)."""
+    m = profile['m'] or 16
+    ram = 0 if profile['on_disk'] else n * dim * 4
+    if profile['quantization'] == 'scalar':
+        ram += n * dim
+    elif profile['quantization'] == 'binary':
+        ram += n * dim // 8
+    if not profile['hnsw_on_disk']:
+        ram += n * m * 2 * 4  # link del livello 0 (2m vicini da 4 byte)
+    return ram / 2 ** 20
+
+
+def resident_mb(host, port):
+    try:
+        with urllib.request.urlopen(f'http://{host}:{port}/metrics', timeout=5) as response:
+            body = response.read().decode('utf-8')
+    except OSError:
+        return None
+    match = re.search(r'^memory_resident_bytes\s+(\d+)', body, re.MULTILINE)
+    return int(match.group(1)) / 2 ** 20 if match else None
+
+
+def wait_green(client, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if str(client.get_collection(COLLECTION).status).lower().endswith('green'):
+            return
+        time.sleep(0.5)
+
+
+def p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def exact_top(client, queries, k):
+    results = []
+    for vector in queries:
+        hits = client.query_points(COLLECTION, query=vector.tolist(), limit=k,
+                                   search_params=SearchParams(exact=True)).points
+        results.append({hit.id for hit in hits})
+    return results
+
+
+def run_profile(args, name, vectors, queries):
+    manager = QdrantManager(args.host, args.port, COLLECTION, payload_indexes={}, storage_profile=name)
+    client = manager.client
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    baseline = resident_mb(args.host, args.port)
+    manager.create_collection(vector_size=args.dim)
+    try:
+        batches = ([_point(i + 1, vectors[i].tolist(), {'n': i})
+                    for i in range(start, min(start + 1000, len(vectors)))]
+                   for start in range(0, len(vectors), 1000))
+        manager.upsert_batches(batches, parallel=4, wait=False)
+        wait_green(client)
+        time.sleep(2)  # ottimizzatori e quantizzazione completano in background
+        resident = resident_mb(args.host, args.port)
+
+        truth = exact_top(client, queries, 10)
+        timings, recalls = [], []
+        for vector, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = manager.search(vector, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected.intersection(hit.id for hit in hits)) / len(expected))
+        return {
+            'estimated': estimated_ram_mb(storage_profile(name), len(vectors), args.dim),
+            'resident': None if resident is None or baseline is None else resident - baseline,
+            'p50': statistics.median(timings),
+            'p95': p95(timings),
+            'recall': statistics.mean(recalls),
+        }
+    finally:
+        client.delete_collection(COLLECTION)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6333)
+    parser.add_argument('--points', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--clusters', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--profiles', nargs='+', default=list(STORAGE_PROFILES), choices=sorted(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.points, args.dim, args.clusters, seed=7)
+    queries = make_vectors(args.queries, args.dim, args.clusters, seed=7)
+
+    print(f"{args.points} points, dim {args.dim}, {args.queries} queries")
+    print(f"{'profile':<9} {'RAM est.':>9} {'RSS delta':>10} {'p50':>8} {'p95':>8} {'recall@10':>10}")
+    for name in args.profiles:
+        r = run_profile(args, name, vectors, queries)
+        resident = f"{r['resident']:>8.0f}MB" if r['resident'] is not None else f"{'n/a':>10}"
+        print(f"{name:<9} {r['estimated']:>7.0f}MB {resident} {r['p50']:>6.2f}ms {r['p95']:>6.2f}ms "
+              f"{r['recall']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
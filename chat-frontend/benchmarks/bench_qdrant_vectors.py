@@ -0,0 +1,105 @@
+"""
+Benchmark della preparazione dei punti in QdrantManager.save_chunks.
+
+Confronta la versione precedente (media del parent con transpose in puro
+Python e liste di float validate per ogni PointStruct) con
+`qdrant_utils.build_points` (matrice float32 contigua, pooling NumPy,
+conversione unica al confine). Non serve un server Qdrant: viene misurata
+solo la costruzione dei punti, partendo dalla matrice dell'embedder.
+La conversione in liste resta il costo minimo imposto dall'API REST.
+
+Esegui:
+    python benchmarks/bench_qdrant_vectors.py
+    python benchmarks/bench_qdrant_vectors.py --chunks 100 500 1000 --dim 1536 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+from qdrant_utils import build_points, pool_vectors
+
+METADATA = {'nome_obiettivo': 'Progetto AI', 'data_odierna': '2026-02-02', 'tipo': 'meeting-notes'}
+
+
+def legacy_build_points(chunks, metadata, vector_size):
+    """Costruzione dei punti come in save_chunks prima della vettorizzazione (parent-child)."""
+    points = []
+    parent_id = str(uuid.uuid4())
+    parent_text = "\n".join([c.get('text', '') for c in chunks])
+    child_vectors = [c.get('embedding', []) for c in chunks if c.get('embedding')]
+    if child_vectors:
+        parent_vector = [sum(vals) / len(vals) for vals in zip(*child_vectors)]
+    else:
+        parent_vector = [0.0] * vector_size
+    points.append(PointStruct(id=parent_id, vector=parent_vector,
+                              payload={"text": parent_text, "is_parent": True, **metadata}))
+    for i, chunk in enumerate(chunks):
+        payload = {"text": chunk.get('text', ''), "chunk_index": i, "is_parent": False,
+                   "parent_id": parent_id, **metadata}
+        points.append(PointStruct(id=chunk.get('id', i), vector=chunk.get('embedding', []), payload=payload))
+    return points
+
+
+def make_matrix(n, dim):
+    """Matrice float32 come quella prodotta da embedder.encode per un documento di n chunk."""
+    return np.random.default_rng(42).standard_normal((n, dim), dtype=np.float32)
+
+
+def chunks_from_matrix(matrix, as_lists):
+    return [
+        {'id': i, 'text': f'chunk {i} ' * 40, 'embedding': row.tolist() if as_lists else row}
+        for i, row in enumerate(matrix)
+    ]
+
+
+def timed(func, repeat):
+    func()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print("parent pooling = vettore medio dei child; end-to-end = dalla matrice dell'embedder ai PointStruct")
+    print(f"{'chunks':>7}  {'pool legacy':>12}  {'pool numpy':>11}  {'speedup':>8}  "
+          f"{'e2e legacy':>11}  {'e2e numpy':>10}  {'speedup':>8}")
+    for n in args.chunks:
+        matrix = make_matrix(n, args.dim)
+        list_vectors = matrix.tolist()
+
+        pool_legacy = timed(lambda: [sum(vals) / len(vals) for vals in zip(*list_vectors)], args.repeat)
+        pool_numpy = timed(lambda: pool_vectors(matrix), args.repeat)
+
+        # Legacy: embedding convertiti in liste per chunk, poi media in Python e PointStruct validati
+        e2e_legacy = timed(lambda: legacy_build_points(chunks_from_matrix(matrix, True), METADATA, args.dim),
+                           args.repeat)
+        e2e_numpy = timed(lambda: build_points(chunks_from_matrix(matrix, False), METADATA,
+                                               storage_mode='parent-child', vector_size=args.dim), args.repeat)
+
+        # Verifica: stesso vettore parent (a meno di arrotondamenti float32)
+        legacy_parent = np.asarray(legacy_build_points(chunks_from_matrix(matrix, True), METADATA, args.dim)[0].vector)
+        numpy_parent = np.asarray(build_points(chunks_from_matrix(matrix, False), METADATA,
+                                               storage_mode='parent-child', vector_size=args.dim)[0][0].vector)
+        assert np.allclose(legacy_parent, numpy_parent, atol=1e-5), "Parent vectors differ"
+
+        print(f"{n:>7}  {pool_legacy:>10.1f}ms  {pool_numpy:>9.2f}ms  {pool_legacy / pool_numpy:>7.0f}x  "
+              f"{e2e_legacy:>9.1f}ms  {e2e_numpy:>8.1f}ms  {e2e_legacy / e2e_numpy:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark del vector store in-process (`vector_store.EmbeddedVectorStore`).
+
+Per ogni dimensione carica N chunk con payload come quelli di QdrantManager
+(tramite `QdrantManager.upsert_batches`), poi misura:
+  - caricamento (punti/s) e riapertura della collection (replay del log)
+  - latenza p50/p95 della ricerca esatta senza filtri, con filtro su un
+    campo indicizzato (nome_obiettivo) e con filtro non indicizzato
+  - `search_batch` di 16 query (un solo prodotto matrice-matrice)
+
+Non serve un server Qdrant.
+
+Esegui:
+    python benchmarks/bench_vector_store.py
+    python benchmarks/bench_vector_store.py --points 1000 10000 100000 --dim 1536 --queries 50
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from qdrant_utils import QdrantManager, _point
+from vector_store import EmbeddedVectorStore
+
+COLLECTION = 'bench_vector_store'
+
+
+def make_batches(n, dim, goals, rng, batch_size=1000):
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        vectors = rng.standard_normal((size, dim), dtype=np.float32)
+        yield [
+            _point(str(uuid.UUID(int=offset + i + 1)), vector, {
+                'text': f'chunk {offset + i}',
+                'nome_obiettivo': f'Obiettivo {(offset + i) % goals}',
+                'chunk_index': (offset + i) % 20,
+                'is_parent': False,
+                'document_id': f'doc-{(offset + i) // 20}',
+            })
+            for i, vector in enumerate(vectors.tolist())
+        ]
+
+
+def p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def timed(func, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), p95(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--goals', type=int, default=100)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    print(f"dim {args.dim}, {args.queries} queries, exact cosine search")
+    print(f"{'points':>8} {'load':>10} {'reopen':>8} {'p50':>8} {'p95':>8} {'idx p50':>8} {'idx p95':>8} "
+          f"{'scan p50':>9} {'batch16/q':>10}")
+    for n in args.points:
+        path = tempfile.mkdtemp(prefix='bench_vector_store_')
+        try:
+            manager = QdrantManager(collection_name=COLLECTION, client=EmbeddedVectorStore(path))
+            manager.create_collection(vector_size=args.dim)
+            start = time.perf_counter()
+            manager.upsert_batches(make_batches(n, args.dim, args.goals, rng), parallel=1)
+            load = n / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            manager = QdrantManager(collection_name=COLLECTION, client=EmbeddedVectorStore(path))
+            manager.search(queries[0], limit=10)
+            reopen = (time.perf_counter() - start) * 1000
+
+            p50, p95_all = timed(lambda q: manager.search(q, limit=10), queries)
+            idx50, idx95 = timed(lambda q: manager.search(q, filters={'nome_obiettivo': 'Obiettivo 3'}, limit=10),
+                                 queries)
+            scan50, _ = timed(lambda q: manager.search(q, filters={'chunk_index': 3}, limit=10), queries)
+            start = time.perf_counter()
+            for i in range(0, len(queries), 16):
+                manager.search_batch(queries[i:i + 16], limit=10)
+            batch = (time.perf_counter() - start) * 1000 / len(queries)
+
+            print(f"{n:>8} {load:>6.0f} p/s {reopen:>6.0f}ms {p50:>6.2f}ms {p95_all:>6.2f}ms {idx50:>6.2f}ms "
+                  f"{idx95:>6.2f}ms {scan50:>7.2f}ms {batch:>8.2f}ms")
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Utility per il caching in-process delle risposte del backend.
+Fornisce una cache con TTL ed eviction LRU suddivisa in namespace
+(uno per tipo di entità), invalidabile in modo mirato dalle scritture,
+e un livello single-flight che coalizza le letture identiche concorrenti.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Normalizza i parametri di una query in una chiave di cache stabile.
+    I parametri vuoti vengono scartati e le chiavi ordinate.
+
+    Example:
+        >>> normalize_params({'status': 'open', 'ambito': '', 'limit': 100})
+        (('limit', '100'), ('status', 'open'))
+    """
+    if not params:
+        return ()
+    items = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        value = str(value).strip()
+        if value:
+            items.append((str(key), value))
+    return tuple(sorted(items))
+
+
+class ResponseCache:
+    """
+    Cache thread-safe con TTL ed eviction LRU, suddivisa in namespace.
+
+    Ogni namespace ha un contatore di generazione: `invalidate(namespace)`
+    lo incrementa, così una lettura partita prima di una scrittura non può
+    ripopolare la cache con dati vecchi (`set` viene ignorato se la
+    generazione è cambiata nel frattempo).
+
+    Example:
+        >>> cache = ResponseCache(ttl=30, maxsize=256)
+        >>> gen = cache.generation('goals')
+        >>> cache.set('goals', ('status', 'open'), b'[...]', generation=gen)
+        >>> cache.get('goals', ('status', 'open'))
+        b'[...]'
+        >>> cache.invalidate('goals')
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 256):
+        """
+        Args:
+            ttl: Durata di validità di una voce in secondi
+            maxsize: Numero massimo di voci (oltre si rimuove la meno usata)
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, namespace: str) -> int:
+        """Generazione corrente del namespace, da passare a `set`."""
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Ritorna il valore in cache o `default` se assente/scaduto."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get((namespace, key), _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[(namespace, key)]
+                self.misses += 1
+                return default
+            self._data.move_to_end((namespace, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, namespace: str, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Salva un valore. Se `generation` è indicata e il namespace è stato
+        invalidato nel frattempo, il valore viene scartato.
+
+        Returns:
+            bool: True se il valore è stato salvato
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get(namespace, 0):
+                return False
+            self._data[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end((namespace, key))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, *namespaces: str):
+        """Rimuove tutte le voci dei namespace indicati."""
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+                stale = [k for k in self._data if k[0] == namespace]
+                for k in stale:
+                    del self._data[k]
+                self.invalidations += 1
+        logger.debug(f"🧹 Cache invalidated: {namespaces}")
+
+    def namespaces(self) -> Iterable[str]:
+        """Namespace attualmente noti alla cache."""
+        with self._lock:
+            return sorted(set(self._generations) | {k[0] for k in self._data})
+
+    def clear(self):
+        """Svuota la cache (i contatori restano invariati)."""
+        with self._lock:
+            for namespace in {k[0] for k in self._data}:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contatori di hit/miss e dimensione corrente."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
+class _Flight:
+    """Chiamata in corso condivisa da SingleFlight."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalizza le chiamate concorrenti con la stessa chiave in un'unica esecuzione.
+
+    Il primo chiamante (leader) esegue la funzione; quelli che arrivano mentre
+    è in corso attendono e ricevono lo stesso risultato (o la stessa eccezione).
+    Terminata la chiamata la chiave viene rilasciata: non è una cache, le
+    richieste successive eseguono una nuova chiamata.
+
+    Example:
+        >>> flights = SingleFlight()
+        >>> result, shared = flights.do(('goals', params), lambda: invoke_lambda(params))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+        self.max_waiters = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Esegue `func` oppure si aggancia alla chiamata già in corso per `key`.
+
+        Returns:
+            tuple: (risultato, shared) — shared è True se il risultato è stato
+                prodotto dalla chiamata di un altro thread
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.shared += 1
+                self.max_waiters = max(self.max_waiters, flight.waiters)
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.debug(f"🔗 Single-flight {key!r} shared with {flight.waiters} waiters")
+        return flight.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Chiamate eseguite, chiamate coalizzate e voli in corso."""
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'max_waiters': self.max_waiters,
+                'in_flight': len(self._flights)
+            }
@@ -0,0 +1,550 @@
+"""
+Utility per il calcolo degli embedding dei chunk della Knowledge Base.
+Fornisce un'interfaccia di provider con API batch `encode(texts) -> ndarray`,
+un embedder CPU offline in puro NumPy (feature hashing + pesatura TF-IDF),
+una cache persistente su SQLite indirizzata per contenuto, un encoder
+sparso BM25 per la ricerca lessicale e un registry per collegare in seguito
+modelli remoti.
+"""
+
+import functools
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Parole funzionali (italiano e inglese) con peso IDF basso
+STOPWORDS = frozenset("""
+a ad al alla alle allo ai agli all anche che chi ci col come con cui da dal dalla dalle dallo dai dagli
+de del della delle dello dei degli di e ed è era fra gli ha hanno ho i il in la le lo l ma mi ne nei nel
+nella nelle nello negli no non o per più poi può quale quando questo questa questi queste se si sia sono
+su sul sulla sulle sullo sui sugli tra un una uno anche già molto solo tutto tutti
+an and are as at be been but by for from has have in into is it its of on or that the their there these
+they this to was were will with you your we our not
+""".split())
+
+
+class EmbeddingProvider:
+    """
+    Interfaccia dei provider di embedding.
+
+    Le sottoclassi implementano `encode`, che riceve tutti i testi di un
+    documento in una sola chiamata e ritorna una matrice float32 (n, dim).
+    `model_id` identifica in modo stabile modello e parametri: vettori
+    prodotti con model_id diversi non sono confrontabili.
+    """
+
+    name = 'base'
+
+    def __init__(self, dim: int):
+        self.dim = int(dim)
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}-d{self.dim}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode_one(self, text: str) -> np.ndarray:
+        """Embedding di un singolo testo (es. una query)."""
+        return self.encode([text])[0]
+
+
+@functools.lru_cache(maxsize=65536)
+def _hash_feature(feature: str) -> int:
+    # Hash stabile tra processi (hash() di Python è randomizzato)
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HashingEmbedder(EmbeddingProvider):
+    """
+    Embedder offline in puro NumPy.
+
+    Ogni testo viene tokenizzato in unigrammi, bigrammi e prefissi di parola
+    (stemming approssimato). Le feature vengono pesate con TF sublineare
+    (1 + log tf) e un IDF statico (parole funzionali penalizzate), poi
+    proiettate con feature hashing con segno in `dim` componenti, usando
+    `hashes` funzioni hash per ridurre l'effetto delle collisioni. I vettori
+    sono normalizzati L2, quindi adatti alla distanza coseno.
+
+    L'IDF è statico di proposito: un IDF calcolato sul corpus cambierebbe
+    i vettori già indicizzati a ogni nuovo documento.
+
+    Example:
+        >>> embedder = HashingEmbedder(dim=1536)
+        >>> vectors = embedder.encode(['primo chunk', 'secondo chunk'])
+        >>> vectors.shape, vectors.dtype
+        ((2, 1536), dtype('float32'))
+    """
+
+    name = 'hashing-v1'
+
+    def __init__(self, dim: int = 1536, hashes: int = 2, bigram_weight: float = 0.5,
+                 prefix_len: int = 5, prefix_weight: float = 0.5, stopword_weight: float = 0.1):
+        super().__init__(dim)
+        self.hashes = max(1, int(hashes))
+        self.bigram_weight = bigram_weight
+        self.prefix_len = prefix_len
+        self.prefix_weight = prefix_weight
+        self.stopword_weight = stopword_weight
+
+    @property
+    def model_id(self) -> str:
+        return (f"{self.name}-d{self.dim}-h{self.hashes}-b{self.bigram_weight}"
+                f"-p{self.prefix_len}:{self.prefix_weight}-s{self.stopword_weight}")
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = []
+        for token in tokens:
+            weight = self.stopword_weight if token in STOPWORDS else 1.0
+            features.append((token, weight))
+            if self.prefix_len and len(token) > self.prefix_len and token not in STOPWORDS:
+                features.append(('~' + token[:self.prefix_len], self.prefix_weight))
+        if self.bigram_weight:
+            content = [t for t in tokens if t not in STOPWORDS]
+            features.extend((f"{a} {b}", self.bigram_weight) for a, b in zip(content, content[1:]))
+        return features
+
+    def _feature_columns(self, feature: str) -> List[Tuple[int, float]]:
+        h = _hash_feature(feature)
+        columns = []
+        for k in range(self.hashes):
+            bits = (h >> (21 * k)) & 0x1FFFFF
+            columns.append((bits % self.dim, 1.0 if (bits >> 20) & 1 else -1.0))
+        return columns
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        n = len(texts)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        # Vocabolario del batch: ogni feature viene hashata una sola volta
+        vocab: Dict[str, int] = {}
+        base_weights: List[float] = []
+        rows: List[int] = []
+        fids: List[int] = []
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ''):
+                fid = vocab.get(feature)
+                if fid is None:
+                    fid = vocab[feature] = len(base_weights)
+                    base_weights.append(weight)
+                rows.append(row)
+                fids.append(fid)
+
+        vectors = np.zeros((n, self.dim), dtype=np.float32)
+        if not fids:
+            return vectors
+
+        # Term frequency per (riga, feature) in un colpo solo
+        n_features = len(base_weights)
+        pairs, counts = np.unique(np.asarray(rows, dtype=np.int64) * n_features + np.asarray(fids, dtype=np.int64),
+                                  return_counts=True)
+        pair_rows = pairs // n_features
+        pair_fids = pairs % n_features
+        weights = (1.0 + np.log(counts)) * np.asarray(base_weights, dtype=np.float64)[pair_fids]
+
+        # Colonne e segni di ogni feature per ciascuna funzione hash
+        table = np.array([self._feature_columns(f) for f in vocab], dtype=np.float64)  # (V, hashes, 2)
+        flat = np.zeros(n * self.dim, dtype=np.float64)
+        for k in range(self.hashes):
+            cols = table[pair_fids, k, 0].astype(np.int64)
+            signs = table[pair_fids, k, 1]
+            flat += np.bincount(pair_rows * self.dim + cols, weights=weights * signs, minlength=n * self.dim)
+
+        vectors[:] = flat.reshape(n, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+# ========== VETTORI SPARSI (BM25) ==========
+
+class BM25Encoder:
+    """
+    Vettori sparsi lessicali per la ricerca ibrida.
+
+    Ogni token (parole intere, minuscole, senza parole funzionali) è mappato
+    su un indice uint32 stabile; il valore è la componente TF di BM25 con
+    saturazione `k1` e normalizzazione sulla lunghezza `b`. L'IDF è
+    calcolato da Qdrant sulla collection (modifier IDF del vettore sparso),
+    quindi resta corretto man mano che la collection cresce. Nomi propri,
+    codici progetto e titoli degli obiettivi restano così ricercabili anche
+    quando la similarità densa li confonde.
+
+    Example:
+        >>> bm25 = BM25Encoder()
+        >>> indices, values = bm25.encode_documents(['Riunione PRJ-2291 con Giulia'])[0]
+        >>> query = bm25.encode_query('PRJ-2291')
+    """
+
+    name = 'bm25-v1'
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_len: float = 256.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_len = avg_len
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}-k{self.k1}-b{self.b}-l{self.avg_len}"
+
+    def _token_ids(self, text: str) -> List[int]:
+        return [_hash_feature(t) & 0xFFFFFFFF for t in _TOKEN_RE.findall((text or '').lower())
+                if t not in STOPWORDS]
+
+    def encode_documents(self, texts: Sequence[str]) -> List[Tuple[List[int], List[float]]]:
+        """Vettori sparsi (indici ordinati, pesi TF BM25) dei testi da indicizzare."""
+        vectors = []
+        for text in texts:
+            ids = self._token_ids(text)
+            counts = Counter(ids)
+            norm = self.k1 * (1.0 - self.b + self.b * len(ids) / self.avg_len)
+            indices = sorted(counts)
+            vectors.append((indices, [counts[i] * (self.k1 + 1.0) / (counts[i] + norm) for i in indices]))
+        return vectors
+
+    def encode_query(self, text: str) -> Tuple[List[int], List[float]]:
+        """Vettore sparso della query: ogni token distinto con peso 1 (l'IDF lo applica Qdrant)."""
+        indices = sorted(set(self._token_ids(text)))
+        return indices, [1.0] * len(indices)
+
+
+# ========== CACHE PERSISTENTE ==========
+
+# Limite prudente di parametri per query (SQLITE_MAX_VARIABLE_NUMBER era 999 prima della 3.32)
+_SQL_BATCH = 500
+
+
+def embedding_key(model_id: str, text: str) -> bytes:
+    """Chiave content-addressed: hash di modello e testo (testi uguali = stessa chiave)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_id.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """
+    Cache su disco degli embedding, indicizzata per hash(model_id, testo).
+
+    I vettori sono salvati come BLOB float32; le letture e le scritture di
+    un documento avvengono in un'unica transazione. Oltre `max_entries`
+    vengono rimosse le voci usate meno di recente, scendendo fino al 90%
+    del limite per non ripetere l'eviction a ogni inserimento.
+
+    Example:
+        >>> cache = EmbeddingCache('embeddings.sqlite3', max_entries=100000)
+        >>> found = cache.get_many(embedder.model_id, ['primo chunk'])
+        >>> cache.put_many(embedder.model_id, ['primo chunk'], vectors)
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 100000):
+        """
+        Args:
+            db_path: Percorso del database SQLite
+            max_entries: Numero massimo di vettori conservati (0 = illimitato)
+        """
+        self.db_path = db_path
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    model_id TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_used_at)")
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_id: str, texts: Sequence[str]) -> Dict[int, np.ndarray]:
+        """
+        Cerca gli embedding dei testi.
+
+        Returns:
+            dict: indice del testo -> vettore float32, solo per i testi trovati
+        """
+        keys = [embedding_key(model_id, t or '') for t in texts]
+        rows: Dict[bytes, Tuple[int, bytes]] = {}
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for start in range(0, len(keys), _SQL_BATCH):
+                    part = keys[start:start + _SQL_BATCH]
+                    marks = ','.join('?' * len(part))
+                    for key, dim, blob in self._conn.execute(
+                            f"SELECT key, dim, vector FROM embeddings WHERE key IN ({marks})", part):
+                        rows[key] = (dim, blob)
+                    # Aggiorna l'ordine LRU delle voci trovate
+                    self._conn.execute(f"UPDATE embeddings SET last_used_at = ? WHERE key IN ({marks})",
+                                       [now, *part])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            found = {}
+            for i, key in enumerate(keys):
+                row = rows.get(key)
+                if row is not None:
+                    found[i] = np.frombuffer(row[1], dtype=np.float32, count=row[0])
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(keys) - len(found)
+        return found
+
+    def put_many(self, model_id: str, texts: Sequence[str], vectors: np.ndarray):
+        """Salva gli embedding (una riga di `vectors` per testo) ed esegue l'eviction se serve."""
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        now = time.time()
+        records = [
+            (embedding_key(model_id, t or ''), model_id, matrix.shape[1], matrix[i].tobytes(), now, now)
+            for i, t in enumerate(texts)
+        ]
+        if not records:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, model_id, dim, vector, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", records
+                )
+                inserted = self._conn.total_changes - before
+                evicted = 0
+                if self.max_entries and self._entries + inserted > self.max_entries:
+                    target = int(self.max_entries * 0.9)
+                    evicted = self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_used_at LIMIT ?)",
+                        (self._entries + inserted - target,)
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._entries += inserted - evicted
+            self._stats['writes'] += inserted
+            self._stats['evictions'] += evicted
+        if evicted:
+            logger.info(f"🧹 Embedding cache: evicted {evicted} entries")
+
+    def clear(self, model_id: Optional[str] = None):
+        """Svuota la cache (di un modello o tutta)."""
+        with self._lock:
+            if model_id is None:
+                self._conn.execute("DELETE FROM embeddings")
+            else:
+                self._conn.execute("DELETE FROM embeddings WHERE model_id = ?", (model_id,))
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss, hit rate, scritture, eviction e voci presenti."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': self._entries,
+                'max_entries': self.max_entries,
+            }
+
+
+class CachedEmbedder(EmbeddingProvider):
+    """
+    Provider che consulta la cache prima di delegare al provider reale.
+
+    Solo i testi mai visti (deduplicati anche all'interno del batch) arrivano
+    a `provider.encode`, sempre in un'unica chiamata. Il `model_id` fa parte
+    della chiave, quindi cambiare modello o parametri non riusa vettori
+    incompatibili.
+
+    Example:
+        >>> embedder = CachedEmbedder(HashingEmbedder(dim=1536), EmbeddingCache('emb.sqlite3'))
+        >>> vectors = embedder.encode(['primo chunk', 'secondo chunk'])
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache: EmbeddingCache):
+        super().__init__(provider.dim)
+        self.provider = provider
+        self.cache = cache
+        self.name = provider.name
+
+    @property
+    def model_id(self) -> str:
+        return self.provider.model_id
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        n = len(texts)
+        vectors = np.zeros((n, self.dim), dtype=np.float32)
+        if n == 0:
+            return vectors
+
+        model_id = self.model_id
+        unique: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            unique.setdefault(text or '', []).append(i)
+        distinct = list(unique)
+
+        found = self.cache.get_many(model_id, distinct)
+        missing = [t for j, t in enumerate(distinct) if j not in found]
+        for j, vector in found.items():
+            vectors[unique[distinct[j]]] = vector
+
+        if missing:
+            computed = self.provider.encode(missing)
+            for text, vector in zip(missing, computed):
+                vectors[unique[text]] = vector
+            self.cache.put_many(model_id, missing, computed)
+        logger.debug(f"🧮 Embedding cache: {len(found)} hit, {len(missing)} computed ({n} texts)")
+        return vectors
+
+
+class QueryEmbedder:
+    """
+    Embedding delle query di ricerca con cache LRU in memoria.
+
+    Le query ripetute (stessa ricerca da più utenti, paginazione, retry)
+    non ricalcolano l'embedding. La chiave è il testo con spazi normalizzati;
+    i vettori in cache sono in sola lettura.
+
+    Example:
+        >>> queries = QueryEmbedder(embedder, maxsize=1024)
+        >>> vector = queries.encode('stato del progetto migrazione cloud')
+        >>> vectors = queries.encode_many(['budget cloud', 'rischi migrazione'])
+    """
+
+    def __init__(self, provider: EmbeddingProvider, maxsize: int = 1024):
+        self.provider = provider
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def encode(self, query: str) -> np.ndarray:
+        return self.encode_many([query])[0]
+
+    def encode_many(self, queries: Sequence[str]) -> List[np.ndarray]:
+        """
+        Vettori di più query, nello stesso ordine: quelle in cache senza
+        chiamare il provider, le altre (senza duplicati) con un'unica
+        chiamata batch.
+        """
+        keys = [(self.provider.model_id, ' '.join((query or '').split())) for query in queries]
+        vectors: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing: Dict[Tuple[str, str], List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._data.get(key)
+                if vector is not None:
+                    self._data.move_to_end(key)
+                    self._stats['hits'] += 1
+                    vectors[i] = vector
+                elif key in missing:
+                    self._stats['hits'] += 1
+                    missing[key].append(i)
+                else:
+                    self._stats['misses'] += 1
+                    missing[key] = [i]
+        if not missing:
+            return vectors
+
+        texts = [key[1] for key in missing]
+        matrix = np.asarray(self.provider.encode(texts), dtype=np.float32).reshape(len(texts), -1)
+        with self._lock:
+            for row, (key, rows) in zip(matrix, missing.items()):
+                vector = row.copy()
+                vector.flags.writeable = False
+                for i in rows:
+                    vectors[i] = vector
+                self._data[key] = vector
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+# ========== REGISTRY DEI PROVIDER ==========
+
+_PROVIDERS: Dict[str, Callable[..., EmbeddingProvider]] = {
+    'hashing': HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[..., EmbeddingProvider]):
+    """
+    Registra un provider (es. un modello remoto) selezionabile con `create_embedder`.
+
+    Example:
+        >>> register_embedder('titan', lambda dim, **kw: TitanEmbedder(dim=dim, **kw))
+    """
+    _PROVIDERS[name] = factory
+
+
+def create_embedder(name: str = 'hashing', dim: int = 1536, **kwargs) -> EmbeddingProvider:
+    """Crea il provider registrato con `name`."""
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}'. Available: {sorted(_PROVIDERS)}")
+    embedder = _PROVIDERS[name](dim=dim, **kwargs)
+    logger.info(f"🧮 Embedding provider: {embedder.model_id}")
+    return embedder
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Similarità coseno tra due vettori."""
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / denom if denom else 0.0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    embedder = create_embedder('hashing', dim=1536)
+    docs = [
+        "Riunione sul progetto di migrazione al cloud: completata la fase di analisi.",
+        "Il progetto migrazione cloud ha completato l'analisi dei requisiti.",
+        "Ricetta della torta di mele con cannella.",
+    ]
+    vectors = embedder.encode(docs)
+    print(f"Shape: {vectors.shape}, dtype: {vectors.dtype}")
+    for i in range(1, len(docs)):
+        print(f"sim(0, {i}) = {cosine_similarity(vectors[0], vectors[i]):.3f}  ({docs[i][:40]}...)")
+    if not math.isclose(float(np.linalg.norm(vectors[0])), 1.0, rel_tol=1e-5):
+        raise SystemExit("Vectors are not normalized")
@@ -0,0 +1,289 @@
+"""
+Utility per job asincroni persistenti.
+Fornisce una coda di job su SQLite svuotata da worker in background,
+con stato e avanzamento per stadio interrogabili tramite id.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    Coda di job persistente su SQLite con worker in background.
+
+    Più processi (es. worker gunicorn) possono condividere lo stesso database:
+    ogni job 'running' ha un owner e un lease rinnovato da un heartbeat. Un job
+    viene ripreso da un altro worker solo se il lease è scaduto (processo morto),
+    mai mentre il suo owner lo sta ancora eseguendo. L'handler riceve un callback
+    `report(stage, status, info=None)` per pubblicare l'avanzamento e può salvare
+    con `checkpoint` i risultati da non ripetere in caso di ripresa.
+
+    Example:
+        >>> def handler(job_id, payload, blob, report):
+        ...     report('work', 'running')
+        ...     return {'ok': True}
+        >>> queue = JobQueue('jobs.sqlite3', handler, workers=2)
+        >>> queue.start()
+        >>> job_id = queue.enqueue('kb_ingestion', {'text': '...'})
+        >>> queue.get(job_id)['status']
+        'queued'
+    """
+
+    def __init__(self, db_path: str, handler: Callable[..., Any], workers: int = 2,
+                 poll_interval: float = 1.0, lease_timeout: float = 60.0):
+        """
+        Args:
+            db_path: Percorso del database SQLite
+            handler: Callable(job_id, payload, blob, report) -> risultato serializzabile
+            workers: Numero di worker concorrenti
+            poll_interval: Secondi di attesa massima tra due controlli della coda
+            lease_timeout: Secondi senza heartbeat dopo i quali un job 'running'
+                è considerato interrotto e può essere ripreso
+        """
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._started = False
+        self._stopping = False
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    blob BLOB,
+                    stages TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            # Database creati prima dei lease
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if 'owner' not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if 'heartbeat_at' not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    def start(self):
+        """
+        Avvia i worker e l'heartbeat (idempotente).
+
+        I job interrotti non vengono rimessi in coda qui: i worker riprendono
+        quelli con il lease scaduto, così i job di altri processi vivi restano ai loro owner.
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f"✅ Job queue started with {self.workers} workers ({self.db_path}, owner {self.owner})")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ferma i worker al termine del job corrente."""
+        self._stopping = True
+        self._stop_event.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], blob: Optional[bytes] = None) -> str:
+        """
+        Inserisce un job in coda.
+
+        Args:
+            kind: Tipo di job (informativo)
+            payload: Parametri JSON-serializzabili del job
+            blob: Dati binari opzionali (es. contenuto del file caricato)
+
+        Returns:
+            str: Id del job
+        """
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, blob, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, json.dumps(payload), blob, time.time())
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"📥 Enqueued job {job_id} ({kind})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Ritorna stato, avanzamento per stadio e risultato di un job (None se non esiste)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, stages, result, error, attempts, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            position = None
+            if row is not None and row['status'] == JOB_QUEUED:
+                position = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                    (JOB_QUEUED, row['created_at'])
+                ).fetchone()[0]
+        if row is None:
+            return None
+        job = {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'stages': json.loads(row['stages']),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+        if position is not None:
+            job['queue_position'] = position
+        return job
+
+    def checkpoint(self, job_id: str, **values: Any):
+        """
+        Salva valori nel payload del job: se il job viene ripreso dopo un crash
+        l'handler li ritrova nel payload e può saltare il lavoro già fatto.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            payload = json.loads(row['payload'])
+            payload.update(values)
+            self._conn.execute(
+                "UPDATE jobs SET payload = ? WHERE id = ?",
+                (json.dumps(payload, default=str), job_id)
+            )
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        # BEGIN IMMEDIATE prende il lock in scrittura del database: tra più processi
+        # un solo worker alla volta sceglie e marca il prossimo job
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, owner, payload, blob FROM jobs "
+                    "WHERE status = ? OR (status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, now - self.lease_timeout)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, started_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (JOB_RUNNING, self.owner, now, now, row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is not None and row['status'] == JOB_RUNNING:
+            logger.warning(f"♻️ Resuming job {row['id']} (lease of {row['owner']} expired)")
+        return row
+
+    def _heartbeat_loop(self):
+        interval = max(self.lease_timeout / 3, 0.1)
+        while not self._stop_event.wait(interval):
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?",
+                        (time.time(), JOB_RUNNING, self.owner)
+                    )
+            except Exception as e:
+                logger.error(f"❌ Error renewing job leases: {e}", exc_info=True)
+
+    def _report(self, job_id: str, stage: str, status: str, info: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            row = self._conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row['stages']) if row else {}
+            entry = stages.get(stage, {})
+            entry['status'] = status
+            entry['updated_at'] = time.time()
+            if info:
+                entry.update(info)
+            stages[stage] = entry
+            self._conn.execute("UPDATE jobs SET stages = ? WHERE id = ?", (json.dumps(stages, default=str), job_id))
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            # Solo se il lease è ancora nostro: altrimenti il job è già stato ripreso altrove
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, blob = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(),
+                 job_id, self.owner)
+            ).rowcount
+        if not updated:
+            logger.warning(f"⚠️ Job {job_id} was taken over by another worker, result discarded")
+
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                row = self._claim()
+            except Exception as e:
+                logger.error(f"❌ Error claiming job: {e}", exc_info=True)
+                row = None
+
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            job_id = row['id']
+            logger.info(f"⚙️ Running job {job_id}")
+
+            def report(stage, status, info=None, _job_id=job_id):
+                self._report(_job_id, stage, status, info)
+
+            try:
+                result = self.handler(job_id, json.loads(row['payload']), row['blob'], report)
+                self._finish(job_id, JOB_SUCCEEDED, result=result)
+                logger.info(f"✅ Job {job_id} succeeded")
+            except Exception as e:
+                logger.error(f"❌ Job {job_id} failed: {e}", exc_info=True)
+                self._finish(job_id, JOB_FAILED, error=str(e))
@@ -0,0 +1,170 @@
+"""
+Utility per l'invocazione delle Lambda del backend.
+Fornisce un dispatcher unico con client botocore ottimizzato (pool di
+connessioni ampio, keep-alive, retry adattivi, timeout), decodifica della
+risposta in un solo passaggio e latenze per target.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LambdaResult:
+    """
+    Risultato decodificato di un'invocazione Lambda.
+    """
+    target: str
+    invoke_status: int          # StatusCode dell'invocazione (200 se la Lambda è stata eseguita)
+    status_code: Optional[int]  # statusCode restituito dalla Lambda (formato API Gateway), se presente
+    body: Any                   # body già decodificato (dict/list) o il payload grezzo
+    function_error: Optional[str] = None
+    duration_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True se l'invocazione è andata a buon fine (indipendentemente dallo statusCode applicativo)."""
+        return self.invoke_status == 200 and not self.function_error
+
+
+class LambdaDispatcher:
+    """
+    Dispatcher verso una tabella di route `nome -> ARN Lambda`.
+
+    Tutte le route condividono un unico client botocore thread-safe,
+    configurato per il traffico concorrente del frontend.
+
+    Example:
+        >>> dispatcher = LambdaDispatcher({'goal.get': GOAL_GET_LAMBDA_ARN}, region='us-east-1')
+        >>> result = dispatcher.invoke('goal.get', {'status': 'open'})
+        >>> result.status_code, result.body
+        (200, {'goals': [...], 'count': 3})
+    """
+
+    def __init__(self, routes: Dict[str, str], region: str = 'us-east-1',
+                 max_pool_connections: int = 50, connect_timeout: float = 3.0,
+                 read_timeout: float = 60.0, max_attempts: int = 3, client=None, metrics=None):
+        """
+        Args:
+            routes: Tabella `nome target -> ARN` della Lambda
+            region: Regione AWS
+            max_pool_connections: Connessioni HTTP mantenute nel pool (default botocore: 10)
+            connect_timeout: Timeout di connessione in secondi
+            read_timeout: Timeout di lettura in secondi
+            max_attempts: Tentativi totali con retry mode 'adaptive'
+            client: Client Lambda già costruito (opzionale, es. per i test)
+            metrics: DependencyMetrics opzionale su cui registrare latenze ed errori
+        """
+        self.routes = dict(routes)
+        self.client = client or boto3.client(
+            'lambda',
+            region_name=region,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                tcp_keepalive=True,
+                retries={'total_max_attempts': max_attempts, 'mode': 'adaptive'}
+            )
+        )
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def arn(self, target: str) -> str:
+        """Risolve un nome target (o un ARN diretto) nell'ARN della Lambda."""
+        if target in self.routes:
+            return self.routes[target]
+        if target.startswith('arn:'):
+            return target
+        raise KeyError(f"Unknown Lambda target: {target}")
+
+    def invoke(self, target: str, payload: Any) -> LambdaResult:
+        """
+        Invoca la Lambda in modalità RequestResponse e decodifica la risposta.
+
+        Il Payload viene letto e deserializzato una sola volta; se contiene un
+        `body` in formato API Gateway (stringa JSON o dict) viene estratto.
+
+        Args:
+            target: Nome della route (es. 'goal.get') o ARN
+            payload: Evento da inviare (serializzato in JSON se non è già str/bytes)
+
+        Returns:
+            LambdaResult
+        """
+        arn = self.arn(target)
+        data = payload if isinstance(payload, (str, bytes)) else json.dumps(payload)
+        if self.metrics is None:
+            return self._invoke(target, arn, data)
+        with self.metrics.track('lambda', target) as call:
+            lambda_result = self._invoke(target, arn, data)
+            if not lambda_result.ok:
+                call.fail()
+            return lambda_result
+
+    def _invoke(self, target: str, arn: str, data: Any) -> LambdaResult:
+        start = time.perf_counter()
+        lambda_result = None
+        error = True
+        try:
+            response = self.client.invoke(
+                FunctionName=arn,
+                InvocationType='RequestResponse',
+                Payload=data
+            )
+            raw = response['Payload'].read()
+            result = json.loads(raw) if raw else None
+            status_code = None
+            body = result
+            if isinstance(result, dict) and 'body' in result:
+                status_code = result.get('statusCode')
+                body = json.loads(result['body']) if isinstance(result['body'], str) else result['body']
+            lambda_result = LambdaResult(
+                target=target,
+                invoke_status=response['StatusCode'],
+                status_code=status_code,
+                body=body,
+                function_error=response.get('FunctionError')
+            )
+            error = not lambda_result.ok
+            return lambda_result
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._record(target, duration_ms, error)
+            if lambda_result is not None:
+                lambda_result.duration_ms = round(duration_ms, 2)
+            logger.debug(f"λ {target} completed in {duration_ms:.1f}ms")
+
+    def _record(self, target: str, duration_ms: float, error: bool):
+        with self._lock:
+            stats = self._stats.setdefault(target, {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0
+            })
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            if error:
+                stats['errors'] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Latenze per target: count, errors, avg_ms, max_ms."""
+        with self._lock:
+            return {
+                target: {
+                    'count': s['count'],
+                    'errors': s['errors'],
+                    'avg_ms': round(s['total_ms'] / s['count'], 2) if s['count'] else 0.0,
+                    'max_ms': round(s['max_ms'], 2)
+                }
+                for target, s in self._stats.items()
+            }
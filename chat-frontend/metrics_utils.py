@@ -0,0 +1,276 @@
+"""
+Utility per le metriche del backend in formato Prometheus (text exposition 0.0.4).
+Fornisce counter, gauge e histogram con label, un registry che li espone su
+/metrics e un helper per misurare latenza, errori e richieste in corso delle
+dipendenze esterne (Lambda, agenti Bedrock, Qdrant, estrazione PDF).
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket di default in secondi (come prometheus_client) estesi per le chiamate agli agenti
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1 KiB .. 64 MiB
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base comune: nome, help, label e valori per combinazione di label."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(v) for v in labels)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contatore monotono. `inc(*labels, amount=1)`."""
+
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        lines.extend(f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items)
+        return lines
+
+
+class Gauge(_Metric):
+    """Valore che sale e scende (es. richieste in corso)."""
+
+    kind = 'gauge'
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        lines.extend(f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in items)
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Istogramma a bucket fissi. `observe` costa una bisect e tre somme sotto lock;
+    i conteggi cumulativi vengono calcolati solo in `render`.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, *labels: str, value: float):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [conteggi per bucket (+Inf in coda), somma, conteggio]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self._values.items())
+        lines = self._header()
+        bounds = self.buckets + (math.inf,)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(bounds, counts):
+                cumulative += c
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registry delle metriche esposte su /metrics.
+
+    Example:
+        >>> registry = MetricsRegistry()
+        >>> hits = registry.counter('cache_hits_total', 'Cache hits', ['namespace'])
+        >>> hits.inc('goals')
+        >>> print(registry.render())
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """
+        Registra una funzione letta a ogni scrape, per esporre valori già
+        contati altrove (es. statistiche della cache). Deve ritornare tuple
+        (name, type, help, labels, value).
+        """
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        """Serializza tutte le metriche nel formato testuale di Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # I campioni dei collector vengono raggruppati per nome (una famiglia contigua per metrica)
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for func in self._collectors:
+            try:
+                samples = list(func())
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector error: {e}")
+                continue
+            for name, kind, documentation, labels, value in samples:
+                family = families.setdefault(name, (kind, documentation, []))
+                family[2].append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}')
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f'# HELP {name} {_escape(documentation)}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class _Tracking:
+    """Handle di `DependencyMetrics.track`: permette di marcare come errore una chiamata riuscita."""
+
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+class DependencyMetrics:
+    """
+    Latenza, errori e chiamate in corso per ogni dipendenza esterna.
+
+    Example:
+        >>> deps = DependencyMetrics(registry, prefix='backend')
+        >>> with deps.track('lambda', 'goal.get') as call:
+        ...     result = invoke()
+        ...     if not result.ok:
+        ...         call.fail()
+    """
+
+    def __init__(self, registry: MetricsRegistry, prefix: str = 'backend'):
+        self.duration = registry.histogram(
+            f'{prefix}_dependency_duration_seconds',
+            'Latency of calls to external dependencies',
+            ['dependency', 'operation']
+        )
+        self.errors = registry.counter(
+            f'{prefix}_dependency_errors_total',
+            'Failed calls to external dependencies',
+            ['dependency', 'operation']
+        )
+        self.in_flight = registry.gauge(
+            f'{prefix}_dependency_in_flight',
+            'Calls to external dependencies currently in progress',
+            ['dependency']
+        )
+
+    @contextmanager
+    def track(self, dependency: str, operation: str) -> Iterator[_Tracking]:
+        call = _Tracking()
+        self.in_flight.inc(dependency)
+        start = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            self.in_flight.dec(dependency)
+            self.duration.observe(dependency, operation, value=time.perf_counter() - start)
+            if call.failed:
+                self.errors.inc(dependency, operation)
@@ -0,0 +1,161 @@
+"""
+Utility per eseguire pipeline a stadi con dipendenze.
+Gli stadi indipendenti vengono eseguiti in parallelo su un thread pool e
+per ogni stadio viene registrato il tempo di esecuzione.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageFailed(Exception):
+    """Sollevata quando uno stadio della pipeline fallisce."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class StagePipeline:
+    """
+    Grafo di stadi eseguito in modo concorrente.
+
+    Ogni stadio riceve come argomenti posizionali i risultati delle sue
+    dipendenze, nell'ordine in cui sono dichiarate. Uno stadio parte appena
+    tutte le sue dipendenze sono completate, quindi la latenza totale è
+    limitata dal ramo più lento invece che dalla somma degli stadi.
+
+    Example:
+        >>> pipeline = StagePipeline(executor)
+        >>> pipeline.add('a', lambda: 1)
+        >>> pipeline.add('b', lambda: 2)
+        >>> pipeline.add('sum', lambda a, b: a + b, deps=['a', 'b'])
+        >>> pipeline.run()['sum']
+        3
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, name: str = 'pipeline',
+                 listener: Optional[Callable[[str, str, Optional[Dict[str, Any]]], None]] = None):
+        """
+        Args:
+            executor: Thread pool condiviso su cui eseguire gli stadi
+            name: Nome della pipeline (usato nei log)
+            listener: Callback opzionale (stage, status, info) invocato quando
+                uno stadio parte ('running'), termina ('succeeded'), fallisce
+                ('failed') o viene saltato ('skipped')
+        """
+        self.executor = executor
+        self.name = name
+        self.listener = listener
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.total_ms: Optional[float] = None
+
+    def add(self, name: str, func: Callable[..., Any], deps: Iterable[str] = ()) -> 'StagePipeline':
+        """
+        Aggiunge uno stadio alla pipeline.
+
+        Args:
+            name: Nome univoco dello stadio
+            func: Callable che riceve i risultati delle dipendenze
+            deps: Nomi degli stadi da cui dipende (devono essere già aggiunti)
+        """
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already defined")
+        deps = list(deps)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = {'func': func, 'deps': deps}
+        return self
+
+    def _notify(self, stage: str, status: str, info: Optional[Dict[str, Any]] = None):
+        if self.listener is None:
+            return
+        try:
+            self.listener(stage, status, info)
+        except Exception as e:
+            logger.warning(f"⚠️ [{self.name}] Stage listener error: {e}")
+
+    def _timed(self, name: str, func: Callable[..., Any], args: List[Any], t0: float):
+        start = time.perf_counter()
+        self._notify(name, 'running')
+        status = 'failed'
+        try:
+            result = func(*args)
+            status = 'succeeded'
+            return result
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = {
+                'start_ms': round((start - t0) * 1000, 2),
+                'duration_ms': round((end - start) * 1000, 2),
+                'thread': threading.current_thread().name
+            }
+            self._notify(name, status, {'duration_ms': self.timings[name]['duration_ms']})
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Esegue tutti gli stadi rispettando le dipendenze.
+
+        Returns:
+            dict: Risultato di ogni stadio indicizzato per nome
+
+        Raises:
+            StageFailed: Se uno stadio solleva un'eccezione. Gli stadi già in
+                esecuzione vengono attesi, quelli non ancora partiti non
+                vengono avviati.
+        """
+        t0 = time.perf_counter()
+        results: Dict[str, Any] = {}
+        pending = dict(self._stages)
+        running = {}
+        failure: Optional[StageFailed] = None
+
+        while pending or running:
+            if failure is None:
+                ready = [n for n, s in pending.items() if all(d in results for d in s['deps'])]
+                for name in ready:
+                    stage = pending.pop(name)
+                    args = [results[d] for d in stage['deps']]
+                    future = self.executor.submit(self._timed, name, stage['func'], args, t0)
+                    running[future] = name
+            elif pending:
+                logger.warning(f"⏭️ [{self.name}] Skipping stages after failure: {list(pending)}")
+                for name in pending:
+                    self._notify(name, 'skipped')
+                pending.clear()
+
+            if not running:
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ [{self.name}] Stage '{name}' failed: {e}")
+                    if failure is None:
+                        failure = StageFailed(name, e)
+
+        self.total_ms = round((time.perf_counter() - t0) * 1000, 2)
+        if failure is not None:
+            raise failure
+
+        summary = ', '.join(f"{n}={t['duration_ms']}ms" for n, t in self.timings.items())
+        logger.info(f"⏱️ [{self.name}] Completed in {self.total_ms}ms ({summary})")
+        return results
+
+    def timing_report(self) -> Dict[str, Any]:
+        """Ritorna i tempi per stadio e il tempo totale in un dict serializzabile."""
+        return {
+            'total_ms': self.total_ms,
+            'stages': dict(self.timings)
+        }
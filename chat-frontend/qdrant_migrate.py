@@ -0,0 +1,508 @@
+"""
+Comandi di migrazione per le collection Qdrant della Knowledge Base.
+
+Esegui:
+    python qdrant_migrate.py indexes                       # tutte le collection
+    python qdrant_migrate.py indexes --collection meetings_notes documents
+    python qdrant_migrate.py --host localhost --port 6333 indexes --dry-run
+
+    # Copia in una nuova collection (profilo, distanza, vettori sparsi) e sposta l'alias
+    python qdrant_migrate.py reindex --source meetings_notes_v1 --target meetings_notes_v2 \
+        --profile scalar --alias meetings_notes
+    # Ricalcola gli embedding con un altro provider/dimensione (riprende dal checkpoint se interrotto)
+    python qdrant_migrate.py reindex --source meetings_notes_v2 --target meetings_notes_v3 \
+        --provider hashing --dim 768 --alias meetings_notes
+    python qdrant_migrate.py alias meetings_notes meetings_notes_v2   # rollback
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from qdrant_client.models import (
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation, Distance,
+    FieldCondition, Filter, IsEmptyCondition, MatchValue, PayloadField
+)
+
+from embedding_utils import BM25Encoder, CachedEmbedder, EmbeddingCache, create_embedder
+from qdrant_utils import (
+    SPARSE_VECTOR_NAME, QdrantManager, QdrantRegistry, _index_types, _point, _schema_name, as_sparse_vector,
+    build_filter, normalize_rows, point_hash, pool_vectors
+)
+
+logger = logging.getLogger(__name__)
+
+# Documenti (parent) per pagina quando gli embedding vengono ricalcolati e nella fase di sync
+DOCUMENTS_PER_PAGE = 64
+# Il backend tiene in cache i metadata delle collection per nome (CollectionCache)
+ALIAS_CACHE_NOTE = ("note: running backends keep collection metadata cached by name for "
+                    "QDRANT_COLLECTION_CACHE_TTL seconds; restart them if the vector size or sparse vectors changed")
+
+
+def _collections(registry, names):
+    if names:
+        return names
+    return sorted(c.name for c in registry.client.get_collections().collections)
+
+
+def cmd_indexes(registry, args):
+    """Crea gli indici del payload mancanti (e ricrea quelli di tipo diverso) sulle collection esistenti."""
+    for name in _collections(registry, args.collection):
+        manager = registry.get(name)
+        existing = _index_types(registry.client.get_collection(name).payload_schema)
+        missing = [f for f in manager.payload_indexes if f not in existing]
+        wrong_type = [f for f, schema in manager.payload_indexes.items()
+                      if existing.get(f) not in (None, _schema_name(schema))]
+        if args.dry_run:
+            print(f"{name}: missing indexes {missing}, wrong type {wrong_type}")
+            continue
+        created = manager.ensure_payload_indexes(existing=existing)
+        registry.invalidate(name)
+        print(f"{name}: created {created}" if created else f"{name}: up to date")
+    return 0
+
+
+def _parents_filter():
+    return Filter(must=[FieldCondition(key='is_parent', match=MatchValue(value=True))])
+
+
+def _standalone_filter():
+    """Punti che non sono né parent né chunk di un parent (modalità 'fixed', upload precedenti)."""
+    return Filter(must=[IsEmptyCondition(is_empty=PayloadField(key='parent_id'))],
+                  must_not=[FieldCondition(key='is_parent', match=MatchValue(value=True))])
+
+
+def _split_vector(vector):
+    """(vettore denso, vettore sparso BM25 o None) di un record letto con with_vectors."""
+    if isinstance(vector, dict):
+        return vector.get(''), vector.get(SPARSE_VECTOR_NAME)
+    return vector, None
+
+
+def _read_ahead(pages, enabled=True):
+    """Legge la pagina successiva dello scroll mentre quella corrente viene elaborata."""
+    if not enabled:
+        yield from pages
+        return
+    iterator = iter(pages)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='qdrant-scroll') as executor:
+        future = executor.submit(next, iterator, None)
+        while True:
+            page = future.result()
+            if page is None:
+                return
+            future = executor.submit(next, iterator, None)
+            yield page
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """Scrittura atomica: un crash a metà lascia il checkpoint precedente."""
+    state['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def swap_alias(client, alias, collection, drop_collection=False, before_swap=None):
+    """
+    Punta `alias` su `collection`.
+
+    Spostare un alias esistente è un'unica operazione atomica. Se invece
+    esiste una collection (non un alias) con il nome dell'alias va eliminata
+    prima (`drop_collection`, prima migrazione di una collection creata senza
+    alias) e delete e creazione dell'alias sono due chiamate: nel frattempo
+    le scritture falliscono e il backend può ricreare una collection vera
+    con quel nome. Le ingestion vanno quindi fermate prima.
+
+    `before_swap` (es. la sync finale della re-indicizzazione) viene eseguito
+    subito prima della modifica, per ridurre la finestra in cui una scrittura
+    sulla vecchia collection va persa.
+
+    Returns:
+        La collection su cui puntava l'alias (None se non esisteva)
+    """
+    current = {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+    operations = []
+    dropped = False
+    if alias in current:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        if not drop_collection:
+            raise ValueError(f"'{alias}' is a collection, not an alias: pass --drop-source to replace it")
+        dropped = True
+    if before_swap is not None:
+        before_swap()
+    if dropped:
+        logger.warning(f"⚠️ Deleting collection '{alias}' to create the alias")
+        client.delete_collection(alias)
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=alias)))
+    try:
+        client.update_collection_aliases(change_aliases_operations=operations)
+    except Exception:
+        if dropped:
+            logger.error(f"❌ Collection '{alias}' deleted but alias not created (a collection with that name "
+                         f"was probably re-created): stop the writers, delete it and run "
+                         f"`qdrant_migrate.py alias {alias} {collection} --drop-collection`")
+        raise
+    logger.info(f"🔀 Alias '{alias}' -> '{collection}' (was: {current.get(alias)})")
+    return current.get(alias)
+
+
+class CollectionReindexer:
+    """
+    Copia una collection in una nuova collection, opzionalmente ricalcolando
+    gli embedding, a pagine di scroll con un checkpoint dopo ogni pagina.
+
+    Fasi:
+      - copy: senza `embedder` scroll di tutti i punti, vettori copiati (BM25
+        calcolato se la destinazione lo prevede e la sorgente no); con
+        `embedder` solo i punti senza parent, ri-embeddati in batch
+      - documents: solo con `embedder`; per ogni pagina di parent i chunk
+        vengono ri-embeddati in un unico batch e il vettore del parent è il
+        pooling dei nuovi vettori, come in ingestion
+      - sync: ricopia i documenti aggiunti o re-indicizzati durante la copia
+        (id dei punti o impronte del payload diversi) ed elimina quelli
+        cancellati; i punti senza `document_id` sono allineati uno per uno
+
+    Gli id dei punti sono conservati, quindi ripetere una pagina dopo
+    un'interruzione è idempotente. Con gli embedding ricalcolati anche
+    `point_hash` viene ricalcolato come in ingestion: la successiva
+    re-indicizzazione incrementale di un documento invariato resta un no-op.
+    """
+
+    def __init__(self, registry, source, target, embedder=None, vector_size=None, distance=None,
+                 profile=None, sparse=None, page_size=1000, batch_size=256, parallel=4,
+                 parent_pooling='mean', normalize=False, checkpoint_path=None):
+        self.registry = registry
+        self.source = registry.get(source)
+        self.source_info = self.source.collection_info()
+        if self.source_info is None:
+            raise ValueError(f"Source collection '{source}' does not exist")
+        if embedder is None and vector_size and vector_size != self.source_info['vector_size']:
+            raise ValueError("Changing the vector size requires re-embedding (--provider)")
+        self.embedder = embedder
+        self.vector_size = embedder.dim if embedder is not None else self.source_info['vector_size']
+        self.distance = distance or self.source_info['distance']
+        self.sparse = self.source_info['sparse'] if sparse is None else sparse
+        self.sparse_encoder = BM25Encoder() if self.sparse else None
+        self.target = QdrantManager(
+            registry.host, registry.port, target, client=registry.client, collections=registry.collections,
+            payload_indexes=registry.payload_indexes, sparse_vectors=self.sparse,
+            storage_profile=profile or registry.storage_profile
+        )
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.parent_pooling = parent_pooling
+        self.normalize = normalize
+        self.checkpoint_path = checkpoint_path or f".reindex_{source}_{target}.json"
+        self.state = None
+
+    def _settings(self):
+        return {
+            'source': self.source.collection_name,
+            'target': self.target.collection_name,
+            'embedder': self.embedder.model_id if self.embedder is not None else None,
+            'vector_size': self.vector_size,
+            'sparse': self.sparse,
+        }
+
+    def _start(self, restart):
+        state = None if restart else load_checkpoint(self.checkpoint_path)
+        if state is not None:
+            if state['settings'] != self._settings():
+                raise ValueError(f"Checkpoint {self.checkpoint_path} was written with different settings "
+                                 f"{state['settings']}: use --restart")
+            logger.info(f"♻️ Resuming from {self.checkpoint_path}: phase {state['phase']}, {state['points']} points")
+            return state
+        if self.target.collection_info() is not None:
+            if not restart:
+                raise ValueError(f"Target collection '{self.target.collection_name}' already exists: "
+                                 f"use --restart to recreate it")
+            self.registry.client.delete_collection(self.target.collection_name)
+            self.registry.invalidate(self.target.collection_name)
+        self.target.create_collection(vector_size=self.vector_size, distance=self.distance)
+        self._copy_payload_indexes()
+        return {'settings': self._settings(), 'phase': 'copy', 'offset': None, 'points': 0, 'pages': 0,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    def _copy_payload_indexes(self):
+        """Indici del payload della sorgente non previsti da PAYLOAD_INDEXES."""
+        schema = self.registry.client.get_collection(self.source.collection_name).payload_schema or {}
+        existing = set(self.target.collection_info()['indexes'])
+        for field, info in schema.items():
+            if field not in existing and getattr(info, 'data_type', None) is not None:
+                self.registry.client.create_payload_index(
+                    collection_name=self.target.collection_name, field_name=field, field_schema=info.data_type
+                )
+
+    def _checkpoint(self, **changes):
+        self.state.update(changes)
+        save_checkpoint(self.checkpoint_path, self.state)
+
+    def _upsert(self, points):
+        if not points:
+            return
+        batches = (points[i:i + self.batch_size] for i in range(0, len(points), self.batch_size))
+        # wait=False con barriera finale: al ritorno la pagina è applicata e il checkpoint è sicuro
+        self.target.upsert_batches(batches, parallel=self.parallel, wait=False)
+
+    def _point(self, record, vector, sparse_vector=None):
+        payload = dict(record.payload or {})
+        if self.embedder is not None and 'point_hash' in payload:
+            if 'content_hash' in payload:
+                payload['point_hash'] = point_hash(vector, payload['content_hash'], sparse_vector)
+            else:
+                # Impronta di formato precedente: il prossimo upload riscrive il punto
+                del payload['point_hash']
+        vector = vector.tolist() if isinstance(vector, np.ndarray) else vector
+        if sparse_vector is not None:
+            vector = {'': vector, SPARSE_VECTOR_NAME: as_sparse_vector(sparse_vector)}
+        return _point(record.id, vector, payload)
+
+    def _copy(self, records):
+        """Punti con i vettori della sorgente; BM25 ricalcolato solo per i chunk che non lo hanno."""
+        vectors = [_split_vector(r.vector) for r in records]
+        sparse_vectors = [sparse if self.sparse else None for _, sparse in vectors]
+        if self.sparse:
+            missing = [i for i, r in enumerate(records)
+                       if sparse_vectors[i] is None and not (r.payload or {}).get('is_parent')]
+            texts = [(records[i].payload or {}).get('text', '') for i in missing]
+            for i, encoded in zip(missing, self.sparse_encoder.encode_documents(texts)):
+                sparse_vectors[i] = encoded
+        return [self._point(r, dense, sparse) for r, (dense, _), sparse in zip(records, vectors, sparse_vectors)]
+
+    def _embed(self, records, parents=()):
+        """
+        Punti con embedding ricalcolati in un unico batch; i `parents` ricevono
+        il pooling dei propri chunk (ordinati per `chunk_index`, come in ingestion).
+        """
+        texts = [(r.payload or {}).get('text', '') for r in records]
+        matrix = np.array(self.embedder.encode(texts), dtype=np.float32).reshape(len(records), self.vector_size)
+        if self.normalize:
+            normalize_rows(matrix)
+        sparse_vectors = self.sparse_encoder.encode_documents(texts) if self.sparse else [None] * len(records)
+        points = [self._point(r, matrix[i], sparse_vectors[i]) for i, r in enumerate(records)]
+
+        rows = {}
+        for i, record in enumerate(records):
+            rows.setdefault((record.payload or {}).get('parent_id'), []).append(i)
+        for parent in parents:
+            chunk_rows = sorted(rows.get(str(parent.id), []), key=lambda i: records[i].payload.get('chunk_index', 0))
+            if chunk_rows:
+                weights = [len(texts[i]) for i in chunk_rows] if self.parent_pooling == 'weighted' else None
+                vector = pool_vectors(matrix[chunk_rows], weights=weights, normalize=self.normalize)
+            else:
+                vector = np.zeros(self.vector_size, dtype=np.float32)
+            points.append(self._point(parent, vector))
+        return points
+
+    def _documents(self, parents):
+        """Parent e relativi chunk (letti dalla sorgente senza vettori) con embedding ricalcolati."""
+        if not parents:
+            return []
+        chunks = []
+        children = build_filter({'parent_id': [str(p.id) for p in parents]})
+        for records, _ in self.source.scroll_pages(self.page_size, scroll_filter=children):
+            chunks.extend(records)
+        return self._embed(chunks, parents)
+
+    def _run_phase(self, phase, scroll_filter, transform, page_size):
+        pages = self.source.scroll_pages(page_size, scroll_filter=scroll_filter, offset=self.state['offset'],
+                                         with_vectors=self.embedder is None)
+        for records, offset in _read_ahead(pages, enabled=not self.source._is_local_client()):
+            points = transform(records)
+            self._upsert(points)
+            self._checkpoint(offset=offset, points=self.state['points'] + len(points), pages=self.state['pages'] + 1)
+            logger.info(f"📦 {phase}: {self.state['points']} points ({self.state['pages']} pages)")
+
+    def _legacy(self, ids):
+        """
+        Punti senza `document_id` riletti per id. Con `embedder` un parent o un
+        chunk modificato fa ricalcolare l'intero gruppo (parent e chunk).
+        """
+        def retrieve(point_ids):
+            return self.source.client.retrieve(collection_name=self.source.collection_name, ids=list(point_ids),
+                                               with_payload=True, with_vectors=self.embedder is None)
+
+        records = retrieve(ids)
+        if self.embedder is None:
+            return self._copy(records)
+        standalone = [r for r in records if not r.payload.get('is_parent') and not r.payload.get('parent_id')]
+        parent_ids = {r.id for r in records if r.payload.get('is_parent')}
+        parent_ids.update(r.payload['parent_id'] for r in records if r.payload.get('parent_id'))
+        points = self._embed(standalone) if standalone else []
+        return points + self._documents(retrieve(parent_ids) if parent_ids else [])
+
+    def _sync(self):
+        """
+        Allinea la destinazione alle modifiche fatte nella sorgente durante la copia.
+
+        Per ogni `document_id` confronta id e impronte del payload dei punti
+        (`point_fingerprints`, indipendenti dai vettori): un documento diverso
+        viene ricopiato per intero, perché il vettore del parent dipende da
+        tutti i chunk. I punti senza `document_id` sono confrontati uno per uno.
+        """
+        source_docs = self.source.point_fingerprints(self.page_size)
+        target_docs = self.target.point_fingerprints(self.page_size)
+        changed = [d for d, points in source_docs.items() if d is not None and target_docs.get(d) != points]
+        removed = [d for d in target_docs if d is not None and d not in source_docs]
+        source_legacy, target_legacy = source_docs.get(None, {}), target_docs.get(None, {})
+        legacy_changed = [i for i, fingerprint in source_legacy.items() if target_legacy.get(i) != fingerprint]
+        legacy_removed = [i for i in target_legacy if i not in source_legacy]
+        # Prima le eliminazioni: un id passato da un documento all'altro viene poi riscritto
+        if legacy_removed:
+            self.target.delete_points(legacy_removed, batch_size=self.batch_size)
+        if changed or removed:
+            self.target.delete_documents(changed + removed, batch_size=self.batch_size)
+        for start in range(0, len(changed), DOCUMENTS_PER_PAGE):
+            documents = {'document_id': changed[start:start + DOCUMENTS_PER_PAGE]}
+            if self.embedder is None:
+                phases = [(build_filter(documents), self._copy)]
+            else:
+                phases = [(build_filter(documents, _standalone_filter()), self._embed),
+                          (build_filter(documents, _parents_filter()), self._documents)]
+            for scroll_filter, transform in phases:
+                for records, _ in self.source.scroll_pages(self.page_size, scroll_filter=scroll_filter,
+                                                           with_vectors=self.embedder is None):
+                    self._upsert(transform(records))
+        for start in range(0, len(legacy_changed), self.page_size):
+            self._upsert(self._legacy(legacy_changed[start:start + self.page_size]))
+        logger.info(f"🔁 sync: {len(changed)} documents re-copied, {len(removed)} removed, "
+                    f"{len(legacy_changed)}/{len(legacy_removed)} points without document_id re-copied/removed")
+        return {'changed': len(changed), 'removed': len(removed),
+                'legacy_changed': len(legacy_changed), 'legacy_removed': len(legacy_removed)}
+
+    def run(self, restart=False):
+        """
+        Esegue (o riprende dal checkpoint) la re-indicizzazione.
+
+        Returns:
+            dict: Punti scritti, documenti sincronizzati, conteggi finali e durata
+        """
+        start = time.perf_counter()
+        self.state = self._start(restart)
+        stats = {}
+        if self.state['phase'] == 'copy':
+            if self.embedder is None:
+                self._run_phase('copy', None, self._copy, self.page_size)
+            else:
+                self._run_phase('copy', _standalone_filter(), self._embed, self.page_size)
+            self._checkpoint(phase='documents' if self.embedder is not None else 'sync', offset=None)
+        if self.state['phase'] == 'documents':
+            self._run_phase('documents', _parents_filter(), self._documents, DOCUMENTS_PER_PAGE)
+            self._checkpoint(phase='sync', offset=None)
+        if self.state['phase'] == 'sync':
+            stats['sync'] = self._sync()
+            self._checkpoint(phase='done', offset=None)
+        stats.update({
+            'points': self.state['points'],
+            'source_count': self.source.count(),
+            'target_count': self.target.count(),
+            'seconds': round(time.perf_counter() - start, 2),
+        })
+        return stats
+
+
+def cmd_reindex(registry, args):
+    """Re-indicizza una collection in una nuova collection e sposta l'alias."""
+    embedder = None
+    if args.provider:
+        embedder = create_embedder(args.provider, dim=args.dim or registry.get(args.source).collection_info()['vector_size'])
+        if args.embedding_cache:
+            embedder = CachedEmbedder(embedder, EmbeddingCache(args.embedding_cache))
+    reindexer = CollectionReindexer(
+        registry, args.source, args.target, embedder=embedder, vector_size=args.dim,
+        distance=Distance(args.distance) if args.distance else None, profile=args.profile, sparse=args.sparse,
+        page_size=args.page_size, batch_size=args.batch_size, parallel=args.parallel,
+        parent_pooling=args.parent_pooling, normalize=args.normalize, checkpoint_path=args.checkpoint
+    )
+    stats = reindexer.run(restart=args.restart)
+    print(f"{args.source} -> {args.target}: {stats['points']} points copied, "
+          f"{stats.get('sync', {}).get('changed', 0)} documents re-synced in {stats['seconds']}s "
+          f"(source {stats['source_count']}, target {stats['target_count']} points)")
+    if args.alias:
+        # Ultima sync subito prima dello swap: recupera le scritture arrivate dopo la fase sync
+        previous = swap_alias(registry.client, args.alias, args.target, drop_collection=args.drop_source,
+                              before_swap=reindexer._sync)
+        print(f"alias {args.alias}: {previous} -> {args.target}")
+        print(ALIAS_CACHE_NOTE)
+    return 0
+
+
+def cmd_alias(registry, args):
+    """Punta un alias su una collection (es. rollback dopo una re-indicizzazione)."""
+    previous = swap_alias(registry.client, args.alias, args.collection, drop_collection=args.drop_collection)
+    print(f"alias {args.alias}: {previous} -> {args.collection}")
+    print(ALIAS_CACHE_NOTE)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('QDRANT_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('QDRANT_PORT', '6333')))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    indexes = commands.add_parser('indexes', help='Crea gli indici del payload mancanti o di tipo diverso (keyword, bool)')
+    indexes.add_argument('--collection', nargs='+', help='Collection da migrare (default: tutte)')
+    indexes.add_argument('--dry-run', action='store_true', help='Mostra solo gli indici mancanti o di tipo diverso')
+    indexes.set_defaults(func=cmd_indexes)
+
+    reindex = commands.add_parser('reindex', help='Copia/re-embedding in una nuova collection con checkpoint')
+    reindex.add_argument('--source', required=True, help='Collection (o alias) da leggere')
+    reindex.add_argument('--target', required=True, help='Nuova collection')
+    reindex.add_argument('--alias', help='Alias da spostare sulla nuova collection al termine')
+    reindex.add_argument('--drop-source', action='store_true',
+                         help="Elimina la collection con il nome dell'alias per crearlo (prima migrazione, "
+                              "non atomico: fermare prima le ingestion)")
+    reindex.add_argument('--provider', help='Ricalcola gli embedding con questo provider (default: copia i vettori)')
+    reindex.add_argument('--dim', type=int, help='Dimensione dei nuovi embedding (default: quella della sorgente)')
+    reindex.add_argument('--embedding-cache', help='Cache SQLite degli embedding (riprese senza ricalcolo)')
+    reindex.add_argument('--distance', choices=[d.value for d in Distance])
+    reindex.add_argument('--profile', help='Profilo di storage della nuova collection (STORAGE_PROFILES)')
+    reindex.add_argument('--sparse', action=argparse.BooleanOptionalAction, default=None,
+                         help='Vettori sparsi BM25 nella nuova collection (default: come la sorgente)')
+    reindex.add_argument('--page-size', type=int, default=1000, help='Punti per pagina di scroll (e checkpoint)')
+    reindex.add_argument('--batch-size', type=int, default=256, help='Punti per upsert')
+    reindex.add_argument('--parallel', type=int, default=4, help='Upsert in parallelo')
+    reindex.add_argument('--parent-pooling', choices=['mean', 'weighted'],
+                         default=os.getenv('KB_PARENT_POOLING', 'mean'))
+    reindex.add_argument('--normalize', action='store_true',
+                         default=os.getenv('KB_NORMALIZE_VECTORS', 'false').lower() in ('1', 'true', 'yes'))
+    reindex.add_argument('--checkpoint', help='File di checkpoint (default: .reindex_<source>_<target>.json)')
+    reindex.add_argument('--restart', action='store_true', help='Ignora il checkpoint e ricrea la destinazione')
+    reindex.set_defaults(func=cmd_reindex)
+
+    alias = commands.add_parser('alias', help='Punta un alias su una collection')
+    alias.add_argument('alias')
+    alias.add_argument('collection')
+    alias.add_argument('--drop-collection', action='store_true',
+                       help="Elimina la collection con il nome dell'alias, se esiste")
+    alias.set_defaults(func=cmd_alias)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    registry = QdrantRegistry(host=args.host, port=args.port)
+    try:
+        return args.func(registry, args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,24 +6,659 @@ e fare ricerche filtrate.
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
-    Distance, VectorParams, PointStruct,
-    Filter, FieldCondition, MatchValue
+    Distance, VectorParams, PointStruct, PointIdsList, PayloadSchemaType,
+    Filter, FieldCondition, MatchAny, MatchValue, SparseVector, SparseVectorParams,
+    BinaryQuantization, BinaryQuantizationConfig, HnswConfigDiff, QuantizationSearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams, WithLookup
 )
+try:  # Query API con prefetch e fusione (qdrant-client >= 1.10)
+    from qdrant_client.models import Fusion, FusionQuery, Modifier, Prefetch, QueryRequest
+except ImportError:  # pragma: no cover - client precedenti
+    Fusion = FusionQuery = Modifier = Prefetch = QueryRequest = None
+import hashlib
+import json
 import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple, Union
 import uuid
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
+# Campi del payload scritti da QdrantManager (e usati nei filtri) con il tipo di indice.
+# `data_odierna` è una stringa "YYYY-MM-DD" filtrata con MatchValue/MatchAny da
+# build_filter: serve un indice keyword (un indice datetime supporta solo range).
+PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    'nome_obiettivo': PayloadSchemaType.KEYWORD,
+    'data_odierna': PayloadSchemaType.KEYWORD,
+    'is_parent': PayloadSchemaType.BOOL,
+    'storage_mode': PayloadSchemaType.KEYWORD,
+    'document_id': PayloadSchemaType.KEYWORD,
+    'parent_id': PayloadSchemaType.KEYWORD,
+}
+
+
+# Nome del vettore sparso (BM25) accanto al vettore denso di default
+SPARSE_VECTOR_NAME = 'bm25'
+
+# Costante k della reciprocal rank fusion lato client (valore del paper originale;
+# la FusionQuery RRF del server usa k=2)
+RRF_K = 60
+
+SEARCH_MODES = ('dense', 'sparse', 'hybrid')
+
+# Aggregazione degli score dei chunk di un documento nella ricerca raggruppata
+GROUP_AGGREGATIONS = ('max', 'sum', 'count')
+
+# Profili di storage delle collection. Chiavi:
+#   quantization: None, 'scalar' (int8, 4x meno RAM) o 'binary' (1 bit, 32x; embedding >= 1024 dim)
+#   on_disk: vettori originali su disco (mmap), in RAM resta solo la versione quantizzata
+#   hnsw_on_disk: grafo HNSW su disco
+#   m, ef_construct: parametri HNSW (None = default del server, 16 / 100)
+#   rescore, oversampling: in ricerca i candidati (limit * oversampling) trovati sui
+#       vettori quantizzati vengono riordinati con i vettori originali
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    'on-disk': {'on_disk': True, 'hnsw_on_disk': True},
+    'scalar': {'quantization': 'scalar', 'on_disk': True, 'oversampling': 2.0},
+    'binary': {'quantization': 'binary', 'on_disk': True, 'oversampling': 3.0},
+    'compact': {'quantization': 'scalar', 'on_disk': True, 'hnsw_on_disk': True,
+                'm': 8, 'ef_construct': 64, 'oversampling': 3.0},
+}
+_PROFILE_DEFAULTS = {'quantization': None, 'on_disk': False, 'hnsw_on_disk': False, 'm': None,
+                     'ef_construct': None, 'rescore': True, 'oversampling': 2.0}
+
+
+# ========== VETTORI (float32 contigui) ==========
+
+def as_vector_matrix(vectors: Sequence[Any], dim: Optional[int] = None) -> np.ndarray:
+    """
+    Converte una sequenza di vettori (liste, array o una matrice) in una
+    matrice float32 contigua di forma (n, dim).
+
+    Raises:
+        ValueError: Se i vettori hanno dimensioni diverse o diverse da `dim`
+    """
+    if isinstance(vectors, np.ndarray):
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    elif len(vectors) == 0:
+        return np.zeros((0, dim or 0), dtype=np.float32)
+    else:
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2D vector matrix, got shape {matrix.shape}")
+    if dim is not None and matrix.shape[1] != dim:
+        raise ValueError(f"Expected vectors of size {dim}, got {matrix.shape[1]}")
+    return matrix
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalizza L2 ogni riga (le righe nulle restano nulle). Lavora in place e ritorna la matrice."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def pool_vectors(matrix: np.ndarray, weights: Optional[Sequence[float]] = None,
+                 normalize: bool = False) -> np.ndarray:
+    """
+    Vettore aggregato di una matrice di vettori (es. il parent dei suoi chunk).
+
+    Args:
+        matrix: Matrice float32 (n, dim)
+        weights: Pesi opzionali per riga (es. lunghezza del testo); None = media semplice
+        normalize: Se True normalizza L2 il risultato
+
+    Returns:
+        np.ndarray: Vettore float32 (dim,)
+    """
+    if weights is None:
+        pooled = matrix.mean(axis=0, dtype=np.float32)
+    else:
+        w = np.asarray(weights, dtype=np.float32)
+        total = float(w.sum())
+        pooled = (w @ matrix) / total if total > 0 else matrix.mean(axis=0, dtype=np.float32)
+    pooled = np.asarray(pooled, dtype=np.float32)
+    if normalize:
+        norm = float(np.linalg.norm(pooled))
+        if norm > 0:
+            pooled /= norm
+    return pooled
+
+
+def as_sparse_vector(vector: Any) -> SparseVector:
+    """SparseVector da una coppia (indici, pesi) o da un SparseVector."""
+    if isinstance(vector, SparseVector):
+        return vector
+    indices, values = vector
+    return SparseVector(indices=list(indices), values=[float(v) for v in values])
+
+
+def _with_score(hit: Any, score: float) -> Any:
+    copy = getattr(hit, 'model_copy', None) or hit.copy
+    return copy(update={'score': score})
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Any]], limit: Optional[int] = None,
+                           k: int = RRF_K) -> List[Any]:
+    """
+    Fonde più liste di risultati con la reciprocal rank fusion:
+    score(d) = somma di 1 / (k + rank), con rank a partire da 1.
+
+    Usa solo le posizioni, quindi combina score non confrontabili
+    (coseno denso e BM25 sparso). Ritorna i risultati con lo score fuso.
+    """
+    scores: Dict[str, float] = {}
+    first: Dict[str, Any] = {}
+    for results in result_lists:
+        for rank, hit in enumerate(results, start=1):
+            key = str(hit.id)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            first.setdefault(key, hit)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [_with_score(first[key], scores[key]) for key in ranked]
+
+
+def normalize_scores(hits: Sequence[Any], method: str = 'minmax') -> List[Any]:
+    """
+    Riporta gli score di una lista di risultati su una scala comune, così
+    che liste di collection o query diverse siano confrontabili.
+
+    Args:
+        method: 'minmax' (in [0, 1], il migliore vale 1) oppure 'none'
+    """
+    if method == 'none' or not hits:
+        return list(hits)
+    if method != 'minmax':
+        raise ValueError(f"Unknown score normalization '{method}'")
+    scores = [hit.score for hit in hits]
+    low, span = min(scores), max(scores) - min(scores)
+    return [_with_score(hit, (hit.score - low) / span if span > 0 else 1.0) for hit in hits]
+
+
+def result_key(hit: Any) -> str:
+    """Chiave di deduplica: il parent del chunk, o il punto stesso per parent e chunk 'fixed'."""
+    payload = hit.payload or {}
+    return str(payload.get('parent_id') or hit.id)
+
+
+def merge_results(result_lists: Sequence[Sequence[Any]], limit: Optional[int] = None,
+                  normalization: str = 'minmax', sources: Optional[Sequence[Any]] = None,
+                  groups: Optional[Sequence[Any]] = None) -> List[Tuple[Any, Any]]:
+    """
+    Unisce liste di risultati (query o collection diverse): normalizza gli
+    score, deduplica per `parent_id` tenendo il chunk con lo score migliore
+    e ordina per score.
+
+    Args:
+        sources: Origine di ciascuna lista (es. nome della collection), ritornata con il risultato
+        groups: Gruppo di ciascuna lista (es. indice della query e modalità di ricerca): le
+            liste dello stesso gruppo sono normalizzate insieme, così un risultato debole resta
+            debole anche se è l'unico della sua collection. Vanno raggruppate solo liste con
+            score sulla stessa scala (es. non coseno con fusione RRF). Default: ogni lista è
+            un gruppo a sé.
+
+    Returns:
+        list: Coppie (origine, hit) ordinate per score normalizzato
+    """
+    sources = list(sources) if sources is not None else [None] * len(result_lists)
+    groups = list(groups) if groups is not None else list(range(len(result_lists)))
+    grouped: Dict[Any, List[Tuple[Any, Any]]] = {}
+    for group, source, results in zip(groups, sources, result_lists):
+        grouped.setdefault(group, []).extend((source, hit) for hit in results)
+    best: Dict[str, Tuple[Any, Any]] = {}
+    for items in grouped.values():
+        normalized = normalize_scores([hit for _, hit in items], normalization)
+        for (source, _), hit in zip(items, normalized):
+            key = result_key(hit)
+            if key not in best or hit.score > best[key][1].score:
+                best[key] = (source, hit)
+    merged = sorted(best.values(), key=lambda item: item[1].score, reverse=True)
+    return merged[:limit] if limit is not None else merged
+
+
+def aggregate_scores(scores: Sequence[float], aggregation: str = 'max') -> float:
+    """
+    Score di un documento dagli score dei suoi chunk trovati:
+    'max' (chunk migliore), 'sum' (somma) o 'count' (chunk migliore
+    pesato sul numero di chunk trovati: max * (1 + ln n)).
+    """
+    if aggregation == 'max':
+        return max(scores)
+    if aggregation == 'sum':
+        return float(sum(scores))
+    if aggregation == 'count':
+        return max(scores) * (1.0 + math.log(len(scores)))
+    raise ValueError(f"Unknown aggregation '{aggregation}'. Available: {GROUP_AGGREGATIONS}")
+
+
+def storage_profile(profile: Any = None) -> Dict[str, Any]:
+    """
+    Risolve un profilo di storage: nome in STORAGE_PROFILES oppure dict con
+    le stesse chiavi (anche parziale, es. `{'quantization': 'scalar', 'm': 32}`).
+
+    Raises:
+        ValueError: Profilo o quantizzazione sconosciuti
+    """
+    if profile is None:
+        profile = 'default'
+    if isinstance(profile, str):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile '{profile}'. Available: {sorted(STORAGE_PROFILES)}")
+        profile = STORAGE_PROFILES[profile]
+    unknown = set(profile) - set(_PROFILE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown storage profile keys: {sorted(unknown)}")
+    resolved = {**_PROFILE_DEFAULTS, **profile}
+    if resolved['quantization'] not in (None, 'scalar', 'binary'):
+        raise ValueError(f"Unknown quantization '{resolved['quantization']}'")
+    return resolved
+
+
+def collection_config(profile: Any, vector_size: int, distance: Distance = Distance.COSINE) -> Dict[str, Any]:
+    """
+    Argomenti di `client.create_collection` per un profilo di storage:
+    `vectors_config`, `hnsw_config` e `quantization_config`.
+    """
+    profile = storage_profile(profile)
+    hnsw = None
+    if profile['m'] is not None or profile['ef_construct'] is not None or profile['hnsw_on_disk']:
+        hnsw = HnswConfigDiff(m=profile['m'], ef_construct=profile['ef_construct'],
+                              on_disk=profile['hnsw_on_disk'] or None)
+    quantization = None
+    if profile['quantization'] == 'scalar':
+        quantization = ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    elif profile['quantization'] == 'binary':
+        quantization = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return {
+        'vectors_config': VectorParams(size=vector_size, distance=distance, on_disk=profile['on_disk'] or None),
+        'hnsw_config': hnsw,
+        'quantization_config': quantization,
+    }
+
+
+def quantization_search_params(profile: Any) -> Optional[SearchParams]:
+    """Parametri di ricerca con rescoring per le collection quantizzate (None se non quantizzata)."""
+    profile = storage_profile(profile)
+    if profile['quantization'] is None:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(
+        rescore=profile['rescore'], oversampling=profile['oversampling']))
+
+
+def _quantization_kind(config: Any) -> Optional[str]:
+    """'scalar', 'binary', 'product' o None dalla quantization_config di una collection."""
+    if config is None:
+        return None
+    for kind in ('scalar', 'binary', 'product'):
+        if getattr(config, kind, None) is not None:
+            return kind
+    return None
+
+
+def _schema_name(schema: Any) -> Optional[str]:
+    """Nome del tipo di indice ('keyword', 'datetime', ...) da un PayloadSchemaType o una stringa."""
+    if schema is None:
+        return None
+    return str(getattr(schema, 'value', schema))
+
+
+def _index_types(payload_schema: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """Campo -> tipo di indice dal payload_schema di una collection (get_collection)."""
+    return {field: _schema_name(getattr(info, 'data_type', None))
+            for field, info in (payload_schema or {}).items()}
+
+
+def _point(point_id: Any, vector: List[float], payload: Dict[str, Any]) -> PointStruct:
+    """
+    PointStruct senza rivalidazione pydantic: i vettori vengono da una matrice
+    float32 già verificata, e la validazione elemento per elemento di migliaia
+    di float per punto costava più della costruzione stessa.
+    """
+    construct = getattr(PointStruct, 'model_construct', None) or PointStruct.construct
+    return construct(id=point_id, vector=vector, payload=payload)
+
+
+def _prepare_vectors(chunks: List[Dict[str, Any]], storage_mode: str, parent_vector: Optional[Sequence[float]],
+                     vector_size: int, parent_pooling: str,
+                     normalize: bool) -> Tuple[np.ndarray, int, Optional[np.ndarray]]:
+    """Matrice dei chunk, dimensione dei vettori e vettore del parent (None in modalità fixed)."""
+    if parent_pooling not in ('mean', 'weighted'):
+        raise ValueError(f"Unknown parent_pooling '{parent_pooling}'")
+
+    vectors = [c.get('embedding') for c in chunks]
+    if any(v is None or len(v) == 0 for v in vectors):
+        raise ValueError("Every chunk must have an embedding")
+    matrix = as_vector_matrix(vectors, None) if chunks else np.zeros((0, vector_size), dtype=np.float32)
+    if len(chunks):
+        vector_size = matrix.shape[1]
+    if normalize and len(matrix):
+        normalize_rows(matrix)
+
+    if storage_mode != "parent-child":
+        return matrix, vector_size, None
+
+    # Vector del parent: usa parent_vector se fornito, altrimenti pooling dei child
+    if parent_vector is not None:
+        parent = np.asarray(parent_vector, dtype=np.float32)
+        if normalize:
+            parent = pool_vectors(parent[None, :], normalize=True)
+    elif len(matrix):
+        weights = [len(c.get('text', '')) for c in chunks] if parent_pooling == 'weighted' else None
+        parent = pool_vectors(matrix, weights=weights, normalize=normalize)
+    else:
+        parent = np.zeros(vector_size, dtype=np.float32)
+    return matrix, vector_size, parent
+
+
+# Namespace fisso: gli id dei punti restano stabili tra processi e deploy
+POINT_ID_NAMESPACE = uuid.UUID('5b0c7a52-8f0e-4c1e-9d3a-6a2f1e4b7c90')
+
+
+def chunk_point_ids(document_id: str, texts: Sequence[str]) -> List[str]:
+    """
+    Id deterministici dei chunk: uuid5(documento + hash del contenuto).
+
+    Lo stesso testo nello stesso documento produce sempre lo stesso id;
+    chunk identici ripetuti sono distinti dal numero di occorrenza.
+    """
+    occurrences: Dict[str, int] = {}
+    ids = []
+    for text in texts:
+        digest = hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        ids.append(str(uuid.uuid5(POINT_ID_NAMESPACE, f"{document_id}:{digest}:{occurrence}")))
+    return ids
+
+
+def parent_point_id(document_id: str) -> str:
+    """Id deterministico del parent di un documento."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{document_id}:parent"))
+
+
+def _point_hash(vector: bytes, payload: Dict[str, Any]) -> str:
+    """Impronta di vettore e payload, per riconoscere i punti invariati."""
+    digest = hashlib.blake2b(vector, digest_size=16)
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def content_hash(content: Dict[str, Any]) -> str:
+    """Impronta dei campi propri di un punto (testo, posizione, parent, metadata del chunk)."""
+    return _point_hash(b'', content)
+
+
+def point_hash(vector: np.ndarray, content: str,
+               sparse_vector: Optional[Tuple[Sequence[int], Sequence[float]]] = None) -> str:
+    """
+    `point_hash` di un punto come calcolato in ingestion: vettore float32,
+    eventuale vettore sparso (indici, pesi) e `content_hash` del punto.
+
+    I tag del documento (data, obiettivo, payload del client) non ne fanno
+    parte: hanno la loro impronta `metadata_hash`, così un cambio di tag
+    aggiorna il payload senza riscrivere i vettori.
+    """
+    fingerprint = np.asarray(vector, dtype=np.float32).tobytes()
+    if sparse_vector is not None:
+        fingerprint += json.dumps([list(sparse_vector[0]), list(sparse_vector[1])]).encode('utf-8')
+    return _point_hash(fingerprint, {'content_hash': content})
+
+
+def _document_payload(metadata: Dict[str, Any], storage_mode: str, document_id: str) -> Dict[str, Any]:
+    """Campi comuni a tutti i punti di un documento, con la loro impronta `metadata_hash`."""
+    payload = {k: v for k, v in metadata.items() if k != 'is_parent'}
+    payload.update(storage_mode=storage_mode, document_id=document_id)
+    payload['metadata_hash'] = _point_hash(b'', payload)
+    return payload
+
+
+def iter_point_batches(chunks: List[Dict[str, Any]], metadata: Dict[str, Any],
+                       storage_mode: str = "fixed", parent_text: Optional[str] = None,
+                       parent_vector: Optional[Sequence[float]] = None, vector_size: int = 1536,
+                       parent_pooling: str = "mean", normalize: bool = False,
+                       batch_size: Optional[int] = None, document_id: Optional[str] = None,
+                       existing: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None,
+                       sparse: bool = False,
+                       retag: Optional[List[Any]] = None) -> Tuple[int, int, Iterator[List[PointStruct]]]:
+    """
+    Prepara i punti di un documento in batch generati su richiesta.
+
+    Pooling e normalizzazione lavorano sull'intera matrice float32; i
+    PointStruct (e le liste di float richieste dal client) vengono invece
+    materializzati un batch alla volta, quando il generatore viene
+    consumato. Il parent, se presente, è il primo punto generato.
+
+    Con `document_id` gli id sono deterministici (`chunk_point_ids`) e il
+    payload contiene `document_id`, `point_hash` (vettori e contenuto del
+    punto), `content_hash` e `metadata_hash` (tag del documento). Con
+    `existing` (id -> (point_hash, metadata_hash) dei punti già indicizzati)
+    i punti invariati non vengono generati; il dict viene consumato e al
+    termine contiene solo i punti che non fanno più parte del documento.
+    I punti invariati con tag diversi finiscono in `retag`: basta
+    aggiornarne il payload (`_document_payload`) senza riscriverli.
+
+    Con `sparse` i chunk che hanno un campo 'sparse' (indici, pesi) vengono
+    salvati con il vettore denso di default e il vettore `SPARSE_VECTOR_NAME`.
+
+    Args:
+        batch_size: Punti per batch; None = un unico batch
+        document_id: Id stabile del documento
+        existing: Impronte dei punti già presenti per il documento
+        retag: Lista in cui raccogliere gli id dei punti invariati con tag cambiati
+        sparse: Se True include i vettori sparsi dei chunk (la collection deve prevederli)
+
+    Returns:
+        tuple: (vector_size, numero totale di punti del documento, generatore di liste di PointStruct)
+    """
+    matrix, vector_size, parent = _prepare_vectors(
+        chunks, storage_mode, parent_vector, vector_size, parent_pooling, normalize
+    )
+    total = len(chunks) + (parent is not None)
+    batch_size = max(1, int(batch_size)) if batch_size else max(1, total)
+    if existing is None:
+        existing = {}
+    if retag is None:
+        retag = []
+    shared: Dict[str, Any] = {}
+    if document_id is not None:
+        metadata = {**metadata, "document_id": document_id}
+        shared = _document_payload(metadata, storage_mode, document_id)
+        ids = chunk_point_ids(document_id, [c.get('text', '') for c in chunks])
+    else:
+        ids = [c.get('id', i) for i, c in enumerate(chunks)]
+
+    def make_point(point_id: Any, vector: np.ndarray, payload: Dict[str, Any], content: Dict[str, Any],
+                   sparse_vector: Optional[Tuple[Sequence[int], Sequence[float]]] = None,
+                   retaggable: bool = True) -> Optional[PointStruct]:
+        if document_id is not None:
+            own = content_hash(content)
+            fingerprint = point_hash(vector, own, sparse_vector)
+            stored = existing.pop(point_id, None)
+            if stored is not None and stored[0] == fingerprint:
+                if stored[1] == shared['metadata_hash']:
+                    return None
+                if retaggable:
+                    retag.append(point_id)
+                    return None
+            payload.update(point_hash=fingerprint, content_hash=own, metadata_hash=shared['metadata_hash'])
+        if sparse_vector is None:
+            return _point(point_id, vector.tolist(), payload)
+        return _point(point_id, {"": vector.tolist(), SPARSE_VECTOR_NAME: as_sparse_vector(sparse_vector)}, payload)
+
+    def batches() -> Iterator[List[PointStruct]]:
+        batch: List[PointStruct] = []
+        parent_id = None
+
+        # Modalità parent-child
+        if parent is not None:
+            parent_id = parent_point_id(document_id) if document_id is not None else str(uuid.uuid4())
+            parent_payload = {
+                "text": parent_text or "\n".join([c.get('text', '') for c in chunks]),
+                "storage_mode": storage_mode,
+                **metadata,
+                # Dopo i metadata: i tag di sistema contengono is_parent=False
+                "is_parent": True
+            }
+            point = make_point(parent_id, parent, parent_payload, {"text": parent_payload["text"], "is_parent": True})
+            if point is not None:
+                batch.append(point)
+
+        for i, chunk in enumerate(chunks):
+            payload = {
+                "text": chunk.get('text', ''),
+                "chunk_index": i,
+                "storage_mode": storage_mode,
+                **metadata
+            }
+            if parent_id is not None:
+                payload["is_parent"] = False
+                payload["parent_id"] = parent_id
+            chunk_metadata = chunk.get('metadata', {})
+            payload.update(chunk_metadata)
+            content = {"text": payload["text"], "chunk_index": i, "parent_id": parent_id, **chunk_metadata}
+            point = make_point(ids[i], matrix[i], payload, content, chunk.get('sparse') if sparse else None,
+                               retaggable=not set(chunk_metadata) & set(shared))
+            if point is None:
+                continue
+            batch.append(point)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return vector_size, total, batches()
+
+
+def build_points(chunks: List[Dict[str, Any]], metadata: Dict[str, Any],
+                 storage_mode: str = "fixed", parent_text: Optional[str] = None,
+                 parent_vector: Optional[Sequence[float]] = None, vector_size: int = 1536,
+                 parent_pooling: str = "mean", normalize: bool = False) -> Tuple[List[PointStruct], int]:
+    """
+    Costruisce i PointStruct di un documento lavorando su una matrice float32.
+
+    I vettori dei chunk vengono raccolti in un'unica matrice contigua; pooling
+    del parent e normalizzazione sono operazioni NumPy e la conversione in
+    liste Python avviene una sola volta, al confine con il client Qdrant.
+
+    Args:
+        parent_pooling: 'mean' (media semplice) o 'weighted' (pesata sulla lunghezza del testo)
+        normalize: Se True normalizza L2 i vettori dei chunk e del parent
+
+    Returns:
+        tuple: (points, vector_size)
+    """
+    vector_size, _, batches = iter_point_batches(
+        chunks, metadata, storage_mode=storage_mode, parent_text=parent_text,
+        parent_vector=parent_vector, vector_size=vector_size,
+        parent_pooling=parent_pooling, normalize=normalize
+    )
+    points = [point for batch in batches for point in batch]
+    return points, vector_size
+
+
+def children_filter() -> Filter:
+    """Filtro dei soli chunk child (esclude i punti parent)."""
+    return Filter(must_not=[FieldCondition(key='is_parent', match=MatchValue(value=True))])
+
+
+def build_filter(filters: Optional[Dict[str, Any]] = None, base: Optional[Filter] = None) -> Optional[Filter]:
+    """
+    Filter Qdrant con una condizione di uguaglianza per ogni coppia di `filters`
+    (appartenenza per i valori lista), aggiunta alle condizioni di `base`.
+    """
+    if not filters:
+        return base
+    conditions = [
+        FieldCondition(key=key, match=MatchAny(any=list(value)) if isinstance(value, (list, tuple, set))
+                       else MatchValue(value=value))
+        for key, value in filters.items()
+    ]
+    if base is None:
+        return Filter(must=conditions)
+    return Filter(must=list(base.must or []) + conditions, should=base.should, must_not=base.must_not)
+
+
+class BatchUpsertError(RuntimeError):
+    """Uno o più batch non sono stati salvati nemmeno dopo i retry."""
+
+    def __init__(self, failed: List[int], stats: Dict[str, Any]):
+        super().__init__(f"{len(failed)} batch(es) failed after retries: {failed}")
+        self.failed = failed
+        self.stats = stats
+
+
+class CollectionCache:
+    """
+    Metadata delle collection (esistenza, dimensione e distanza dei vettori)
+    condivisi tra i manager che usano lo stesso client.
+
+    Dopo la prima verifica le ingestion non fanno più round trip verso il
+    server per controllare la collection; le voci vengono invalidate quando
+    un'operazione sulla collection fallisce (es. collection eliminata) e,
+    con `ttl`, dopo `ttl` secondi: un alias spostato su una collection con
+    un'altra configurazione (`qdrant_migrate reindex --alias`) viene riletto
+    senza riavviare il processo.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._loaded: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self.ttl is not None and name in self._info and time.monotonic() - self._loaded[name] > self.ttl:
+                del self._info[name]
+            return self._info.get(name)
+
+    def set(self, name: str, info: Dict[str, Any]):
+        with self._lock:
+            self._info[name] = info
+            self._loaded[name] = time.monotonic()
+
+    def invalidate(self, name: Optional[str] = None):
+        with self._lock:
+            if name is None:
+                self._info.clear()
+            else:
+                self._info.pop(name, None)
+
+    def lock(self, name: str) -> threading.Lock:
+        """Lock per collection: serializza solo la verifica/creazione della stessa collection."""
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(info) for name, info in self._info.items()}
+
+
 class QdrantManager:
     """
     Manager per operazioni su Qdrant Vector Database.
     Supporta storage modes 'fixed' e 'parent-child' per embeddings.
+    
+    Ogni manager opera su una sola collection; per usarne più di una in
+    modo concorrente vedi `QdrantRegistry`.
     """
     
-    def __init__(self, host='localhost', port=6333, collection_name='default_collection'):
+    def __init__(self, host='localhost', port=6333, collection_name='default_collection',
+                 client: Optional[QdrantClient] = None, collections: Optional[CollectionCache] = None,
+                 payload_indexes: Optional[Dict[str, PayloadSchemaType]] = None, sparse_vectors: bool = False,
+                 storage_profile: Any = 'default'):
         """
         Inizializza il manager Qdrant.
         
@@ -31,6 +666,11 @@ class QdrantManager:
             host (str): Host del server Qdrant
             port (int): Porta del server Qdrant
             collection_name (str): Nome della collection da usare
+            client (QdrantClient): Client già connesso da condividere (opzionale)
+            collections (CollectionCache): Cache dei metadata delle collection condivisa (opzionale)
+            payload_indexes (dict): Campo -> tipo di indice del payload (default PAYLOAD_INDEXES)
+            sparse_vectors (bool): Crea le nuove collection con il vettore sparso BM25 (ricerca ibrida)
+            storage_profile: Profilo delle nuove collection (nome in STORAGE_PROFILES o dict)
             
         Example:
             >>> manager = QdrantManager(host='localhost', port=6333, collection_name='my_kb')
@@ -38,8 +678,13 @@ class QdrantManager:
         self.host = host
         self.port = port
         self.collection_name = collection_name
-        self.client = None
-        self._connect()
+        self.client = client
+        self.payload_indexes = dict(PAYLOAD_INDEXES if payload_indexes is None else payload_indexes)
+        self.sparse_vectors = sparse_vectors
+        self.storage_profile = storage_profile
+        self._collections = collections if collections is not None else CollectionCache()
+        if self.client is None:
+            self._connect()
     
     def _connect(self):
         """Connette al server Qdrant."""
@@ -50,44 +695,189 @@ class QdrantManager:
             logger.error(f"❌ Qdrant connection failed: {e}")
             raise
     
-    def create_collection(self, vector_size=1536, distance=Distance.COSINE):
+    def _collection_exists(self) -> bool:
+        if hasattr(self.client, 'collection_exists'):
+            return self.client.collection_exists(self.collection_name)
+        collections = self.client.get_collections().collections
+        return any(c.name == self.collection_name for c in collections)
+
+    def _load_collection_info(self) -> Dict[str, Any]:
+        """Configurazione dei vettori e indici del payload di una collection esistente."""
+        info = self.client.get_collection(self.collection_name)
+        vectors = info.config.params.vectors
+        return {
+            'vector_size': getattr(vectors, 'size', None),
+            'distance': getattr(vectors, 'distance', None),
+            'sparse': SPARSE_VECTOR_NAME in (getattr(info.config.params, 'sparse_vectors', None) or {}),
+            'quantization': _quantization_kind(getattr(info.config, 'quantization_config', None)),
+            'indexes': sorted((info.payload_schema or {}).keys()),
+            'index_types': _index_types(info.payload_schema),
+        }
+
+    def collection_info(self) -> Optional[Dict[str, Any]]:
+        """Metadata in cache della collection (letti dal server la prima volta); None se non esiste."""
+        info = self._collections.get(self.collection_name)
+        if info is None and self._collection_exists():
+            info = self._load_collection_info()
+            self._collections.set(self.collection_name, info)
+        return info
+
+    def search_params(self) -> Optional[SearchParams]:
+        """
+        Parametri di ricerca della collection: rescoring con i vettori
+        originali se la collection è quantizzata (oversampling dal profilo
+        del manager), altrimenti None.
+        """
+        info = self.collection_info()
+        if not info or not info.get('quantization'):
+            return None
+        profile = storage_profile(self.storage_profile)
+        if profile['quantization'] is None:
+            profile['quantization'] = info['quantization']
+        return quantization_search_params(profile)
+
+    def has_sparse_vectors(self) -> bool:
+        """True se la collection ha il vettore sparso BM25 (ricerca 'sparse' e 'hybrid')."""
+        info = self.collection_info()
+        return bool(info and info.get('sparse'))
+
+    def ensure_payload_indexes(self, existing: Optional[Union[Sequence[str], Dict[str, str]]] = None) -> List[str]:
+        """
+        Crea gli indici del payload mancanti (keyword, bool) per i campi
+        scritti dal manager. Idempotente: gli indici già presenti non
+        vengono ricreati, tranne quelli di tipo diverso da `payload_indexes`
+        (es. `data_odierna` indicizzato datetime da versioni precedenti).
+        
+        Args:
+            existing: Campi già indicizzati (lista di nomi) o campo -> tipo di
+                indice (vedi `_index_types`); None = letti dal server
+            
+        Returns:
+            list: Campi per cui è stato creato (o ricreato) l'indice
+            
+        Example:
+            >>> manager.ensure_payload_indexes()
+            ['nome_obiettivo', 'data_odierna', 'is_parent', ...]
+        """
+        if existing is None:
+            existing = _index_types(self.client.get_collection(self.collection_name).payload_schema)
+        types = existing if isinstance(existing, dict) else {}
+        existing = set(existing)
+        created = []
+        for field, schema in self.payload_indexes.items():
+            if field in existing:
+                current = types.get(field)
+                if current is None or current == _schema_name(schema):
+                    continue
+                # Tipo di indice diverso: i filtri del manager non lo userebbero
+                self.client.delete_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    wait=True
+                )
+                logger.info(f"🗂️ Replacing {current} payload index on {self.collection_name}.{field} "
+                            f"with {_schema_name(schema)}")
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema,
+                wait=True
+            )
+            created.append(field)
+        if created:
+            logger.info(f"🗂️ Created payload indexes on {self.collection_name}: {created}")
+        return created
+
+    def create_collection(self, vector_size=1536, distance=Distance.COSINE, profile: Any = None):
         """
         Crea una collection se non esiste.
         
+        L'esistenza e la configurazione dei vettori vengono verificate sul
+        server solo la prima volta e poi lette dalla `CollectionCache`.
+        Il profilo di storage vale solo per le collection nuove: per
+        cambiarlo a una collection esistente va ricreata e re-indicizzata.
+        
         Args:
             vector_size (int): Dimensione dei vettori (default 1536 per OpenAI)
             distance (Distance): Metrica di distanza (COSINE, EUCLID, DOT)
+            profile: Profilo di storage (default `self.storage_profile`), vedi STORAGE_PROFILES
+            
+        Raises:
+            ValueError: Se la collection esiste con vettori di dimensione diversa
             
         Example:
             >>> manager.create_collection(vector_size=1536)
+            >>> manager.create_collection(vector_size=1536, profile='scalar')
+            >>> manager.create_collection(vector_size=1536, profile={'quantization': 'binary', 'm': 32})
         """
-        try:
-            collections = self.client.get_collections().collections
-            collection_exists = any(c.name == self.collection_name for c in collections)
-            
-            if not collection_exists:
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=vector_size, distance=distance)
-                )
-                logger.info(f"📦 Created Qdrant collection: {self.collection_name}")
-            else:
-                logger.info(f"📦 Collection {self.collection_name} already exists")
-                
-        except Exception as e:
-            logger.error(f"❌ Error creating collection: {e}")
-            raise
+        profile = storage_profile(self.storage_profile if profile is None else profile)
+        info = self._collections.get(self.collection_name)
+        if info is None:
+            try:
+                with self._collections.lock(self.collection_name):
+                    info = self._collections.get(self.collection_name)
+                    if info is None:
+                        if self._collection_exists():
+                            info = self._load_collection_info()
+                            logger.info(f"📦 Collection {self.collection_name} already exists")
+                        else:
+                            sparse_config = None
+                            if self.sparse_vectors:
+                                # IDF calcolato dal server sulla collection (i pesi salvati sono solo TF)
+                                params = SparseVectorParams(modifier=Modifier.IDF) if Modifier else SparseVectorParams()
+                                sparse_config = {SPARSE_VECTOR_NAME: params}
+                            self.client.create_collection(
+                                collection_name=self.collection_name,
+                                sparse_vectors_config=sparse_config,
+                                **collection_config(profile, vector_size, distance)
+                            )
+                            info = {'vector_size': vector_size, 'distance': distance,
+                                    'sparse': self.sparse_vectors, 'quantization': profile['quantization'],
+                                    'indexes': [], 'index_types': {}}
+                            logger.info(f"📦 Created Qdrant collection: {self.collection_name} "
+                                        f"(quantization: {profile['quantization']}, on_disk: {profile['on_disk']})")
+                        # Collection nuove e collection create prima degli indici (migrazione automatica)
+                        created = self.ensure_payload_indexes(existing=info['index_types'])
+                        info['indexes'] = sorted(set(info['indexes']) | set(created))
+                        info['index_types'].update(
+                            (field, _schema_name(self.payload_indexes[field])) for field in created
+                        )
+                        self._collections.set(self.collection_name, info)
+            except Exception as e:
+                logger.error(f"❌ Error creating collection: {e}")
+                raise
+
+        if info.get('vector_size') is not None and info['vector_size'] != vector_size:
+            raise ValueError(f"Collection '{self.collection_name}' stores vectors of size "
+                             f"{info['vector_size']}, got {vector_size}")
     
     def save_chunks(self, chunks: List[Dict[str, Any]], metadata: Dict[str, Any], 
                     storage_mode: str = "fixed", parent_text: Optional[str] = None,
-                    parent_vector: Optional[List[float]] = None, vector_size: int = 1536) -> bool:
+                    parent_vector: Optional[Sequence[float]] = None, vector_size: int = 1536,
+                    parent_pooling: str = "mean", normalize: bool = False,
+                    batch_size: Optional[int] = 256, parallel: int = 1, wait: bool = True,
+                    max_retries: int = 3, document_id: Optional[str] = None,
+                    incremental: bool = False) -> bool:
         """
         Salva chunks con embeddings su Qdrant.
         
+        I punti vengono generati e inviati a batch (vedi `upsert_batches`):
+        in memoria restano al massimo `parallel + 1` batch, qualunque sia la
+        dimensione del documento. Per id deterministici e re-indicizzazione
+        incrementale vedi `index_document`.
+        
         Args:
-            chunks: Lista di dict con 'text', 'embedding', e opzionalmente 'id'
+            chunks: Lista di dict con 'text', 'embedding' (lista o np.ndarray), e opzionalmente 'id'
             metadata: Metadata comuni per tutti i chunk (es. {"nome_obiettivo": "...", "data": "..."})
             storage_mode: "fixed" o "parent-child"
+            parent_pooling: Aggregazione del vettore parent: "mean" o "weighted" (lunghezza del testo)
+            normalize: Se True normalizza L2 i vettori prima del salvataggio
+            batch_size: Punti per richiesta di upsert (None = una sola richiesta)
+            parallel: Batch inviati in parallelo
+            wait: Se False i batch non attendono l'indicizzazione (barriera finale)
+            max_retries: Tentativi aggiuntivi per ogni batch fallito
+            document_id: Id stabile del documento (id dei punti deterministici)
+            incremental: Con document_id, aggiorna solo i chunk nuovi o modificati
             
         Returns:
             bool: True se il salvataggio ha successo
@@ -100,95 +890,267 @@ class QdrantManager:
             >>> metadata = {'nome_obiettivo': 'Progetto AI', 'data_odierna': '2026-02-02'}
             >>> success = manager.save_chunks(chunks, metadata, storage_mode='fixed')
         """
+        self.index_document(
+            chunks, metadata,
+            document_id=document_id,
+            incremental=incremental,
+            storage_mode=storage_mode,
+            parent_text=parent_text,
+            parent_vector=parent_vector,
+            vector_size=vector_size,
+            parent_pooling=parent_pooling,
+            normalize=normalize,
+            batch_size=batch_size,
+            parallel=parallel,
+            wait=wait,
+            max_retries=max_retries
+        )
+        return True
+
+    def index_document(self, chunks: List[Dict[str, Any]], metadata: Dict[str, Any],
+                       document_id: Optional[str] = None, incremental: bool = True,
+                       storage_mode: str = "fixed", parent_text: Optional[str] = None,
+                       parent_vector: Optional[Sequence[float]] = None, vector_size: int = 1536,
+                       parent_pooling: str = "mean", normalize: bool = False,
+                       batch_size: Optional[int] = 256, parallel: int = 1, wait: bool = True,
+                       max_retries: int = 3) -> Dict[str, Any]:
+        """
+        Indicizza un documento e ritorna le statistiche dell'operazione.
+        
+        Con `document_id` gli id dei punti sono uuid5(documento + hash del
+        chunk), quindi documenti diversi non si sovrascrivono e ricaricare lo
+        stesso documento aggiorna gli stessi punti. In modalità `incremental`
+        vengono letti gli id e le impronte dei punti già presenti per il
+        documento: si inviano solo i punti nuovi o modificati e poi si
+        eliminano quelli non più presenti, quindi il costo è proporzionale
+        alla differenza. I punti con vettori e testo invariati ma tag del
+        documento diversi (es. `data_odierna` di una nuova ingestion) non
+        vengono riscritti: se ne aggiorna solo il payload con `set_payload`.
+        Il merge non rimuove chiavi: un campo tolto dai metadata resta sui
+        punti invariati finché non vengono riscritti.
+        
+        Se la collection ha il vettore sparso BM25, viene salvato anche il
+        campo 'sparse' (indici, pesi) dei chunk.
+        
+        Returns:
+            dict: {'document_id', 'points', 'upserted', 'unchanged', 'retagged', 'deleted',
+                   'batches', 'retries', 'seconds'}
+            
+        Example:
+            >>> stats = manager.index_document(chunks, metadata, document_id='doc-42',
+            ...                                storage_mode='parent-child')
+            >>> stats['upserted'], stats['deleted']
+        """
         try:
-            # Assicura che la collection esista
-            # Tenta di derivare la dimensione dal primo embedding se disponibile
-            if chunks and isinstance(chunks[0].get('embedding', None), list) and chunks[0].get('embedding'):
-                vector_size = len(chunks[0].get('embedding'))
+            # Assicura che la collection esista (dimensione derivata dagli embedding)
+            first = chunks[0].get('embedding') if chunks else None
+            if first is not None and len(first):
+                vector_size = len(first)
             self.create_collection(vector_size=vector_size)
+            sparse = bool((self._collections.get(self.collection_name) or {}).get('sparse'))
 
-            points = []
-
-            # Modalità parent-child
-            if storage_mode == "parent-child":
-                parent_id = str(uuid.uuid4())
-                parent_text = parent_text or "\n".join([c.get('text', '') for c in chunks])
-
-                # Vector del parent: usa parent_vector se fornito, altrimenti media dei child
-                if parent_vector is None:
-                    child_vectors = [c.get('embedding', []) for c in chunks if c.get('embedding')]
-                    if child_vectors:
-                        parent_vector = [sum(vals) / len(vals) for vals in zip(*child_vectors)]
-                    else:
-                        parent_vector = [0.0] * vector_size
-
-                parent_payload = {
-                    "text": parent_text,
-                    "is_parent": True,
-                    "storage_mode": storage_mode,
-                    **metadata
-                }
-                points.append(PointStruct(
-                    id=parent_id,
-                    vector=parent_vector,
-                    payload=parent_payload
-                ))
-
-                for i, chunk in enumerate(chunks):
-                    payload = {
-                        "text": chunk.get('text', ''),
-                        "chunk_index": i,
-                        "storage_mode": storage_mode,
-                        "is_parent": False,
-                        "parent_id": parent_id,
-                        **metadata
-                    }
-                    if 'metadata' in chunk:
-                        payload.update(chunk['metadata'])
-                    points.append(PointStruct(
-                        id=chunk.get('id', i),
-                        vector=chunk.get('embedding', []),
-                        payload=payload
-                    ))
-            else:
-                # Modalità fixed
-                for i, chunk in enumerate(chunks):
-                    payload = {
-                        "text": chunk.get('text', ''),
-                        "chunk_index": i,
-                        "storage_mode": storage_mode,
-                        **metadata
-                    }
-                    if 'metadata' in chunk:
-                        payload.update(chunk['metadata'])
-                    points.append(PointStruct(
-                        id=chunk.get('id', i),
-                        vector=chunk.get('embedding', []),
-                        payload=payload
-                    ))
-
-            # Inserisci i punti
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
+            existing: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+            retag: List[Any] = []
+            vector_size, total, batches = iter_point_batches(
+                chunks, metadata,
+                storage_mode=storage_mode,
+                parent_text=parent_text,
+                parent_vector=parent_vector,
+                vector_size=vector_size,
+                parent_pooling=parent_pooling,
+                normalize=normalize,
+                batch_size=batch_size,
+                document_id=document_id,
+                existing=existing,
+                sparse=sparse,
+                retag=retag
             )
 
-            logger.info(f"✅ Saved {len(points)} points to Qdrant (mode: {storage_mode})")
-            return True
+            if document_id is not None and incremental:
+                existing.update(self.get_point_hashes(document_id))
+
+            # Inserisci i punti (i punti invariati vengono saltati dal generatore)
+            stats = self.upsert_batches(batches, parallel=parallel, wait=wait, max_retries=max_retries)
+
+            # Punti invariati con tag cambiati: solo il payload del documento
+            if retag:
+                shared = _document_payload({**metadata, "document_id": document_id}, storage_mode, document_id)
+                step = batch_size or len(retag)
+                for start in range(0, len(retag), step):
+                    self.client.set_payload(
+                        collection_name=self.collection_name,
+                        payload=shared,
+                        points=retag[start:start + step],
+                        wait=wait
+                    )
+
+            # Rimasti in `existing`: punti del documento che non esistono più
+            stale = list(existing)
+            if stale:
+                self.delete_points(stale, batch_size=batch_size or len(stale))
+
+            stats.update({
+                'document_id': document_id,
+                'upserted': stats['points'],
+                'unchanged': total - stats['points'],
+                'retagged': len(retag),
+                'deleted': len(stale),
+                'points': total,
+            })
+            logger.info(f"✅ Saved {stats['upserted']}/{total} points to Qdrant in {stats['batches']} batch(es) "
+                        f"(mode: {storage_mode}, unchanged: {stats['unchanged']}, retagged: {stats['retagged']}, deleted: {stats['deleted']}, "
+                        f"retries: {stats['retries']})")
+            return stats
 
         except Exception as e:
             logger.error(f"❌ Error saving to Qdrant: {e}")
+            self._collections.invalidate(self.collection_name)
             raise
+
+    def get_point_hashes(self, document_id: str,
+                         page_size: int = 1000) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Id e impronte (`point_hash`, `metadata_hash`) dei punti già indicizzati per un documento.
+        
+        Legge solo i due campi del payload, senza vettori.
+        """
+        query_filter = Filter(must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))])
+        hashes: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=query_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=["point_hash", "metadata_hash"],
+                with_vectors=False
+            )
+            for record in records:
+                payload = record.payload or {}
+                hashes[str(record.id)] = (payload.get("point_hash"), payload.get("metadata_hash"))
+            if offset is None:
+                return hashes
+
+    def delete_points(self, point_ids: Sequence[Any], batch_size: int = 1000) -> int:
+        """Elimina punti per id, a batch. Ritorna il numero di id inviati."""
+        batch_size = max(1, int(batch_size))
+        for start in range(0, len(point_ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(point_ids[start:start + batch_size]))
+            )
+        logger.info(f"🗑️ Deleted {len(point_ids)} points from {self.collection_name}")
+        return len(point_ids)
+
+    def _is_local_client(self) -> bool:
+        return type(getattr(self.client, '_client', None)).__name__ == 'QdrantLocal'
+
+    def _upsert_batch(self, index: int, points: List[PointStruct], wait: bool,
+                      max_retries: int, retry_backoff: float) -> int:
+        """Upsert di un batch con retry e backoff esponenziale. Ritorna i retry effettuati."""
+        for attempt in range(max_retries + 1):
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+                return attempt
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = retry_backoff * (2 ** attempt)
+                logger.warning(f"⚠️ Upsert batch {index} failed ({e}), retry {attempt + 1}/{max_retries} "
+                               f"in {delay:.1f}s")
+                time.sleep(delay)
+        return max_retries
+
+    def upsert_batches(self, batches: Iterable[List[PointStruct]], parallel: int = 1, wait: bool = True,
+                       max_retries: int = 3, retry_backoff: float = 0.5) -> Dict[str, Any]:
+        """
+        Invia batch di punti con concorrenza limitata.
+        
+        I batch vengono letti dall'iterabile solo quando c'è un worker libero,
+        quindi un generatore (es. `iter_point_batches`) non viene mai
+        materializzato per intero. Ogni batch fallito viene ritentato da solo
+        fino a `max_retries` volte, senza rinviare gli altri.
+        
+        Con `wait=False` Qdrant conferma i batch appena registrati nel WAL,
+        senza attendere l'applicazione. L'ultimo batch fa da barriera: viene
+        inviato con wait=True solo dopo la conferma di tutti gli altri e,
+        poiché gli update di uno shard sono applicati in ordine, al ritorno
+        anche i batch precedenti sono applicati.
+        
+        Args:
+            batches: Iterabile di liste di PointStruct
+            parallel: Numero massimo di batch in volo
+            wait: Se False gli upsert intermedi non attendono l'indicizzazione
+            max_retries: Tentativi aggiuntivi per batch
+            retry_backoff: Attesa iniziale in secondi tra i tentativi (raddoppia)
+            
+        Returns:
+            dict: {'points', 'batches', 'retries', 'seconds'}
+            
+        Raises:
+            BatchUpsertError: Se almeno un batch fallisce dopo i retry
+        """
+        start = time.perf_counter()
+        stats = {'points': 0, 'batches': 0, 'retries': 0, 'seconds': 0.0}
+        failed: List[int] = []
+
+        def collect(index: int, future):
+            try:
+                stats['retries'] += future.result()
+            except Exception as e:
+                logger.error(f"❌ Upsert batch {index} failed after {max_retries} retries: {e}")
+                failed.append(index)
+
+        parallel = max(1, int(parallel))
+        if parallel > 1 and self._is_local_client():
+            # La modalità locale (':memory:' / path) non è thread-safe
+            parallel = 1
+        iterator = iter(batches)
+        held = next(iterator, None)
+        held_index = 0
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='qdrant-upsert') as executor:
+            pending: Dict[Any, int] = {}
+            for batch in iterator:
+                stats['points'] += len(held)
+                stats['batches'] += 1
+                future = executor.submit(self._upsert_batch, held_index, held, wait, max_retries, retry_backoff)
+                pending[future] = held_index
+                held, held_index = batch, held_index + 1
+                # Backpressure: il prossimo batch viene generato solo con un worker libero
+                while len(pending) >= parallel:
+                    done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(pending.pop(future), future)
+
+            # Barriera: tutti i batch precedenti confermati
+            for future in list(pending):
+                collect(pending.pop(future), future)
+
+        if held:
+            stats['points'] += len(held)
+            stats['batches'] += 1
+            try:
+                stats['retries'] += self._upsert_batch(held_index, held, True, max_retries, retry_backoff)
+            except Exception as e:
+                logger.error(f"❌ Upsert batch {held_index} failed after {max_retries} retries: {e}")
+                failed.append(held_index)
+
+        stats['seconds'] = time.perf_counter() - start
+        if failed:
+            raise BatchUpsertError(sorted(failed), stats)
+        return stats
     
-    def search(self, query_vector: List[float], filters: Optional[Dict[str, Any]] = None, 
-               limit: int = 10) -> List[Any]:
+    def search(self, query_vector: Sequence[float], filters: Optional[Dict[str, Any]] = None, 
+               limit: int = 10, query_filter: Optional[Filter] = None) -> List[Any]:
         """
         Cerca su Qdrant con filtri sul payload.
         
         Args:
-            query_vector: Vettore embedding della query
+            query_vector: Vettore embedding della query (lista o np.ndarray)
             filters: Dict con filtri (es. {"nome_obiettivo": "Progetto AI"})
             limit: Numero massimo di risultati
+            query_filter: Filter Qdrant già costruito, combinato con `filters`
             
         Returns:
             List[ScoredPoint]: Lista di risultati ordinati per score
@@ -201,30 +1163,327 @@ class QdrantManager:
             ...     print(f"Score: {hit.score}, Text: {hit.payload['text'][:50]}...")
         """
         try:
-            # Costruisci i filtri
-            query_filter = None
-            if filters:
-                conditions = []
-                for key, value in filters.items():
-                    conditions.append(
-                        FieldCondition(key=key, match=MatchValue(value=value))
-                    )
-                query_filter = Filter(must=conditions)
+            query_filter = build_filter(filters, query_filter)
+            vector = np.asarray(query_vector, dtype=np.float32).tolist()
+
+            # query_points sostituisce search nei client recenti (search è stato rimosso)
+            if hasattr(self.client, 'query_points'):
+                results = self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=vector,
+                    query_filter=query_filter,
+                    search_params=self.search_params(),
+                    limit=limit,
+                    with_payload=True
+                ).points
+            else:
+                results = self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=vector,
+                    query_filter=query_filter,
+                    search_params=self.search_params(),
+                    limit=limit
+                )
+            
+            logger.info(f"🔍 Found {len(results)} results from Qdrant")
+            return results
             
-            # Cerca
-            results = self.client.search(
+        except Exception as e:
+            logger.error(f"❌ Error searching Qdrant: {e}")
+            self._collections.invalidate(self.collection_name)
+            raise
+
+    def retrieve_parents(self, hits: Sequence[Any]) -> Dict[str, Any]:
+        """
+        Parent dei chunk trovati, letti con un'unica `retrieve` (senza vettori).
+        
+        Returns:
+            dict: parent_id -> Record, nell'ordine di primo ritrovamento
+        """
+        parent_ids: Dict[str, None] = {}
+        for hit in hits:
+            parent_id = (hit.payload or {}).get('parent_id')
+            if parent_id is not None:
+                parent_ids.setdefault(str(parent_id), None)
+        if not parent_ids:
+            return {}
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(parent_ids),
+            with_payload=True,
+            with_vectors=False
+        )
+        by_id = {str(r.id): r for r in records}
+        return {pid: by_id[pid] for pid in parent_ids if pid in by_id}
+
+    def search_sparse(self, sparse_vector: Any, filters: Optional[Dict[str, Any]] = None,
+                      limit: int = 10, query_filter: Optional[Filter] = None) -> List[Any]:
+        """
+        Ricerca lessicale sul vettore sparso BM25.
+        
+        Args:
+            sparse_vector: (indici, pesi) della query, es. `BM25Encoder.encode_query(text)`
+        """
+        try:
+            query_filter = build_filter(filters, query_filter)
+            sparse_vector = as_sparse_vector(sparse_vector)
+            if hasattr(self.client, 'query_points'):
+                return self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=sparse_vector,
+                    using=SPARSE_VECTOR_NAME,
+                    query_filter=query_filter,
+                    limit=limit,
+                    with_payload=True
+                ).points
+            from qdrant_client.models import NamedSparseVector
+            return self.client.search(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query_vector=NamedSparseVector(name=SPARSE_VECTOR_NAME, vector=sparse_vector),
                 query_filter=query_filter,
                 limit=limit
             )
+        except Exception as e:
+            logger.error(f"❌ Error searching Qdrant (sparse): {e}")
+            self._collections.invalidate(self.collection_name)
+            raise
+
+    def search_hybrid(self, query_vector: Sequence[float], sparse_vector: Any,
+                      filters: Optional[Dict[str, Any]] = None, limit: int = 10,
+                      query_filter: Optional[Filter] = None, candidates: Optional[int] = None) -> List[Any]:
+        """
+        Ricerca ibrida: ricerca densa e lessicale (BM25) fuse con la
+        reciprocal rank fusion.
+        
+        Con la Query API (server e client >= 1.10) le due ricerche e la
+        fusione avvengono in un'unica richiesta (prefetch + FusionQuery RRF);
+        altrimenti vengono eseguite due ricerche e la fusione avviene qui
+        (`reciprocal_rank_fusion`).
+        
+        Args:
+            candidates: Risultati per ciascuna ricerca prima della fusione (default 4 * limit, minimo 20)
             
-            logger.info(f"🔍 Found {len(results)} results from Qdrant")
-            return results
+        Example:
+            >>> hits = manager.search_hybrid(embedder.encode_one(q), bm25.encode_query(q), limit=5)
+        """
+        query_filter = build_filter(filters, query_filter)
+        candidates = candidates or max(4 * limit, 20)
+        if FusionQuery is None or not hasattr(self.client, 'query_points'):
+            dense = self.search(query_vector, limit=candidates, query_filter=query_filter)
+            lexical = self.search_sparse(sparse_vector, limit=candidates, query_filter=query_filter)
+            return reciprocal_rank_fusion([dense, lexical], limit=limit)
+        try:
+            return self.client.query_points(
+                collection_name=self.collection_name,
+                prefetch=[
+                    Prefetch(query=np.asarray(query_vector, dtype=np.float32).tolist(),
+                             filter=query_filter, params=self.search_params(), limit=candidates),
+                    Prefetch(query=as_sparse_vector(sparse_vector), using=SPARSE_VECTOR_NAME,
+                             filter=query_filter, limit=candidates),
+                ],
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=limit,
+                with_payload=True
+            ).points
+        except Exception as e:
+            logger.error(f"❌ Error searching Qdrant (hybrid): {e}")
+            self._collections.invalidate(self.collection_name)
+            raise
+
+    def search_by_mode(self, mode: str = 'dense', query_vector: Optional[Sequence[float]] = None,
+                       sparse_vector: Any = None, filters: Optional[Dict[str, Any]] = None,
+                       limit: int = 10, query_filter: Optional[Filter] = None) -> List[Any]:
+        """
+        Ricerca nella modalità indicata: 'dense', 'sparse' o 'hybrid' (vedi SEARCH_MODES).
+        """
+        if mode == 'dense':
+            return self.search(query_vector, filters=filters, limit=limit, query_filter=query_filter)
+        if mode == 'sparse':
+            return self.search_sparse(sparse_vector, filters=filters, limit=limit, query_filter=query_filter)
+        if mode == 'hybrid':
+            return self.search_hybrid(query_vector, sparse_vector, filters=filters, limit=limit,
+                                      query_filter=query_filter)
+        raise ValueError(f"Unknown search mode '{mode}'. Available: {SEARCH_MODES}")
+
+    def _query_request(self, mode: str, query_vector: Any, sparse_vector: Any,
+                       query_filter: Optional[Filter], limit: int) -> Any:
+        """Richiesta della Query API per una ricerca di `search_batch`."""
+        if mode == 'sparse':
+            return QueryRequest(query=as_sparse_vector(sparse_vector), using=SPARSE_VECTOR_NAME,
+                                filter=query_filter, limit=limit, with_payload=True)
+        dense = np.asarray(query_vector, dtype=np.float32).tolist()
+        if mode == 'dense':
+            return QueryRequest(query=dense, filter=query_filter, params=self.search_params(),
+                                limit=limit, with_payload=True)
+        candidates = max(4 * limit, 20)
+        return QueryRequest(
+            prefetch=[
+                Prefetch(query=dense, filter=query_filter, params=self.search_params(), limit=candidates),
+                Prefetch(query=as_sparse_vector(sparse_vector), using=SPARSE_VECTOR_NAME,
+                         filter=query_filter, limit=candidates),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF), limit=limit, with_payload=True
+        )
+
+    def search_batch(self, query_vectors: Optional[Sequence[Any]] = None, filters: Optional[Dict[str, Any]] = None,
+                     limit: int = 10, query_filter: Optional[Filter] = None, mode: str = 'dense',
+                     sparse_vectors: Optional[Sequence[Any]] = None) -> List[List[Any]]:
+        """
+        Più ricerche (es. varianti della stessa domanda) in un'unica
+        richiesta a Qdrant (`query_batch_points`, o `search_batch` sui
+        client precedenti alla Query API).
+        
+        Args:
+            query_vectors: Vettori densi delle query (per 'dense' e 'hybrid')
+            sparse_vectors: Vettori sparsi (indici, pesi) delle query (per 'sparse' e 'hybrid')
+            mode: 'dense', 'sparse' o 'hybrid', uguale per tutte le query
+            
+        Returns:
+            list: Una lista di risultati per query, nello stesso ordine
             
+        Example:
+            >>> results = manager.search_batch(embedder.encode(['budget cloud', 'costi migrazione']), limit=5)
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Available: {SEARCH_MODES}")
+        count = len(sparse_vectors if mode == 'sparse' else query_vectors)
+        query_vectors = query_vectors if query_vectors is not None else [None] * count
+        sparse_vectors = sparse_vectors if sparse_vectors is not None else [None] * count
+        if count == 0:
+            return []
+        query_filter = build_filter(filters, query_filter)
+        try:
+            if QueryRequest is not None and hasattr(self.client, 'query_batch_points'):
+                responses = self.client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=[self._query_request(mode, dense, sparse, query_filter, limit)
+                              for dense, sparse in zip(query_vectors, sparse_vectors)]
+                )
+                return [response.points for response in responses]
+            if mode == 'dense' and hasattr(self.client, 'search_batch'):
+                from qdrant_client.models import SearchRequest
+                return self.client.search_batch(
+                    collection_name=self.collection_name,
+                    requests=[SearchRequest(vector=np.asarray(v, dtype=np.float32).tolist(), filter=query_filter,
+                                            params=self.search_params(), limit=limit, with_payload=True)
+                              for v in query_vectors]
+                )
         except Exception as e:
-            logger.error(f"❌ Error searching Qdrant: {e}")
+            logger.error(f"❌ Error searching Qdrant (batch): {e}")
+            self._collections.invalidate(self.collection_name)
             raise
+        return [self.search_by_mode(mode, dense, sparse, limit=limit, query_filter=query_filter)
+                for dense, sparse in zip(query_vectors, sparse_vectors)]
+
+    def search_groups(self, query_vector: Optional[Sequence[float]] = None,
+                      filters: Optional[Dict[str, Any]] = None, limit: int = 10, group_size: int = 3,
+                      aggregation: str = 'max', group_by: str = 'parent_id', mode: str = 'dense',
+                      sparse_vector: Any = None) -> List[Dict[str, Any]]:
+        """
+        Ricerca raggruppata per documento: i migliori `limit` documenti,
+        ciascuno con i suoi `group_size` chunk migliori e il parent letto
+        nella stessa richiesta (`query_points_groups` con lookup).
+        
+        Qdrant ordina i gruppi per chunk migliore; con 'sum' e 'count' viene
+        chiesto un numero doppio di gruppi, riordinati qui per lo score
+        aggregato. Senza API di grouping (client vecchi o modalità non
+        supportate) i gruppi sono costruiti da una ricerca più ampia.
+        
+        Args:
+            group_size: Chunk per documento
+            aggregation: 'max', 'sum' o 'count' (vedi `aggregate_scores`)
+            group_by: Campo del payload che identifica il documento ('parent_id' o 'document_id')
+            
+        Returns:
+            list: Dict con 'id' del gruppo, 'score' aggregato, 'hits' (chunk) e 'parent'
+            (Record del parent, solo con group_by='parent_id')
+            
+        Example:
+            >>> for doc in manager.search_groups(query_emb, limit=5, aggregation='count'):
+            ...     print(doc['score'], doc['parent'].payload['text'][:80], len(doc['hits']))
+        """
+        if aggregation not in GROUP_AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{aggregation}'. Available: {GROUP_AGGREGATIONS}")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Available: {SEARCH_MODES}")
+        query_filter = build_filter(filters, children_filter())
+        candidates = limit if aggregation == 'max' else 2 * limit
+        lookup = WithLookup(collection=self.collection_name, with_payload=True,
+                            with_vectors=False) if group_by == 'parent_id' else None
+        try:
+            if QueryRequest is not None and hasattr(self.client, 'query_points_groups'):
+                request = self._query_request(mode, query_vector, sparse_vector, query_filter, candidates)
+                response = self.client.query_points_groups(
+                    collection_name=self.collection_name,
+                    group_by=group_by,
+                    query=request.query,
+                    using=request.using,
+                    prefetch=request.prefetch,
+                    query_filter=request.filter,
+                    search_params=request.params,
+                    limit=candidates,
+                    group_size=group_size,
+                    with_lookup=lookup
+                )
+                groups = [(g.id, g.hits, g.lookup) for g in response.groups]
+            elif hasattr(self.client, 'search_groups') and mode == 'dense':
+                response = self.client.search_groups(
+                    collection_name=self.collection_name,
+                    query_vector=np.asarray(query_vector, dtype=np.float32).tolist(),
+                    group_by=group_by,
+                    query_filter=query_filter,
+                    search_params=self.search_params(),
+                    limit=candidates,
+                    group_size=group_size,
+                    with_lookup=lookup
+                )
+                groups = [(g.id, g.hits, g.lookup) for g in response.groups]
+            else:
+                groups = self._group_hits(
+                    self.search_by_mode(mode, query_vector, sparse_vector, limit=candidates * group_size,
+                                        query_filter=query_filter),
+                    group_by, group_size, with_parents=lookup is not None
+                )
+        except Exception as e:
+            logger.error(f"❌ Error searching Qdrant (groups): {e}")
+            self._collections.invalidate(self.collection_name)
+            raise
+        documents = [
+            {'id': group_id, 'score': aggregate_scores([h.score for h in hits], aggregation),
+             'hits': hits, 'parent': parent}
+            for group_id, hits, parent in groups if hits
+        ]
+        documents.sort(key=lambda doc: doc['score'], reverse=True)
+        logger.info(f"🔍 Found {len(documents[:limit])} documents from Qdrant (aggregation: {aggregation})")
+        return documents[:limit]
+
+    def _group_hits(self, hits: Sequence[Any], group_by: str, group_size: int,
+                    with_parents: bool) -> List[Tuple[Any, List[Any], Any]]:
+        """Raggruppamento lato client (client senza API di grouping)."""
+        groups: Dict[Any, List[Any]] = {}
+        for hit in hits:
+            key = (hit.payload or {}).get(group_by)
+            if key is not None and len(groups.setdefault(key, [])) < group_size:
+                groups[key].append(hit)
+        parents = self.retrieve_parents([h for g in groups.values() for h in g]) if with_parents else {}
+        return [(key, group, parents.get(str(key))) for key, group in groups.items()]
+
+    def search_with_parents(self, query_vector: Optional[Sequence[float]] = None,
+                            filters: Optional[Dict[str, Any]] = None, limit: int = 10,
+                            mode: str = 'dense', sparse_vector: Any = None) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Ricerca small-to-big: cerca solo tra i chunk child e ritorna anche i
+        loro parent deduplicati (una sola `retrieve` per tutti i risultati).
+        
+        Returns:
+            tuple: (hits dei chunk, dict parent_id -> Record del parent)
+            
+        Example:
+            >>> hits, parents = manager.search_with_parents(query_emb, {'nome_obiettivo': 'Progetto AI'})
+        """
+        hits = self.search_by_mode(mode, query_vector, sparse_vector, filters=filters, limit=limit,
+                                   query_filter=children_filter())
+        return hits, self.retrieve_parents(hits)
     
     def delete_by_filter(self, filters: Dict[str, Any]) -> bool:
         """
@@ -241,16 +1500,9 @@ class QdrantManager:
             >>> manager.delete_by_filter({"nome_obiettivo": "Vecchio Progetto"})
         """
         try:
-            conditions = []
-            for key, value in filters.items():
-                conditions.append(
-                    FieldCondition(key=key, match=MatchValue(value=value))
-                )
-            query_filter = Filter(must=conditions)
-            
             self.client.delete(
                 collection_name=self.collection_name,
-                points_selector=query_filter
+                points_selector=build_filter(filters)
             )
             
             logger.info(f"🗑️ Deleted points matching filters: {filters}")
@@ -259,6 +1511,84 @@ class QdrantManager:
         except Exception as e:
             logger.error(f"❌ Error deleting from Qdrant: {e}")
             raise
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Numero esatto di punti della collection (filtrati dal payload)."""
+        return self.client.count(collection_name=self.collection_name,
+                                 count_filter=build_filter(filters), exact=True).count
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        Elimina tutti i punti (parent e chunk) di un documento con un delete
+        filtrato sul campo indicizzato `document_id`.
+
+        Returns:
+            int: Numero di punti eliminati
+        """
+        filters = {'document_id': document_id}
+        deleted = self.count(filters)
+        if deleted:
+            self.delete_by_filter(filters)
+        return deleted
+
+    def scroll_pages(self, page_size: int = 1000, scroll_filter: Optional[Filter] = None, offset: Any = None,
+                     with_payload: Any = True, with_vectors: Any = False) -> Iterator[Tuple[List[Any], Any]]:
+        """
+        Scorre la collection (in ordine di id) una pagina alla volta.
+
+        Yields:
+            tuple: (record della pagina, offset della pagina successiva; None all'ultima)
+        """
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors
+            )
+            yield records, offset
+            if offset is None:
+                return
+
+    def document_counts(self, page_size: int = 1000) -> Dict[Optional[str], int]:
+        """
+        Punti per `document_id` su tutta la collection (chiave None per i punti
+        senza `document_id`). Scroll a pagine leggendo solo quel campo.
+        """
+        counts: Dict[Optional[str], int] = {}
+        for records, _ in self.scroll_pages(page_size, with_payload=["document_id"]):
+            for record in records:
+                document_id = (record.payload or {}).get("document_id")
+                counts[document_id] = counts.get(document_id, 0) + 1
+        return counts
+
+    def point_fingerprints(self, page_size: int = 1000) -> Dict[Optional[str], Dict[Any, str]]:
+        """
+        Per ogni `document_id` (None per i punti senza) gli id dei punti e
+        l'impronta del loro payload, escluso `point_hash` che dipende dal
+        vettore: due collection con gli stessi documenti ma embedding diversi
+        hanno le stesse impronte.
+        """
+        fingerprints: Dict[Optional[str], Dict[Any, str]] = {}
+        for records, _ in self.scroll_pages(page_size):
+            for record in records:
+                payload = {k: v for k, v in (record.payload or {}).items() if k != "point_hash"}
+                fingerprints.setdefault(payload.get("document_id"), {})[record.id] = _point_hash(b'', payload)
+        return fingerprints
+
+    def delete_documents(self, document_ids: Sequence[str], batch_size: int = 256) -> int:
+        """Elimina i punti di più documenti, un delete filtrato ogni `batch_size` id. Ritorna gli id inviati."""
+        document_ids = list(document_ids)
+        batch_size = max(1, int(batch_size))
+        for start in range(0, len(document_ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=build_filter({'document_id': document_ids[start:start + batch_size]})
+            )
+        logger.info(f"🗑️ Deleted points of {len(document_ids)} documents from {self.collection_name}")
+        return len(document_ids)
     
     def get_collection_info(self) -> Dict[str, Any]:
         """
@@ -284,6 +1614,248 @@ class QdrantManager:
             raise
 
 
+class QdrantRegistry:
+    """
+    Registry thread-safe dei QdrantManager, uno per collection.
+
+    Tutti i manager condividono lo stesso client (e quindi le connessioni)
+    e la stessa `CollectionCache`. Richieste concorrenti su collection
+    diverse usano manager distinti invece di cambiare `collection_name`
+    su un manager condiviso. `collection_profiles` sceglie il profilo di
+    storage per collection (default `storage_profile`).
+
+    Example:
+        >>> registry = QdrantRegistry(host='localhost', port=6333)
+        >>> registry.get('meetings_notes').index_document(chunks, metadata, document_id='doc-42')
+    """
+
+    def __init__(self, host='localhost', port=6333, client: Optional[QdrantClient] = None,
+                 payload_indexes: Optional[Dict[str, PayloadSchemaType]] = None, sparse_vectors: bool = False,
+                 storage_profile: Any = 'default', collection_profiles: Optional[Dict[str, Any]] = None,
+                 search_workers: int = 8, collection_cache_ttl: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.payload_indexes = payload_indexes
+        self.sparse_vectors = sparse_vectors
+        self.storage_profile = storage_profile
+        self.collection_profiles = dict(collection_profiles or {})
+        self.client = client if client is not None else create_qdrant_client(host=host, port=port)
+        self.collections = CollectionCache(ttl=collection_cache_ttl)
+        self._managers: Dict[str, QdrantManager] = {}
+        self._lock = threading.Lock()
+        self._search_executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix='qdrant-search')
+
+    def get(self, collection_name: str) -> QdrantManager:
+        """Manager della collection (creato alla prima richiesta)."""
+        manager = self._managers.get(collection_name)
+        if manager is None:
+            with self._lock:
+                manager = self._managers.get(collection_name)
+                if manager is None:
+                    manager = self._managers[collection_name] = QdrantManager(
+                        self.host, self.port, collection_name,
+                        client=self.client, collections=self.collections,
+                        payload_indexes=self.payload_indexes, sparse_vectors=self.sparse_vectors,
+                        storage_profile=self.collection_profiles.get(collection_name, self.storage_profile)
+                    )
+        return manager
+
+    def search_collections(self, collections: Sequence[str], query_vectors: Optional[Sequence[Any]] = None,
+                           filters: Optional[Dict[str, Any]] = None, limit: int = 10,
+                           query_filter: Optional[Filter] = None, mode: str = 'dense',
+                           sparse_vectors: Optional[Sequence[Any]] = None,
+                           normalization: str = 'minmax') -> List[Tuple[str, Any]]:
+        """
+        Cerca una o più query su più collection: una `search_batch` per
+        collection, eseguite in parallelo, poi `merge_results` (deduplica per
+        `parent_id`).
+        
+        Le collection che non esistono ancora vengono saltate; le collection
+        senza vettore sparso usano la ricerca densa. Gli score sono normalizzati
+        per query insieme sulle collection cercate con la stessa modalità, e a
+        parte per ogni modalità: score di fusione (RRF) e coseno hanno scale
+        diverse e non vanno confrontati prima della normalizzazione.
+        
+        Returns:
+            list: Coppie (collection, hit) ordinate per score normalizzato
+            
+        Example:
+            >>> hits = registry.search_collections(['meetings_notes', 'documents'], [query_emb], limit=10)
+            >>> for collection, hit in hits:
+            ...     print(collection, hit.score, hit.payload['text'][:50])
+        """
+        managers = [self.get(name) for name in dict.fromkeys(collections)]
+        managers = [m for m in managers if m.collection_info() is not None]
+
+        def run(manager):
+            manager_mode = mode if mode == 'dense' or manager.has_sparse_vectors() else 'dense'
+            if manager_mode == 'dense' and query_vectors is None:
+                logger.warning(f"⚠️ Collection '{manager.collection_name}' has no sparse vectors, skipped")
+                return manager_mode, []
+            return manager_mode, manager.search_batch(query_vectors, limit=limit, filters=filters,
+                                                      query_filter=query_filter, mode=manager_mode,
+                                                      sparse_vectors=sparse_vectors)
+
+        if len(managers) > 1 and not any(m._is_local_client() for m in managers):
+            batches = list(self._search_executor.map(run, managers))
+        else:
+            batches = [run(m) for m in managers]
+        result_lists, sources, groups = [], [], []
+        for manager, (manager_mode, results) in zip(managers, batches):
+            result_lists.extend(results)
+            sources.extend([manager.collection_name] * len(results))
+            groups.extend((i, manager_mode) for i in range(len(results)))
+        return merge_results(result_lists, limit=limit, normalization=normalization, sources=sources, groups=groups)
+
+    def collection_names(self) -> List[str]:
+        """Nomi delle collection presenti sul server."""
+        return sorted(c.name for c in self.client.get_collections().collections)
+
+    def delete_document(self, document_id: str, collections: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Eliminazione a cascata dei punti di un documento da tutte le collection
+        (il documento KB non registra la collection scelta all'upload).
+
+        Returns:
+            dict: Collection -> punti eliminati (solo collection con punti del documento)
+        """
+        deleted = {}
+        for name in collections or self.collection_names():
+            manager = self.get(name)
+            if manager.collection_info() is None:
+                continue
+            count = manager.delete_document(document_id)
+            if count:
+                deleted[name] = count
+        logger.info(f"🗑️ Deleted {sum(deleted.values())} points of document {document_id}: {deleted}")
+        return deleted
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Dimentica i metadata in cache (di una collection o di tutte)."""
+        self.collections.invalidate(collection_name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            managers = sorted(self._managers)
+        return {'managers': managers, 'collections': self.collections.snapshot()}
+
+
+class OrphanSweeper:
+    """
+    Rimuove in background i punti dei documenti che non esistono più (es.
+    documenti KB cancellati prima dell'eliminazione a cascata).
+
+    `live_document_ids` è una callable che ritorna gli id dei documenti
+    esistenti. Viene chiamata dopo lo scroll delle collection: la riga di un
+    documento è creata prima dei suoi punti, quindi un upload in corso non
+    viene mai scambiato per orfano. I punti senza `document_id` (upload
+    precedenti agli id deterministici o scritti da altri) non vengono mai
+    eliminati, solo contati.
+
+    Le `collections` vanno indicate esplicitamente e devono contenere solo
+    punti dei documenti di `live_document_ids`: senza collection lo sweeper
+    non fa nulla, così una collection non KB sullo stesso server non viene
+    mai svuotata.
+
+    Example:
+        >>> sweeper = OrphanSweeper(registry, lambda: {'doc-1', 'doc-2'}, interval=3600,
+        ...                         collections=['meetings_notes'])
+        >>> sweeper.sweep(dry_run=True)['orphan_points']
+        >>> sweeper.start()
+    """
+
+    def __init__(self, registry: QdrantRegistry, live_document_ids, interval: float = 3600,
+                 batch_size: int = 256, collections: Optional[Sequence[str]] = None, page_size: int = 1000):
+        self.registry = registry
+        self.live_document_ids = live_document_ids
+        self.interval = interval
+        self.batch_size = batch_size
+        self.collections = list(collections or [])
+        self.page_size = page_size
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Un passaggio completo: scroll dei `document_id` di ogni collection,
+        confronto con i documenti esistenti, delete a batch degli orfani.
+
+        Returns:
+            dict: Totali e dettaglio per collection; `skipped` se l'elenco dei
+            documenti esistenti è vuoto mentre le collection hanno punti
+        """
+        with self._lock:
+            start = time.perf_counter()
+            counts = {}
+            for name in self.collections:
+                manager = self.registry.get(name)
+                if manager.collection_info() is not None:
+                    counts[name] = manager.document_counts(self.page_size)
+            live = {str(document_id) for document_id in self.live_document_ids()}
+
+            stats: Dict[str, Any] = {'dry_run': dry_run, 'orphan_documents': 0, 'orphan_points': 0,
+                                     'legacy_points': 0, 'collections': {}}
+            if not live and any(counts.values()):
+                # Un elenco vuoto con punti presenti è quasi sempre un errore di configurazione
+                logger.warning("⚠️ Orphan sweep skipped: no live documents but collections are not empty")
+                stats['skipped'] = 'no live documents'
+                counts = {}
+
+            for name, documents in counts.items():
+                orphans = [d for d in documents if d is not None and d not in live]
+                collection_stats = {
+                    'documents': len(documents) - (None in documents),
+                    'orphan_documents': len(orphans),
+                    'orphan_points': sum(documents[d] for d in orphans),
+                    'legacy_points': documents.get(None, 0)
+                }
+                if orphans and not dry_run:
+                    self.registry.get(name).delete_documents(orphans, batch_size=self.batch_size)
+                stats['collections'][name] = collection_stats
+                for key in ('orphan_documents', 'orphan_points', 'legacy_points'):
+                    stats[key] += collection_stats[key]
+
+            stats['seconds'] = round(time.perf_counter() - start, 3)
+            stats['finished_at'] = datetime.now().isoformat()
+            self.last_run = stats
+        logger.info(f"🧹 Orphan sweep{' (dry run)' if dry_run else ''}: {stats['orphan_points']} points of "
+                    f"{stats['orphan_documents']} documents in {len(stats['collections'])} collections "
+                    f"({stats['seconds']}s)")
+        return stats
+
+    def start(self):
+        """
+        Avvia il thread periodico (idempotente e thread-safe, quindi può essere
+        chiamato a ogni richiesta; nessun thread se `interval` <= 0 o se non
+        ci sono collection da controllare).
+        """
+        if self.interval <= 0 or not self.collections or self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='qdrant-orphan-sweeper', daemon=True)
+            self._thread.start()
+        logger.info(f"✅ Orphan sweeper started (every {self.interval:.0f}s)")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"❌ Orphan sweep failed: {e}", exc_info=True)
+
+
 # ========== FUNZIONI HELPER ==========
 
 def create_qdrant_client(host='localhost', port=6333):
@@ -0,0 +1,126 @@
+"""
+Utility per il riuso delle sessioni dei runtime AgentCore.
+Fornisce un pool di runtimeSessionId "caldi" per ARN di agente, da usare per
+le chiamate stateless agli agenti di utilità: le invocazioni successive
+atterrano su una sessione già avviata invece di pagare ogni volta il cold start.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeSessionPool:
+    """
+    Pool limitato di session id per ogni ARN di agente.
+
+    Una sessione è in uso da un solo chiamante alla volta (lease esclusivo).
+    Se non ci sono sessioni libere ne viene creata una nuova, senza mai
+    bloccare; al rilascio viene conservata solo se il pool dell'ARN ha posto.
+    Le sessioni vengono scartate (rotazione) se la chiamata fallisce, se
+    superano `max_age` o se sono rimaste inattive oltre `max_idle` (il
+    runtime le avrebbe comunque terminate).
+
+    Example:
+        >>> pool = RuntimeSessionPool(size=4, max_age=3600, max_idle=840)
+        >>> with pool.session(agent_arn) as session_id:
+        ...     client.invoke_agent_runtime(agentRuntimeArn=agent_arn,
+        ...                                 runtimeSessionId=session_id, payload=data)
+    """
+
+    def __init__(self, size: int = 4, max_age: float = 3600.0, max_idle: float = 840.0):
+        """
+        Args:
+            size: Sessioni calde conservate per ogni ARN
+            max_age: Età massima di una sessione in secondi
+            max_idle: Inattività massima in secondi prima di considerarla fredda
+        """
+        self.size = max(0, int(size))
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        # ARN -> deque di (session_id, created_at, last_used_at); in coda le più recenti
+        self._idle: Dict[str, Deque[Tuple[str, float, float]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, agent_arn: str) -> Dict[str, int]:
+        return self._stats.setdefault(agent_arn, {
+            'warm': 0, 'cold': 0, 'rotated': 0, 'expired': 0, 'in_use': 0
+        })
+
+    def _is_expired(self, created_at: float, last_used_at: float, now: float) -> bool:
+        return now - created_at >= self.max_age or now - last_used_at >= self.max_idle
+
+    def acquire(self, agent_arn: str) -> Tuple[str, float, bool]:
+        """
+        Prende in lease una sessione per l'ARN.
+
+        Returns:
+            tuple: (session_id, created_at, warm)
+        """
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters(agent_arn)
+            idle = self._idle.get(agent_arn)
+            while idle:
+                session_id, created_at, last_used_at = idle.pop()
+                if self._is_expired(created_at, last_used_at, now):
+                    counters['expired'] += 1
+                    continue
+                counters['warm'] += 1
+                counters['in_use'] += 1
+                return session_id, created_at, True
+            counters['cold'] += 1
+            counters['in_use'] += 1
+        return str(uuid.uuid4()), now, False
+
+    def release(self, agent_arn: str, session_id: str, created_at: float, failed: bool = False):
+        """Restituisce la sessione al pool, o la scarta se la chiamata è fallita o è scaduta."""
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters(agent_arn)
+            counters['in_use'] -= 1
+            if failed:
+                counters['rotated'] += 1
+                logger.info(f"♻️ Rotating agent session {session_id[:8]} after error")
+                return
+            if now - created_at >= self.max_age:
+                counters['expired'] += 1
+                return
+            idle = self._idle.setdefault(agent_arn, deque())
+            if len(idle) < self.size:
+                idle.append((session_id, created_at, now))
+
+    @contextmanager
+    def session(self, agent_arn: str) -> Iterator[str]:
+        """Context manager: lease di una sessione, ruotata se il blocco solleva un'eccezione."""
+        session_id, created_at, warm = self.acquire(agent_arn)
+        logger.debug(f"🔥 Agent session {session_id[:8]} ({'warm' if warm else 'cold'})")
+        failed = True
+        try:
+            yield session_id
+            failed = False
+        finally:
+            self.release(agent_arn, session_id, created_at, failed=failed)
+
+    def clear(self, agent_arn: str = None):
+        """Scarta le sessioni libere (di un ARN o di tutti)."""
+        with self._lock:
+            if agent_arn is None:
+                self._idle.clear()
+            else:
+                self._idle.pop(agent_arn, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per ARN: lease calde/fredde, rotazioni, scadenze, sessioni libere e in uso."""
+        with self._lock:
+            return {
+                arn: {**counters, 'idle': len(self._idle.get(arn, ()))}
+                for arn, counters in self._stats.items()
+            }
@@ -0,0 +1,89 @@
+"""
+Test locale per la cache delle risposte (cache_utils.py).
+Esegui: python test_cache_utils.py
+"""
+
+import os
+import sys
+import threading
+
+# Aggiungi directory parent al path per import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache_utils import ResponseCache
+
+
+def test_invalidate_discards_inflight_reads():
+    """Le letture partite prima di un'invalidazione non ripopolano la cache"""
+    cache = ResponseCache(ttl=60)
+    readers = 8
+    started = threading.Barrier(readers + 1)
+    invalidated = threading.Event()
+    saved = []
+
+    def reader(i):
+        generation = cache.generation('goals')
+        started.wait()
+        invalidated.wait()
+        saved.append(cache.set('goals', ('reader', i), 'vecchio', generation=generation))
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    started.wait()
+    cache.invalidate('goals')
+    invalidated.set()
+    for t in threads:
+        t.join()
+
+    assert saved == [False] * readers, saved
+    assert all(cache.get('goals', ('reader', i)) is None for i in range(readers))
+    assert cache.set('goals', ('reader', 0), 'nuovo', generation=cache.generation('goals'))
+
+
+def test_concurrent_read_through_never_serves_stale():
+    """Con letture e scritture concorrenti, dopo l'ultima scrittura la cache non contiene valori vecchi"""
+    cache = ResponseCache(ttl=60)
+    state = {'version': 0}
+    state_lock = threading.Lock()
+    stop = threading.Event()
+
+    def read_through():
+        while not stop.is_set():
+            if cache.get('tasks', 'list') is not None:
+                continue
+            generation = cache.generation('tasks')
+            with state_lock:
+                value = state['version']
+            cache.set('tasks', 'list', value, generation=generation)
+
+    threads = [threading.Thread(target=read_through) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for version in range(1, 301):
+        # Scrittura come nelle route: prima il dato, poi l'invalidazione
+        with state_lock:
+            state['version'] = version
+        cache.invalidate('tasks')
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert cache.get('tasks', 'list') in (None, 300), cache.get('tasks', 'list')
+
+
+def test_invalidate_is_per_namespace():
+    """L'invalidazione di un namespace non tocca gli altri"""
+    cache = ResponseCache(ttl=60)
+    goals, needs = cache.generation('goals'), cache.generation('needs')
+    cache.invalidate('goals')
+    assert not cache.set('goals', (), 'a', generation=goals)
+    assert cache.set('needs', (), 'b', generation=needs)
+    assert cache.get('needs', ()) == 'b'
+
+
+if __name__ == "__main__":
+    for test in (test_invalidate_discards_inflight_reads, test_concurrent_read_through_never_serves_stale,
+                 test_invalidate_is_per_namespace):
+        test()
+        print(f"OK  {test.__name__}")
@@ -0,0 +1,130 @@
+"""
+Test locale per la coda di job persistente (job_utils.py).
+Esegui: python test_job_utils.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Aggiungi directory parent al path per import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_utils import JobQueue, JOB_RUNNING, JOB_SUCCEEDED
+
+
+def _db_path():
+    return os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3')
+
+
+def _wait_status(queue, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id}: {queue.get(job_id)['status']} != {status}")
+
+
+def _simulate_crash(queue, job_id, heartbeat_age):
+    """Marca il job come 'running' di un processo morto con l'ultimo heartbeat di `heartbeat_age` secondi fa"""
+    queue._conn.execute(
+        "UPDATE jobs SET status = ?, owner = 'dead-worker', heartbeat_at = ? WHERE id = ?",
+        (JOB_RUNNING, time.time() - heartbeat_age, job_id)
+    )
+
+
+def test_crashed_running_job_is_resumed():
+    """Un job 'running' con il lease scaduto viene ripreso ed eseguito"""
+    db_path = _db_path()
+    first = JobQueue(db_path, lambda *args: None)
+    job_id = first.enqueue('test', {'n': 1})
+    _simulate_crash(first, job_id, heartbeat_age=120)
+
+    queue = JobQueue(db_path, lambda job_id, payload, blob, report: {'n': payload['n']},
+                     poll_interval=0.05, lease_timeout=30)
+    queue.start()
+    try:
+        job = _wait_status(queue, job_id, JOB_SUCCEEDED)
+        assert job['result'] == {'n': 1}, job
+        assert job['attempts'] == 1, job
+    finally:
+        queue.stop(timeout=2)
+
+
+def test_live_running_job_is_not_taken():
+    """Un job 'running' di un altro processo con heartbeat recente resta al suo owner"""
+    db_path = _db_path()
+    first = JobQueue(db_path, lambda *args: None)
+    job_id = first.enqueue('test', {})
+    _simulate_crash(first, job_id, heartbeat_age=1)
+    other_id = first.enqueue('test', {})
+
+    calls = []
+    queue = JobQueue(db_path, lambda job_id, *args: calls.append(job_id), poll_interval=0.05, lease_timeout=30)
+    queue.start()
+    try:
+        _wait_status(queue, other_id, JOB_SUCCEEDED)
+        time.sleep(0.2)
+        assert calls == [other_id], calls
+        assert queue.get(job_id)['status'] == JOB_RUNNING
+    finally:
+        queue.stop(timeout=2)
+
+
+def test_checkpoint_survives_resume():
+    """I checkpoint salvati prima del crash arrivano nel payload del tentativo successivo"""
+    db_path = _db_path()
+    first = JobQueue(db_path, lambda *args: None)
+    job_id = first.enqueue('test', {'text': 'ciao'})
+    assert first._claim()['id'] == job_id
+    first.checkpoint(job_id, document_id='doc-1')
+    _simulate_crash(first, job_id, heartbeat_age=120)
+
+    payloads = []
+    queue = JobQueue(db_path, lambda job_id, payload, blob, report: payloads.append(payload),
+                     poll_interval=0.05, lease_timeout=30)
+    queue.start()
+    try:
+        job = _wait_status(queue, job_id, JOB_SUCCEEDED)
+        assert payloads == [{'text': 'ciao', 'document_id': 'doc-1'}], payloads
+        assert job['attempts'] == 2, job
+    finally:
+        queue.stop(timeout=2)
+
+
+def test_heartbeat_keeps_lease():
+    """Un job lungo non viene ripreso da un altro processo finché l'heartbeat è vivo"""
+    db_path = _db_path()
+    release = []
+
+    def slow(job_id, payload, blob, report):
+        while not release:
+            time.sleep(0.02)
+        return 'done'
+
+    owner = JobQueue(db_path, slow, workers=1, poll_interval=0.05, lease_timeout=0.3)
+    other = JobQueue(db_path, lambda *args: 'stolen', workers=1, poll_interval=0.05, lease_timeout=0.3)
+    owner.start()
+    try:
+        job_id = owner.enqueue('test', {})
+        _wait_status(owner, job_id, JOB_RUNNING)
+        other.start()
+        time.sleep(1.0)
+        assert other.get(job_id)['status'] == JOB_RUNNING
+        release.append(True)
+        job = _wait_status(owner, job_id, JOB_SUCCEEDED)
+        assert job['result'] == 'done' and job['attempts'] == 1, job
+    finally:
+        release.append(True)
+        owner.stop(timeout=2)
+        other.stop(timeout=2)
+
+
+if __name__ == "__main__":
+    for test in (test_crashed_running_job_is_resumed, test_live_running_job_is_not_taken,
+                 test_checkpoint_survives_resume, test_heartbeat_keeps_lease):
+        test()
+        print(f"OK  {test.__name__}")
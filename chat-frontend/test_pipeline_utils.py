@@ -0,0 +1,109 @@
+"""
+Test locale per la pipeline a stadi (pipeline_utils.py).
+Esegui: python test_pipeline_utils.py
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Aggiungi directory parent al path per import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline_utils import StagePipeline, StageFailed
+
+
+def test_dependency_ordering():
+    """Uno stadio parte solo dopo le sue dipendenze e ne riceve i risultati in ordine di dichiarazione"""
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, value, delay=0.0):
+        def run(*args):
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return value(*args) if callable(value) else value
+        return run
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pipeline = StagePipeline(executor)
+        pipeline.add('slow', stage('slow', 2, delay=0.05))
+        pipeline.add('fast', stage('fast', 3))
+        pipeline.add('diff', stage('diff', lambda slow, fast: slow - fast), deps=['slow', 'fast'])
+        pipeline.add('reverse', stage('reverse', lambda fast, slow: fast - slow), deps=['fast', 'slow'])
+        pipeline.add('last', stage('last', lambda diff: diff * 10), deps=['diff'])
+        results = pipeline.run()
+
+    assert results == {'slow': 2, 'fast': 3, 'diff': -1, 'reverse': 1, 'last': -10}, results
+    assert order.index('fast') < order.index('slow'), order
+    assert order.index('slow') < min(order.index('diff'), order.index('reverse')), order
+    assert order.index('diff') < order.index('last'), order
+
+
+def test_independent_stages_run_concurrently():
+    """Gli stadi senza dipendenze tra loro vengono eseguiti in parallelo"""
+    both_running = threading.Barrier(2, timeout=2)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = StagePipeline(executor)
+        pipeline.add('a', lambda: both_running.wait() is not None)
+        pipeline.add('b', lambda: both_running.wait() is not None)
+        results = pipeline.run()
+
+    assert results == {'a': True, 'b': True}, results
+
+
+def test_failure_propagation():
+    """Un errore ferma gli stadi dipendenti (skipped), attende quelli in corso e arriva al chiamante"""
+    events = []
+    finished = threading.Event()
+
+    def broken(value):
+        raise LookupError("documento non trovato")
+
+    def independent():
+        time.sleep(0.05)
+        finished.set()
+        return 'ok'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pipeline = StagePipeline(executor, listener=lambda stage, status, info: events.append((stage, status)))
+        pipeline.add('source', lambda: 1)
+        pipeline.add('independent', independent)
+        pipeline.add('broken', broken, deps=['source'])
+        pipeline.add('after', lambda value: value, deps=['broken'])
+        pipeline.add('join', lambda value, other: value, deps=['after', 'independent'])
+        try:
+            pipeline.run()
+            raise AssertionError("StageFailed non sollevata")
+        except StageFailed as e:
+            assert e.stage == 'broken', e.stage
+            assert isinstance(e.error, LookupError), e.error
+
+    assert finished.is_set(), "gli stadi già in esecuzione vanno attesi"
+    assert ('broken', 'failed') in events, events
+    assert ('after', 'skipped') in events and ('join', 'skipped') in events, events
+    assert ('after', 'running') not in events and ('join', 'running') not in events, events
+    assert 'independent' in pipeline.timings and 'after' not in pipeline.timings
+
+
+def test_unknown_dependency_rejected():
+    """Le dipendenze devono essere stadi già aggiunti (niente cicli)"""
+    pipeline = StagePipeline(executor=None)
+    pipeline.add('a', lambda: 1)
+    for name, deps in (('b', ['missing']), ('a', [])):
+        try:
+            pipeline.add(name, lambda *args: None, deps=deps)
+            raise AssertionError(f"add('{name}') accettato")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    for test in (test_dependency_ordering, test_independent_stages_run_concurrently,
+                 test_failure_propagation, test_unknown_dependency_rejected):
+        test()
+        print(f"OK  {test.__name__}")
@@ -0,0 +1,170 @@
+"""
+Test locale per QdrantManager (qdrant_utils.py).
+Esegui: python test_qdrant_utils.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Aggiungi directory parent al path per import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_utils import BatchUpsertError, QdrantManager, _point, chunk_point_ids
+
+
+class RecordingClient:
+    """Client finto: registra ogni upsert (batch, wait, inizio, fine) e può fallire a comando"""
+
+    def __init__(self, delays=None, failures=None):
+        self.delays = delays or {}
+        self.failures = dict(failures or {})
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, collection_name, points, wait):
+        batch = points[0].id // 10
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            start = time.perf_counter()
+        try:
+            time.sleep(self.delays.get(batch, 0.01))
+            with self._lock:
+                if self.failures.get(batch, 0) > 0:
+                    self.failures[batch] -= 1
+                    raise ConnectionError(f"batch {batch} rifiutato")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.calls.append({'batch': batch, 'wait': wait, 'start': start, 'end': time.perf_counter()})
+
+
+def _batches(count, size=10):
+    return [[_point(b * 10 + i, [0.1, 0.2], {}) for i in range(size)] for b in range(count)]
+
+
+def test_upsert_barrier_waits_for_previous_batches():
+    """Con wait=False l'ultimo batch parte con wait=True solo dopo la conferma di tutti gli altri"""
+    client = RecordingClient(delays={0: 0.08, 2: 0.05})
+    manager = QdrantManager(collection_name='test', client=client)
+    stats = manager.upsert_batches(iter(_batches(5)), parallel=3, wait=False)
+
+    assert stats['points'] == 50 and stats['batches'] == 5 and stats['retries'] == 0, stats
+    last = [c for c in client.calls if c['batch'] == 4]
+    others = [c for c in client.calls if c['batch'] != 4]
+    assert len(last) == 1 and last[0]['wait'] is True, last
+    assert all(c['wait'] is False for c in others), others
+    assert last[0]['start'] >= max(c['end'] for c in others), client.calls
+    assert 1 < client.max_in_flight <= 3, client.max_in_flight
+
+
+def test_upsert_backpressure_is_lazy():
+    """Il generatore dei batch avanza solo quando c'è un worker libero"""
+    client = RecordingClient()
+    manager = QdrantManager(collection_name='test', client=client)
+    produced = []
+
+    def batches():
+        for b, batch in enumerate(_batches(6)):
+            with client._lock:
+                produced.append((b, len(client.calls)))
+            yield batch
+
+    manager.upsert_batches(batches(), parallel=2, wait=True)
+    # Quando viene generato il batch b sono stati inviati i batch 0..b-2, al più uno non ancora confermato
+    assert all(b - done <= 2 for b, done in produced), produced
+
+
+def test_upsert_retries_only_failed_batch():
+    """Un batch fallito viene ritentato da solo; se fallisce sempre si ottiene BatchUpsertError"""
+    client = RecordingClient(failures={1: 1})
+    manager = QdrantManager(collection_name='test', client=client)
+    stats = manager.upsert_batches(_batches(3), parallel=2, wait=False, retry_backoff=0.01)
+    assert stats['retries'] == 1, stats
+    assert sorted(c['batch'] for c in client.calls) == [0, 1, 1, 2], client.calls
+
+    client = RecordingClient(failures={0: 10})
+    manager = QdrantManager(collection_name='test', client=client)
+    try:
+        manager.upsert_batches(_batches(3), parallel=2, wait=False, max_retries=2, retry_backoff=0.01)
+        raise AssertionError("BatchUpsertError non sollevata")
+    except BatchUpsertError as e:
+        assert e.failed == [0], e.failed
+        assert e.stats['batches'] == 3, e.stats
+    # La barriera parte comunque dopo gli altri batch
+    assert [c['batch'] for c in client.calls][-1] == 2, client.calls
+
+
+def _chunks(texts, seed=0):
+    return [{'text': text, 'embedding': [float(len(text)), 1.0 + seed + i, 0.5, 0.25]}
+            for i, text in enumerate(texts)]
+
+
+def _local_manager():
+    import warnings
+    from qdrant_client import QdrantClient
+    warnings.simplefilter('ignore')  # indici del payload non supportati dalla modalità locale
+    return QdrantManager(collection_name='kb_test', client=QdrantClient(':memory:'))
+
+
+def _payload(manager, point_id):
+    return manager.client.retrieve('kb_test', [point_id], with_payload=True)[0].payload
+
+
+def test_index_document_skips_unchanged_points():
+    """Reindicizzare lo stesso documento non riscrive nulla (point_hash e metadata_hash uguali)"""
+    manager = _local_manager()
+    chunks = _chunks(['uno', 'due', 'tre'])
+    metadata = {'nome_obiettivo': 'KB', 'data_odierna': '2026-02-02'}
+
+    first = manager.index_document(chunks, metadata, document_id='doc-1')
+    assert (first['upserted'], first['unchanged'], first['retagged'], first['deleted']) == (3, 0, 0, 0), first
+    again = manager.index_document(_chunks(['uno', 'due', 'tre']), dict(metadata), document_id='doc-1')
+    assert (again['upserted'], again['unchanged'], again['retagged'], again['deleted']) == (0, 3, 0, 0), again
+
+
+def test_index_document_retags_changed_metadata():
+    """Con i soli tag del documento cambiati i punti vengono aggiornati con set_payload, senza re-embedding"""
+    manager = _local_manager()
+    chunks = _chunks(['uno', 'due'])
+    manager.index_document(chunks, {'nome_obiettivo': 'KB', 'data_odierna': '2026-02-02'},
+                           document_id='doc-1', storage_mode='parent-child')
+    point_id = chunk_point_ids('doc-1', ['uno'])[0]
+    point_hash = _payload(manager, point_id)['point_hash']
+
+    stats = manager.index_document(chunks, {'nome_obiettivo': 'KB', 'data_odierna': '2026-03-01'},
+                                   document_id='doc-1', storage_mode='parent-child')
+    # Parent + 2 chunk: nessun upsert, tutti ritaggati
+    assert (stats['upserted'], stats['retagged'], stats['deleted']) == (0, 3, 0), stats
+    payload = _payload(manager, point_id)
+    assert payload['data_odierna'] == '2026-03-01', payload
+    assert payload['point_hash'] == point_hash and payload['text'] == 'uno', payload
+
+
+def test_index_document_reembeds_changed_chunks():
+    """Solo i chunk con vettore o testo cambiati vengono riscritti; quelli rimossi vengono eliminati"""
+    manager = _local_manager()
+    metadata = {'nome_obiettivo': 'KB', 'data_odierna': '2026-02-02'}
+    manager.index_document(_chunks(['uno', 'due', 'tre']), metadata, document_id='doc-1')
+
+    chunks = _chunks(['uno', 'due', 'tre'])
+    chunks[1]['embedding'] = [9.0, 9.0, 9.0, 9.0]
+    stats = manager.index_document(chunks, metadata, document_id='doc-1')
+    assert (stats['upserted'], stats['unchanged'], stats['deleted']) == (1, 2, 0), stats
+
+    stats = manager.index_document(_chunks(['uno', 'quattro']), metadata, document_id='doc-1')
+    # 'uno' invariato, 'quattro' nuovo, 'due' e 'tre' non più nel documento
+    assert (stats['upserted'], stats['unchanged'], stats['deleted']) == (1, 1, 2), stats
+    assert manager.client.count('kb_test').count == 2
+
+
+if __name__ == "__main__":
+    for test in (test_upsert_barrier_waits_for_previous_batches, test_upsert_backpressure_is_lazy,
+                 test_upsert_retries_only_failed_batch, test_index_document_skips_unchanged_points,
+                 test_index_document_retags_changed_metadata, test_index_document_reembeds_changed_chunks):
+        test()
+        print(f"OK  {test.__name__}")
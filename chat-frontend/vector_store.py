@@ -0,0 +1,679 @@
+"""
+Vector store in-process e persistente, usato al posto del server Qdrant
+quando non è raggiungibile (piccoli deployment, sviluppo, test).
+
+`EmbeddedVectorStore` espone il sottoinsieme dell'API di `QdrantClient`
+usato da `QdrantManager` (collection, upsert, Query API con prefetch e RRF,
+scroll, retrieve, delete, indici del payload), quindi manager e registry funzionano senza
+modifiche: `QdrantManager(collection_name='kb', client=EmbeddedVectorStore('vector_store'))`.
+
+Ogni collection è una directory con:
+  - `meta.json`: dimensione e distanza dei vettori, vettori sparsi, indici del payload
+  - `vectors.f32`: matrice float32 append-only, letta con memory map
+  - `points.log`: log JSON append-only delle operazioni (upsert, delete)
+
+La ricerca è esatta (prodotto matrice-vettore NumPy su tutti i punti vivi),
+quindi nessun indice da costruire; i filtri sui campi con indice del payload
+usano un indice invertito in memoria. All'apertura il log viene riletto;
+`compact()` riscrive i file senza i punti eliminati o sovrascritti.
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, HasIdCondition, IsEmptyCondition, IsNullCondition,
+    MatchAny, MatchExcept, MatchText, MatchValue, PointIdsList, Record, ScoredPoint,
+    SparseVector, SparseVectorParams, VectorParams
+)
+
+from qdrant_utils import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+VECTORS_FILE = 'vectors.f32'
+LOG_FILE = 'points.log'
+
+# Compattazione automatica all'apertura oltre questa quota di righe morte
+COMPACT_DEAD_RATIO = 0.5
+
+# Con filtri che tengono meno di questa quota di righe si calcolano gli score solo sulle candidate
+SUBSET_SCORING_RATIO = 0.25
+
+# k della FusionQuery RRF: 1 / (rank + 1) come sul server Qdrant (k=2 su posizioni da 0)
+FUSION_RRF_K = 1
+
+
+def _point_id(value: Any) -> Any:
+    """Id nella forma canonica di Qdrant: intero o UUID in stringa."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return str(uuid.UUID(str(value)))
+
+
+def _payload_values(payload: Dict[str, Any], key: str) -> List[Any]:
+    """Valori di un campo (anche annidato, 'a.b'); le liste valgono elemento per elemento."""
+    values = [payload]
+    for part in key.split('.'):
+        values = [v.get(part) for v in values if isinstance(v, dict) and part in v]
+    flat = []
+    for value in values:
+        flat.extend(value if isinstance(value, list) else [value])
+    return [v for v in flat if v is not None]
+
+
+def _as_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _in_range(value: Any, condition_range: Any) -> bool:
+    for op, bound in (('gt', condition_range.gt), ('gte', condition_range.gte),
+                      ('lt', condition_range.lt), ('lte', condition_range.lte)):
+        if bound is None:
+            continue
+        try:
+            if isinstance(bound, (date, datetime)) or isinstance(value, str):
+                bound, value = _as_datetime(bound), _as_datetime(value)
+        except (TypeError, ValueError):
+            return False
+        try:
+            if (op == 'gt' and not value > bound) or (op == 'gte' and not value >= bound) \
+                    or (op == 'lt' and not value < bound) or (op == 'lte' and not value <= bound):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def _field_matches(payload: Dict[str, Any], condition: FieldCondition) -> bool:
+    values = _payload_values(payload, condition.key)
+    match = condition.match
+    if isinstance(match, MatchValue):
+        return match.value in values
+    if isinstance(match, MatchAny):
+        return any(v in match.any for v in values)
+    if isinstance(match, MatchExcept):
+        return not any(v in getattr(match, 'except_') for v in values)
+    if isinstance(match, MatchText):
+        return any(match.text in str(v) for v in values)
+    if condition.range is not None:
+        return any(_in_range(v, condition.range) for v in values)
+    raise ValueError(f"Unsupported filter condition on '{condition.key}'")
+
+
+class _Collection:
+    """Stato in memoria e file di una collection."""
+
+    def __init__(self, path: str, meta: Dict[str, Any], fsync: bool = False):
+        self.path = path
+        self.meta = meta
+        self.fsync = fsync
+        self.dim = int(meta['vector_size'])
+        self.distance = meta['distance']
+        self.lock = threading.RLock()
+        self._replay()
+
+    # ---- file ----
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _map_vectors(self):
+        size = os.path.getsize(self._file(VECTORS_FILE)) if os.path.exists(self._file(VECTORS_FILE)) else 0
+        rows = size // (4 * self.dim)
+        if rows == 0:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        else:
+            self.vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode='r', shape=(rows, self.dim))
+
+    def _replay(self):
+        """Ricostruisce lo stato in memoria rileggendo il log."""
+        self._map_vectors()
+        rows = len(self.vectors)
+        self.alive = np.zeros(rows, dtype=bool)
+        self.ids: List[Any] = [None] * rows              # riga -> id (None se morta)
+        self.payloads: List[Optional[Dict[str, Any]]] = [None] * rows
+        self.sparse: List[Optional[Dict[str, Dict[int, float]]]] = [None] * rows
+        self.rows: Dict[Any, int] = {}                   # id -> riga viva
+        self.indexes: Dict[str, Dict[Any, set]] = {field: {} for field in self.meta.get('payload_indexes', {})}
+        self.postings: Dict[str, Dict[int, Dict[int, float]]] = {name: {} for name in self.meta.get('sparse', {})}
+        self.sparse_counts: Dict[str, int] = {}          # punti vivi con il vettore sparso (N dell'IDF)
+        if not os.path.exists(self._file(LOG_FILE)):
+            return
+        with open(self._file(LOG_FILE), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"⚠️ Skipping truncated entry in {self._file(LOG_FILE)}")
+                    continue
+                if entry['op'] == 'upsert':
+                    if entry['row'] >= rows:  # vettore mai scritto (crash tra i due file)
+                        continue
+                    sparse = {name: dict(zip(*vec)) for name, vec in (entry.get('sparse') or {}).items()}
+                    self._set_row(entry['row'], _point_id(entry['id']), entry.get('payload') or {}, sparse or None)
+                elif entry['op'] == 'delete':
+                    for point_id in entry['ids']:
+                        self._kill(_point_id(point_id))
+                elif entry['op'] == 'set_payload':
+                    for point_id in entry['ids']:
+                        self._merge_payload(_point_id(point_id), entry['payload'])
+
+    def _append_log(self, entries: Iterable[Dict[str, Any]]):
+        with open(self._file(LOG_FILE), 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    # ---- stato in memoria ----
+
+    def _set_row(self, row: int, point_id: Any, payload: Dict[str, Any],
+                 sparse: Optional[Dict[str, Dict[int, float]]]):
+        self._kill(point_id)
+        self.rows[point_id] = row
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.sparse[row] = sparse
+        self.alive[row] = True
+        for field, index in self.indexes.items():
+            for value in _payload_values(payload, field):
+                index.setdefault(value, set()).add(row)
+        for name, vector in (sparse or {}).items():
+            postings = self.postings.setdefault(name, {})
+            self.sparse_counts[name] = self.sparse_counts.get(name, 0) + 1
+            for token, weight in vector.items():
+                postings.setdefault(int(token), {})[row] = weight
+
+    def _kill(self, point_id: Any):
+        row = self.rows.pop(point_id, None)
+        if row is None:
+            return
+        for field, index in self.indexes.items():
+            for value in _payload_values(self.payloads[row], field):
+                index.get(value, set()).discard(row)
+        for name, vector in (self.sparse[row] or {}).items():
+            self.sparse_counts[name] -= 1
+            for token in vector:
+                self.postings[name].get(int(token), {}).pop(row, None)
+        self.alive[row] = False
+        self.ids[row] = None
+        self.payloads[row] = None
+        self.sparse[row] = None
+
+    def _merge_payload(self, point_id: Any, payload: Dict[str, Any]):
+        row = self.rows.get(point_id)
+        if row is None:
+            return
+        for field, index in self.indexes.items():
+            for value in _payload_values(self.payloads[row], field):
+                index.get(value, set()).discard(row)
+        self.payloads[row] = {**self.payloads[row], **payload}
+        for field, index in self.indexes.items():
+            for value in _payload_values(self.payloads[row], field):
+                index.setdefault(value, set()).add(row)
+
+    def build_index(self, field: str):
+        index = self.indexes[field] = {}
+        for row in np.flatnonzero(self.alive):
+            for value in _payload_values(self.payloads[row], field):
+                index.setdefault(value, set()).add(int(row))
+
+    # ---- scrittura ----
+
+    def upsert(self, points: Sequence[Any]):
+        dense, sparse = [], []
+        for point in points:
+            vector = point.vector
+            named_sparse = {}
+            if isinstance(vector, dict):
+                named_sparse = {name: v for name, v in vector.items() if hasattr(v, 'indices')}
+                vector = vector.get('')
+            dense.append(vector)
+            sparse.append({name: (list(map(int, v.indices)), list(map(float, v.values)))
+                           for name, v in named_sparse.items()})
+        matrix = np.asarray(dense, dtype=np.float32).reshape(len(points), self.dim)
+        if self.distance == Distance.COSINE:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms > 0, norms, 1.0)
+        with self.lock:
+            start = len(self.ids)
+            with open(self._file(VECTORS_FILE), 'ab') as f:
+                f.write(np.ascontiguousarray(matrix).tobytes())
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            entries = [{'op': 'upsert', 'id': _point_id(p.id), 'row': start + i, 'payload': p.payload or {},
+                        'sparse': sparse[i] or None} for i, p in enumerate(points)]
+            self._append_log(entries)
+            added = len(points)
+            self.ids.extend([None] * added)
+            self.payloads.extend([None] * added)
+            self.sparse.extend([None] * added)
+            self.alive = np.concatenate([self.alive, np.zeros(added, dtype=bool)])
+            for entry, vec in zip(entries, sparse):
+                self._set_row(entry['row'], entry['id'], entry['payload'],
+                              {name: dict(zip(*v)) for name, v in vec.items()} or None)
+            self._map_vectors()
+
+    def delete(self, point_ids: Sequence[Any]):
+        with self.lock:
+            point_ids = [pid for pid in map(_point_id, point_ids) if pid in self.rows]
+            if point_ids:
+                self._append_log([{'op': 'delete', 'ids': point_ids}])
+                for point_id in point_ids:
+                    self._kill(point_id)
+            return len(point_ids)
+
+    def set_payload(self, point_ids: Sequence[Any], payload: Dict[str, Any]):
+        """Aggiorna (merge) il payload dei punti senza riscrivere i vettori."""
+        with self.lock:
+            point_ids = [pid for pid in map(_point_id, point_ids) if pid in self.rows]
+            if point_ids:
+                self._append_log([{'op': 'set_payload', 'ids': point_ids, 'payload': payload}])
+                for point_id in point_ids:
+                    self._merge_payload(point_id, payload)
+            return len(point_ids)
+
+    # ---- lettura ----
+
+    def filter_mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        """Maschera booleana delle righe vive che soddisfano il filtro."""
+        mask = self.alive.copy()
+        if query_filter is None:
+            return mask
+        return mask & self._filter(query_filter, mask)
+
+    def _filter(self, query_filter: Filter, candidates: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(self.alive), dtype=bool)
+        for condition in _as_list(query_filter.must):
+            mask &= self._condition(condition, candidates & mask)
+        for condition in _as_list(query_filter.must_not):
+            mask &= ~self._condition(condition, candidates & mask)
+        should = _as_list(query_filter.should)
+        if should:
+            any_mask = np.zeros(len(self.alive), dtype=bool)
+            for condition in should:
+                any_mask |= self._condition(condition, candidates & mask)
+            mask &= any_mask
+        return mask
+
+    def _condition(self, condition: Any, candidates: np.ndarray) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self._filter(condition, candidates)
+        result = np.zeros(len(self.alive), dtype=bool)
+        if isinstance(condition, HasIdCondition):
+            rows = [self.rows[pid] for pid in map(_point_id, condition.has_id) if pid in self.rows]
+            result[rows] = True
+            return result
+        if isinstance(condition, (IsEmptyCondition, IsNullCondition)):
+            key = condition.is_empty.key if isinstance(condition, IsEmptyCondition) else condition.is_null.key
+            for row in np.flatnonzero(candidates):
+                result[row] = not _payload_values(self.payloads[row], key)
+            return result
+        if isinstance(condition, FieldCondition) and isinstance(condition.match, (MatchValue, MatchAny)) \
+                and condition.key in self.indexes:
+            values = [condition.match.value] if isinstance(condition.match, MatchValue) else condition.match.any
+            for value in values:
+                rows = self.indexes[condition.key].get(value)
+                if rows:
+                    result[list(rows)] = True
+            return result
+        for row in np.flatnonzero(candidates):
+            result[row] = _field_matches(self.payloads[row], condition)
+        return result
+
+    def dense_scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Score delle righe (tutte o solo `rows`) per ogni query, forma
+        (query, righe); per EUCLID e MANHATTAN è la distanza.
+        """
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if self.distance == Distance.COSINE:
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.where(norms > 0, norms, 1.0)
+        if self.distance == Distance.EUCLID:
+            return np.sqrt(np.maximum(
+                (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(axis=1)[None, :], 0))
+        if self.distance == Distance.MANHATTAN:
+            return np.abs(queries[:, None, :] - vectors[None, :, :]).sum(axis=2)
+        return queries @ vectors.T
+
+    def sparse_scores(self, name: str, indices: Sequence[int], values: Sequence[float]) -> Dict[int, float]:
+        postings = self.postings.get(name, {})
+        idf = (self.meta.get('sparse') or {}).get(name, {}).get('modifier') == 'idf'
+        total = self.sparse_counts.get(name, 0)
+        scores: Dict[int, float] = {}
+        for token, weight in zip(indices, values):
+            rows = postings.get(int(token))
+            if not rows:
+                continue
+            if idf:
+                weight *= math.log((total - len(rows) + 0.5) / (len(rows) + 0.5) + 1.0)
+            for row, value in rows.items():
+                scores[row] = scores.get(row, 0.0) + weight * value
+        return scores
+
+    def record(self, row: int, with_payload: Any = True, with_vectors: Any = False,
+               score: Optional[float] = None) -> Any:
+        payload = self.payloads[row]
+        if with_payload is False:
+            payload = None
+        elif isinstance(with_payload, (list, tuple)):
+            payload = {k: payload[k] for k in with_payload if k in payload}
+        vector = self.vectors[row].tolist() if with_vectors else None
+        if vector is not None and self.sparse[row]:
+            # Come Qdrant: vettore denso di default e vettori sparsi per nome
+            vector = {'': vector, **{
+                name: SparseVector(indices=list(weights), values=list(weights.values()))
+                for name, weights in self.sparse[row].items()
+            }}
+        if score is None:
+            return Record.model_construct(id=self.ids[row], payload=payload, vector=vector)
+        return ScoredPoint.model_construct(id=self.ids[row], version=0, score=float(score),
+                                           payload=payload, vector=vector)
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class EmbeddedVectorStore:
+    """
+    Vector store in-process con la stessa API (sottoinsieme) di `QdrantClient`.
+
+    Thread-safe: le operazioni su una collection sono serializzate da un
+    lock per collection; collection diverse procedono in parallelo.
+
+    Example:
+        >>> store = EmbeddedVectorStore('vector_store')
+        >>> registry = QdrantRegistry(client=store)
+        >>> registry.get('meetings_notes').index_document(chunks, metadata, document_id='doc-42')
+    """
+
+    def __init__(self, path: str = 'vector_store', fsync: bool = False):
+        """
+        Args:
+            path: Directory dei dati (una sottodirectory per collection)
+            fsync: Se True forza su disco ogni scrittura (più lento, resiste ai crash della macchina)
+        """
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._collections: Dict[str, _Collection] = {}
+        os.makedirs(path, exist_ok=True)
+        logger.info(f"✅ Embedded vector store at {os.path.abspath(path)}")
+
+    def _dir(self, collection_name: str) -> str:
+        if not collection_name or os.sep in collection_name or collection_name.startswith('.'):
+            raise ValueError(f"Invalid collection name '{collection_name}'")
+        return os.path.join(self.path, collection_name)
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            return collection
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                meta_path = os.path.join(self._dir(collection_name), META_FILE)
+                if not os.path.exists(meta_path):
+                    raise ValueError(f"Collection {collection_name} not found")
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                collection = _Collection(self._dir(collection_name), meta, fsync=self.fsync)
+                self._collections[collection_name] = collection
+                dead = len(collection.ids) - len(collection.rows)
+                if dead > 1000 and dead > COMPACT_DEAD_RATIO * len(collection.ids):
+                    self._compact(collection)
+        return collection
+
+    def _write_meta(self, collection: _Collection):
+        tmp = os.path.join(collection.path, META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(collection.meta, f)
+        os.replace(tmp, os.path.join(collection.path, META_FILE))
+
+    # ---- collection ----
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self._dir(collection_name), META_FILE))
+
+    def get_collections(self) -> Any:
+        names = sorted(name for name in os.listdir(self.path) if self.collection_exists(name))
+        return SimpleNamespace(collections=[SimpleNamespace(name=name) for name in names])
+
+    def create_collection(self, collection_name: str, vectors_config: VectorParams,
+                          sparse_vectors_config: Optional[Dict[str, SparseVectorParams]] = None,
+                          **kwargs) -> bool:
+        """Crea la collection; quantizzazione e HNSW sono ignorati (la ricerca è esatta)."""
+        with self._lock:
+            if self.collection_exists(collection_name):
+                raise ValueError(f"Collection {collection_name} already exists")
+            sparse = {}
+            for name, params in (sparse_vectors_config or {}).items():
+                modifier = getattr(params, 'modifier', None)
+                sparse[name] = {'modifier': str(getattr(modifier, 'value', modifier)).lower() if modifier else None}
+            distance = vectors_config.distance
+            meta = {'vector_size': vectors_config.size, 'distance': getattr(distance, 'value', distance),
+                    'sparse': sparse, 'payload_indexes': {}}
+            os.makedirs(self._dir(collection_name), exist_ok=True)
+            collection = _Collection(self._dir(collection_name), meta, fsync=self.fsync)
+            self._write_meta(collection)
+            self._collections[collection_name] = collection
+        return True
+
+    def delete_collection(self, collection_name: str) -> bool:
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            if not self.collection_exists(collection_name):
+                return False
+            shutil.rmtree(self._dir(collection_name))
+        return True
+
+    def get_collection(self, collection_name: str) -> Any:
+        collection = self._get(collection_name)
+        meta = collection.meta
+        points = len(collection.rows)
+        sparse = {name: SparseVectorParams() for name in meta.get('sparse', {})} or None
+        return SimpleNamespace(
+            status='green',
+            points_count=points,
+            vectors_count=points,
+            indexed_vectors_count=points,
+            payload_schema=dict(meta.get('payload_indexes', {})),
+            config=SimpleNamespace(
+                params=SimpleNamespace(vectors=VectorParams(size=collection.dim, distance=Distance(meta['distance'])),
+                                       sparse_vectors=sparse),
+                quantization_config=None,
+                hnsw_config=None
+            )
+        )
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema: Any = None,
+                             **kwargs) -> bool:
+        collection = self._get(collection_name)
+        with collection.lock:
+            collection.build_index(field_name)
+            collection.meta.setdefault('payload_indexes', {})[field_name] = str(getattr(field_schema, 'value', field_schema))
+            self._write_meta(collection)
+        return True
+
+    def compact(self, collection_name: str) -> Dict[str, int]:
+        """Riscrive vettori e log con i soli punti vivi. Ritorna righe prima e dopo."""
+        return self._compact(self._get(collection_name))
+
+    def _compact(self, collection: _Collection) -> Dict[str, int]:
+        with collection.lock:
+            before = len(collection.ids)
+            live = np.flatnonzero(collection.alive)
+            tmp_vectors = os.path.join(collection.path, VECTORS_FILE + '.tmp')
+            tmp_log = os.path.join(collection.path, LOG_FILE + '.tmp')
+            with open(tmp_vectors, 'wb') as f:
+                for start in range(0, len(live), 10000):
+                    f.write(np.ascontiguousarray(collection.vectors[live[start:start + 10000]]).tobytes())
+            with open(tmp_log, 'w', encoding='utf-8') as f:
+                for new_row, row in enumerate(live):
+                    sparse = {name: (list(v.keys()), list(v.values()))
+                              for name, v in (collection.sparse[row] or {}).items()} or None
+                    f.write(json.dumps({'op': 'upsert', 'id': collection.ids[row], 'row': new_row,
+                                        'payload': collection.payloads[row], 'sparse': sparse}, default=str) + '\n')
+            collection.vectors = np.zeros((0, collection.dim), dtype=np.float32)  # chiude la memory map
+            os.replace(tmp_vectors, os.path.join(collection.path, VECTORS_FILE))
+            os.replace(tmp_log, os.path.join(collection.path, LOG_FILE))
+            collection._replay()
+            logger.info(f"🧹 Compacted {os.path.basename(collection.path)}: {before} -> {len(live)} rows")
+            return {'rows_before': before, 'rows_after': len(live)}
+
+    # ---- punti ----
+
+    def upsert(self, collection_name: str, points: Sequence[Any], wait: bool = True, **kwargs) -> Any:
+        if points:
+            self._get(collection_name).upsert(list(points))
+        return SimpleNamespace(status='completed')
+
+    def delete(self, collection_name: str, points_selector: Any, wait: bool = True, **kwargs) -> Any:
+        collection = self._get(collection_name)
+        if isinstance(points_selector, PointIdsList):
+            ids = points_selector.points
+        elif isinstance(points_selector, (list, tuple)):
+            ids = points_selector
+        else:
+            query_filter = getattr(points_selector, 'filter', points_selector)
+            with collection.lock:
+                ids = [collection.ids[row] for row in np.flatnonzero(collection.filter_mask(query_filter))]
+        deleted = collection.delete(ids)
+        return SimpleNamespace(status='completed', deleted=deleted)
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], points: Any, wait: bool = True,
+                    **kwargs) -> Any:
+        ids = points.points if isinstance(points, PointIdsList) else points
+        self._get(collection_name).set_payload(ids, payload)
+        return SimpleNamespace(status='completed')
+
+    def retrieve(self, collection_name: str, ids: Sequence[Any], with_payload: Any = True,
+                 with_vectors: Any = False, **kwargs) -> List[Any]:
+        collection = self._get(collection_name)
+        with collection.lock:
+            rows = [collection.rows.get(_point_id(pid)) for pid in ids]
+            return [collection.record(row, with_payload, with_vectors) for row in rows if row is not None]
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Filter] = None, limit: int = 10,
+               offset: Optional[int] = None, with_payload: Any = True, with_vectors: Any = False,
+               **kwargs) -> Tuple[List[Any], Optional[int]]:
+        """Scorre i punti in ordine di scrittura; `offset` è la riga da cui ripartire."""
+        collection = self._get(collection_name)
+        with collection.lock:
+            rows = np.flatnonzero(collection.filter_mask(scroll_filter))
+            rows = rows[rows >= (offset or 0)]
+            page = rows[:limit]
+            next_offset = int(rows[limit]) if len(rows) > limit else None
+            return [collection.record(int(row), with_payload, with_vectors) for row in page], next_offset
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, **kwargs) -> Any:
+        collection = self._get(collection_name)
+        with collection.lock:
+            return SimpleNamespace(count=int(collection.filter_mask(count_filter).sum()))
+
+    # ---- ricerca ----
+
+    @staticmethod
+    def _ascending(collection: _Collection) -> bool:
+        return collection.distance in (Distance.EUCLID, Distance.MANHATTAN)
+
+    def _top(self, collection: _Collection, rows: np.ndarray, scores: np.ndarray, limit: int,
+             with_payload: Any, with_vectors: Any) -> List[Any]:
+        """I migliori `limit` tra le righe `rows` con i rispettivi `scores`."""
+        if len(rows) == 0:
+            return []
+        keys = scores if self._ascending(collection) else -scores
+        if len(rows) > limit:
+            top = np.argpartition(keys, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(keys[top], kind='stable')]
+        return [collection.record(int(rows[i]), with_payload, with_vectors, score=scores[i]) for i in top]
+
+    def _query(self, collection: _Collection, query: Any, using: Optional[str], query_filter: Optional[Filter],
+               limit: int, with_payload: Any, with_vectors: Any, prefetch: Any = None,
+               score_threshold: Optional[float] = None, dense_scores: Optional[np.ndarray] = None) -> List[Any]:
+        if prefetch:
+            # Fusione delle ricerche di prefetch (es. densa + BM25) con la reciprocal rank fusion
+            results = [self._query(collection, p.query, p.using, p.filter, p.limit or limit, with_payload,
+                                   with_vectors, p.prefetch) for p in _as_list(prefetch)]
+            if query is None or type(query).__name__ in ('FusionQuery', 'RrfQuery'):
+                return reciprocal_rank_fusion(results, limit=limit, k=FUSION_RRF_K)
+            raise ValueError(f"Unsupported query with prefetch: {type(query).__name__}")
+        mask = collection.filter_mask(query_filter)
+        if isinstance(query, SparseVector):
+            sparse = collection.sparse_scores(using, query.indices, query.values)
+            rows = np.fromiter(sparse.keys(), dtype=np.int64, count=len(sparse))
+            scores = np.fromiter(sparse.values(), dtype=np.float32, count=len(sparse))
+            keep = mask[rows]
+            rows, scores = rows[keep], scores[keep]
+        else:
+            rows = np.flatnonzero(mask)
+            if dense_scores is not None:
+                scores = dense_scores[rows]
+            else:
+                vector = np.asarray(query, dtype=np.float32).reshape(1, collection.dim)
+                if len(rows) < SUBSET_SCORING_RATIO * len(mask):
+                    scores = collection.dense_scores(vector, rows)[0]
+                else:
+                    scores = collection.dense_scores(vector)[0][rows]
+        if score_threshold is not None:
+            keep = scores <= score_threshold if self._ascending(collection) else scores >= score_threshold
+            rows, scores = rows[keep], scores[keep]
+        return self._top(collection, rows, scores, limit, with_payload, with_vectors)
+
+    def query_points(self, collection_name: str, query: Any = None, using: Optional[str] = None,
+                     prefetch: Any = None, query_filter: Optional[Filter] = None, search_params: Any = None,
+                     limit: int = 10, with_payload: Any = True, with_vectors: Any = False,
+                     score_threshold: Optional[float] = None, **kwargs) -> Any:
+        """
+        Ricerca esatta (Query API): vettore denso, `SparseVector` con `using`,
+        oppure `prefetch` fusi con RRF (`FusionQuery`). `search_params` è
+        ignorato: non ci sono indici approssimati né quantizzazione.
+        """
+        collection = self._get(collection_name)
+        with collection.lock:
+            points = self._query(collection, query, using, query_filter, limit, with_payload, with_vectors,
+                                 prefetch, score_threshold)
+        return SimpleNamespace(points=points)
+
+    def query_batch_points(self, collection_name: str, requests: Sequence[Any], **kwargs) -> List[Any]:
+        """Più ricerche in una chiamata; le query dense sono calcolate con un unico prodotto matrice-matrice."""
+        collection = self._get(collection_name)
+        with collection.lock:
+            dense = [i for i, r in enumerate(requests)
+                     if not r.prefetch and r.query is not None and not isinstance(r.query, SparseVector)]
+            scores = {}
+            if dense:
+                matrix = np.asarray([requests[i].query for i in dense], dtype=np.float32).reshape(len(dense), collection.dim)
+                scores = dict(zip(dense, collection.dense_scores(matrix)))
+            return [
+                SimpleNamespace(points=self._query(
+                    collection, r.query, r.using, r.filter, r.limit or 10,
+                    r.with_payload if r.with_payload is not None else False, r.with_vector or False,
+                    r.prefetch, r.score_threshold, dense_scores=scores.get(i)))
+                for i, r in enumerate(requests)
+            ]
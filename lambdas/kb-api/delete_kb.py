@@ -1,6 +1,7 @@
 """
 Lambda handler for Knowledge Base document deletion (DELETE).
 Removes document from DynamoDB and S3 if applicable.
+Qdrant points are deleted by the backend (DELETE /api/kb/<document_id>).
 """
 
 import json
@@ -111,10 +112,6 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': f'Error deleting document: {str(e)}'})
             }
         
-        # Warning message about embeddings
-        warning_msg = "⚠️ ATTENZIONE: Gli embedding vettoriali corrispondenti su Qdrant non vengono cancellati automaticamente."
-        logger.warning(warning_msg)
-        
         return {
             'statusCode': 200,
             'headers': {
@@ -123,8 +120,7 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({
                 'message': 'Document deleted successfully',
-                'document_id': document_id,
-                'warning': warning_msg
+                'document_id': document_id
             })
         }
     
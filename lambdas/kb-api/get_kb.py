@@ -8,6 +8,7 @@ import boto3
 import os
 import logging
 from decimal import Decimal
+from boto3.dynamodb.conditions import Key
 
 # Initialize AWS clients
 dynamodb = boto3.resource('dynamodb')
@@ -33,12 +34,74 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(o)
 
 
+def list_document_ids():
+    """
+    Ids of all documents, following LastEvaluatedKey across scan pages.
+    Used by the backend orphan sweeper, which needs the complete set:
+    strongly consistent reads, so a document written just before the scan
+    is never reported missing (and its vectors deleted).
+    """
+    document_ids = []
+    scan_kwargs = {'ProjectionExpression': 'document_id', 'ConsistentRead': True}
+    while True:
+        response = table.scan(**scan_kwargs)
+        document_ids.extend(item['document_id'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    logger.info(f"Retrieved {len(document_ids)} document ids")
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({
+            'document_ids': document_ids,
+            'count': len(document_ids)
+        })
+    }
+
+
+def get_document(document_id):
+    """
+    A single document by id (strongly consistent), 404 if it does not exist.
+    Used by the backend before re-indexing a client-supplied document_id.
+    """
+    response = table.query(
+        KeyConditionExpression=Key('document_id').eq(document_id),
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*'
+    }
+    if not items:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({'error': 'Document not found', 'document_id': document_id})
+        }
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({'document': items[0]}, cls=DecimalEncoder)
+    }
+
+
 def lambda_handler(event, context):
     """
-    Retrieve all KB documents.
+    Retrieve all KB documents, or a single one.
+    
+    Path parameters:
+    - document_id: return only this document (404 if it does not exist)
     
     Query parameters:
     - tipo: filter by document type (optional)
+    - ids_only: return only the ids of all documents, reading every scan page (optional)
     """
     
     try:
@@ -48,6 +111,13 @@ def lambda_handler(event, context):
         query_params = event.get('queryStringParameters', {}) or {}
         doc_type = query_params.get('tipo')
         
+        path_params = event.get('pathParameters', {}) or {}
+        if path_params.get('document_id'):
+            return get_document(path_params['document_id'])
+        
+        if str(query_params.get('ids_only', '')).lower() in ('1', 'true', 'yes'):
+            return list_document_ids()
+        
         # Query documents
         if doc_type:
             # Use GSI to filter by type
@@ -1,6 +1,7 @@
 """
 Lambda handler for Knowledge Base document upload (POST).
 Saves PDF files to S3 and text content to DynamoDB.
+With a document_id path parameter the existing document is updated in place.
 """
 
 import json
@@ -10,6 +11,7 @@ import os
 from datetime import datetime
 from base64 import b64decode
 import logging
+from boto3.dynamodb.conditions import Key
 
 # Initialize AWS clients
 s3_client = boto3.client('s3')
@@ -28,6 +30,16 @@ logger.setLevel(LOG_LEVEL)
 table = dynamodb.Table(KB_DOCUMENTS_TABLE_NAME)
 
 
+def find_document(document_id):
+    """Current item of a document (strongly consistent), or None."""
+    response = table.query(
+        KeyConditionExpression=Key('document_id').eq(document_id),
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+
 def lambda_handler(event, context):
     """
     Handle Knowledge Base document upload.
@@ -35,6 +47,10 @@ def lambda_handler(event, context):
     Expected form data:
     - data: file (PDF) or text content
     - type: document type (e.g., 'meeting-notes')
+    
+    Optional path parameters:
+    - document_id: update this existing document (same id, new content)
+      instead of creating a new one; 404 if it does not exist
     """
     
     try:
@@ -47,8 +63,21 @@ def lambda_handler(event, context):
         if is_base64:
             body = b64decode(body).decode('utf-8')
         
+        # Update of an existing document (re-indexing) or new document
+        path_params = event.get('pathParameters', {}) or {}
+        existing = None
+        if path_params.get('document_id'):
+            doc_id = path_params['document_id']
+            existing = find_document(doc_id)
+            if existing is None:
+                return {
+                    'statusCode': 404,
+                    'body': json.dumps({'error': 'Document not found', 'document_id': doc_id})
+                }
+        else:
+            doc_id = str(uuid.uuid4())
+        
         # Extract form data from multipart form data
-        doc_id = str(uuid.uuid4())
         content_type = event.get('headers', {}).get('content-type', '').lower()
         
         # Simple parsing for multipart form data
@@ -110,11 +139,14 @@ def lambda_handler(event, context):
         # Create document record
         document = {
             'document_id': doc_id,
-            'created_at': datetime.utcnow().isoformat(),
+            # created_at is the sort key: an update keeps it to overwrite the same item
+            'created_at': existing['created_at'] if existing else datetime.utcnow().isoformat(),
             'tipo': doc_type,
             'is_pdf': file_data is not None,
             'file_name': file_name or 'N/A',
         }
+        if existing:
+            document['updated_at'] = datetime.utcnow().isoformat()
         
         # If file, save to S3
         if file_data:
@@ -151,6 +183,14 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': f'Error saving document metadata: {str(e)}'})
             }
         
+        # An updated document no longer pointing at its previous file
+        if existing and existing.get('s3_key') and existing['s3_key'] != document.get('s3_key'):
+            try:
+                s3_client.delete_object(Bucket=KB_BUCKET_NAME, Key=existing['s3_key'])
+                logger.info(f"Deleted previous S3 object: {existing['s3_key']}")
+            except Exception as e:
+                logger.error(f"Error deleting previous S3 object: {str(e)}")
+        
         return {
             'statusCode': 200,
             'headers': {
@@ -158,7 +198,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*'
             },
             'body': json.dumps({
-                'message': 'Document uploaded successfully',
+                'message': 'Document updated successfully' if existing else 'Document uploaded successfully',
                 'document_id': doc_id,
                 'document': document
             })